@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AddressConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'address'
+
+    def ready(self):
+        # Import signals
+        import address.signals
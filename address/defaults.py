@@ -0,0 +1,58 @@
+import math
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Dict, Any
+from django.conf import settings
+from config.caching import cached, shared_cache
+
+
+def user_tag(user_id) -> str:
+    """Cache tag of everything cached from a user's addresses"""
+    return f"user:{user_id}"
+
+
+def distance_km(lat1, lng1, lat2, lng2) -> float:
+    """Great-circle (haversine) distance in kilometres"""
+    lat1, lng1, lat2, lng2 = (math.radians(float(v)) for v in (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def quote_delivery(latitude, longitude) -> Dict[str, Any]:
+    """Distance from the cafe and the delivery fee for a drop-off point"""
+    distance = distance_km(
+        getattr(settings, 'CAFE_LATITUDE', 0), getattr(settings, 'CAFE_LONGITUDE', 0), latitude, longitude
+    )
+    fee = (
+        Decimal(str(getattr(settings, 'DELIVERY_BASE_FEE', 0)))
+        + Decimal(str(getattr(settings, 'DELIVERY_FEE_PER_KM', 0))) * Decimal(str(distance))
+    ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return {'distance_km': round(distance, 2), 'fee': str(fee)}
+
+
+@cached(
+    'address', ttl=lambda: getattr(settings, 'DEFAULT_ADDRESS_CACHE_TTL', 3600),
+    tags=lambda user_id: [user_tag(user_id)]
+)
+def get_default_address(user_id) -> Optional[Dict[str, Any]]:
+    """
+    The user's default address with its delivery quote, or None
+
+    Cached per user (None included) until one of their addresses changes
+    (see address.signals and UserAddress.objects.set_default).
+    """
+    from .models import UserAddress
+
+    address = UserAddress.objects.filter(user_id=user_id, is_default=True).values(
+        'id', 'label', 'address_type', 'full_address', 'latitude', 'longitude',
+        'apartment', 'building', 'floor', 'notes'
+    ).first()
+    if address is not None:
+        address['latitude'] = str(address['latitude'])
+        address['longitude'] = str(address['longitude'])
+        address['quote'] = quote_delivery(address['latitude'], address['longitude'])
+    return address
+
+
+def forget_addresses(user_id) -> None:
+    """Drop the user's cached default address and address list"""
+    shared_cache.invalidate(user_tag(user_id))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-19 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def keep_latest_default(apps, schema_editor):
+    """Leave one default per user (the most recently updated) so the index can be built"""
+    from django.db.models import Count
+
+    UserAddress = apps.get_model('address', 'UserAddress')
+    duplicated = (
+        UserAddress.objects.filter(is_default=True).order_by()
+        .values('user_id').annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in list(duplicated):
+        keep = UserAddress.objects.filter(user_id=user_id, is_default=True).order_by('-updated_at', '-id').first()
+        UserAddress.objects.filter(user_id=user_id, is_default=True).exclude(pk=keep.pk).update(is_default=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0005_alter_useraddress_latitude_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_default, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useraddress',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('user',), name='unique_default_address_per_user'),
+        ),
+    ]
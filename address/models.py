@@ -4,6 +4,37 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+class UserAddressManager(models.Manager):
+    def clear_default(self, user_id, keep_pk=None):
+        """Unset the user's default address (other than keep_pk); a no-op UPDATE when there is none"""
+        return self.filter(user_id=user_id, is_default=True).exclude(pk=keep_pk).update(is_default=False)
+    
+    def set_default(self, user_id, address_id):
+        """
+        Make address_id the user's default; False if it isn't theirs
+        
+        Both statements are conditional, so repeating the call writes
+        nothing. A racing switch loses on the partial unique index and is
+        retried.
+        """
+        from django.db import IntegrityError, transaction
+        from .defaults import forget_addresses
+        
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    if not self.filter(pk=address_id, user_id=user_id).exists():
+                        return False
+                    cleared = self.clear_default(user_id, keep_pk=address_id)
+                    changed = self.filter(pk=address_id, user_id=user_id, is_default=False).update(is_default=True)
+                break
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+        if cleared or changed:
+            forget_addresses(user_id)
+        return True
+
 class UserAddress(models.Model):
     """User's saved addresses with map coordinates"""
     ADDRESS_TYPES = [
@@ -26,17 +57,36 @@ class UserAddress(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     
+    objects = UserAddressManager()
+    
     class Meta:
         verbose_name = _('user address')
         verbose_name_plural = _('user addresses')
         ordering = ['-is_default', 'created_at']
         unique_together = ['user', 'label']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'], condition=models.Q(is_default=True), name='unique_default_address_per_user'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username}'s {self.get_address_type_display()} Address"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() skip clearing other defaults when this one already was
+        instance._loaded_is_default = instance.__dict__.get('is_default')
+        return instance
+    
     def save(self, *args, **kwargs):
-        # Ensure only one default address per user
-        if self.is_default:
-            UserAddress.objects.filter(user=self.user, is_default=True).update(is_default=False)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        # Ensure only one default address per user (enforced by unique_default_address_per_user)
+        if self.is_default and (self._state.adding or not getattr(self, '_loaded_is_default', False)):
+            from django.db import transaction
+            with transaction.atomic():
+                UserAddress.objects.clear_default(self.user_id, keep_pk=self.pk)
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_is_default = self.is_default
\ No newline at end of file
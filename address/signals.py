@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .defaults import forget_addresses
+from .models import UserAddress
+
+
+@receiver(post_save, sender=UserAddress)
+@receiver(post_delete, sender=UserAddress)
+def invalidate_addresses(sender, instance, **kwargs):
+    """Any change to a user's addresses may change their list and default"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: forget_addresses(user_id))
@@ -1,3 +1,44 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from .models import UserAddress
 
-# Create your tests here.
+User = get_user_model()
+
+
+class SetDefaultAddressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='addressed', email='addressed@example.com', password='pass')
+        self.home = self.create_address('Home', is_default=True)
+        self.work = self.create_address('Work')
+
+    def create_address(self, label, user=None, **fields):
+        return UserAddress.objects.create(
+            user=user or self.user, label=label, full_address='Bole, Addis Ababa',
+            latitude='9.01', longitude='38.76', **fields,
+        )
+
+    def defaults(self):
+        return list(UserAddress.objects.filter(user=self.user, is_default=True).values_list('label', flat=True))
+
+    def test_switches_the_default(self):
+        with mock.patch('address.defaults.forget_addresses') as forget_addresses:
+            self.assertTrue(UserAddress.objects.set_default(self.user.pk, self.work.pk))
+        self.assertEqual(self.defaults(), ['Work'])
+        forget_addresses.assert_called_once_with(self.user.pk)
+
+    def test_repeating_the_call_changes_nothing(self):
+        UserAddress.objects.set_default(self.user.pk, self.work.pk)
+
+        with mock.patch('address.defaults.forget_addresses') as forget_addresses:
+            self.assertTrue(UserAddress.objects.set_default(self.user.pk, self.work.pk))
+        self.assertEqual(self.defaults(), ['Work'])
+        forget_addresses.assert_not_called()  # Neither conditional update matched a row
+
+    def test_another_users_address_is_refused(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        theirs = self.create_address('Theirs', user=other)
+
+        self.assertFalse(UserAddress.objects.set_default(self.user.pk, theirs.pk))
+        self.assertEqual(self.defaults(), ['Home'])
+        self.assertFalse(UserAddress.objects.get(pk=theirs.pk).is_default)
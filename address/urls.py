@@ -1,9 +1,10 @@
 from django.urls import path
 from .views import (UserAddressListCreateAPIView, UserAddressDetailAPIView,
-                   SetDefaultAddressAPIView)
+                   SetDefaultAddressAPIView, DefaultAddressAPIView)
 
 urlpatterns = [
     path('', UserAddressListCreateAPIView.as_view(), name='address-list-create'),
+    path('default/', DefaultAddressAPIView.as_view(), name='default-address'),
     path('<int:pk>/', UserAddressDetailAPIView.as_view(), name='address-detail'),
     path('<int:pk>/set-default/', SetDefaultAddressAPIView.as_view(), name='set-default-address'),
 ]
\ No newline at end of file
@@ -1,9 +1,17 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from config.caching import cache_view
 from .models import UserAddress
 from .serializers import UserAddressSerializer, UserAddressCreateSerializer
+from .defaults import get_default_address, user_tag
 
+@method_decorator(cache_view(
+    'address', ttl=lambda: getattr(settings, 'ADDRESS_LIST_CACHE_TTL', 600),
+    tags=lambda request, *args, **kwargs: [user_tag(request.user.pk)], per_user=True
+), name='get')
 class UserAddressListCreateAPIView(generics.ListCreateAPIView):
     serializer_class = UserAddressSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -36,7 +44,16 @@ class SetDefaultAddressAPIView(generics.UpdateAPIView):
         return UserAddress.objects.filter(user=self.request.user)
     
     def update(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.is_default = True
-        instance.save()
-        return Response({'message': 'Address set as default successfully'})
\ No newline at end of file
+        if not UserAddress.objects.set_default(request.user.id, kwargs['pk']):
+            return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Address set as default successfully'})
+
+class DefaultAddressAPIView(generics.GenericAPIView):
+    """The user's default address and delivery quote, served from cache"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        address = get_default_address(request.user.id)
+        if address is None:
+            return Response({'error': 'No default address set'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(address)
\ No newline at end of file
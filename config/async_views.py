@@ -0,0 +1,103 @@
+import abc
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+
+_renderer = JSONRenderer()
+
+
+def json_response(data, status: int = 200, headers=None) -> HttpResponse:
+    """JSON rendered the way DRF's JSONRenderer renders it, with no DRF Response machinery"""
+    response = HttpResponse(_renderer.render(data), status=status, content_type=_renderer.media_type)
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def read_view(api_view, async_view):
+    """
+    The view for a URL with a hot read path
+
+    Under ASGI (ASYNC_READ_VIEWS, set by config/asgi.py) that is
+    async_view, which answers GET itself and hands other methods to the
+    sync DRF api_view; under WSGI it is api_view unchanged.
+    """
+    if getattr(settings, 'ASYNC_READ_VIEWS', False):
+        return async_view.as_view(api_view=api_view)
+    return api_view.as_view()
+
+
+class AsyncAPIView(View):
+    """
+    Async Django view for a URL served by a sync DRF view
+
+    Holds the plumbing the async views share: the DRF view instance for a
+    request, its authentication, permission and throttle checks and its
+    exception handling, so bodies and status codes match the sync view.
+    Methods other than GET and HEAD are passed to the DRF view. Subclasses
+    implement `get`.
+
+    The checks stay sync: authenticators may load the user and throttles
+    read and write their store, so every request still makes one hop to a
+    worker thread for them (benchmark_asgi reports the same routes under
+    WSGI for comparison). What runs on the event loop is everything after:
+    local cache hits, async ORM reads and rendering.
+    """
+
+    api_view = None  # The sync DRF view class for the same URL
+    fallback = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # DRF views enforce CSRF themselves (for session authentication only)
+        initkwargs.setdefault('fallback', initkwargs.get('api_view', cls.api_view).as_view())
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return sync_to_async(self.fallback)(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_api_view(self, request, *args, **kwargs):
+        """An instance of the DRF view set up as its dispatch() would, without handling the request"""
+        api_view = self.api_view()
+        api_view.setup(request, *args, **kwargs)
+        api_view.request = api_view.initialize_request(request, *args, **kwargs)
+        api_view.headers = api_view.default_response_headers
+        return api_view
+
+    async def check(self, api_view, *args, **kwargs) -> None:
+        """The DRF view's authentication, permission and throttle checks; raises on failure"""
+        await sync_to_async(api_view.initial)(api_view.request, *args, **kwargs)
+
+    def error_response(self, api_view, exc, *args, **kwargs) -> HttpResponse:
+        """The rendered response the DRF view gives for an exception"""
+        response = api_view.handle_exception(exc)
+        response = api_view.finalize_response(api_view.request, response, *args, **kwargs)
+        return response.render()
+
+
+class AsyncReadView(AsyncAPIView, metaclass=abc.ABCMeta):
+    """
+    Async-native GET for a URL served by a sync DRF view
+
+    After the DRF view's checks, `get_data` (which subclasses must
+    implement) loads with the async ORM and the result is rendered
+    straight to JSON on the event loop.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        api_view = self.get_api_view(request, *args, **kwargs)
+        try:
+            await self.check(api_view, *args, **kwargs)
+            data = await self.get_data(api_view, *args, **kwargs)
+        except Exception as exc:
+            return self.error_response(api_view, exc, *args, **kwargs)
+        return json_response(data, headers=api_view.headers)
+
+    @abc.abstractmethod
+    async def get_data(self, api_view, *args, **kwargs):
+        """The response data; raise Http404 or an APIException for errors"""
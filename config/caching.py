@@ -0,0 +1,360 @@
+import functools
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from asgiref.sync import async_to_sync, sync_to_async
+from typing import Any, Awaitable, Callable, Dict, Iterable, Union
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+Tags = Union[Iterable[str], Callable[..., Iterable[str]]]
+
+
+class _Uncacheable(Exception):
+    """Raised by a view loader to hand back a response that must not be stored"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class LocalTier:
+    """
+    In-process LRU of pickled entries, bounded by total bytes and entry count
+
+    Values are stored pickled, so the size bound is exact and callers can
+    never mutate a cached value in place.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self._entries = OrderedDict()  # Key -> (expires_at, tag versions, payload)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry) -> int:
+        """Store an entry; the number of entries evicted to make room"""
+        size = len(entry[2])
+        if size > self.max_bytes // 8:
+            return 0  # One value may not push out most of the tier
+        evicted = 0
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.size += size
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        return evicted
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+
+class TwoTierCache:
+    """
+    Process-local LRU in front of the shared CACHES[CACHE_SHARED_ALIAS]
+
+    Keys are 'namespace:...'; the namespace labels the hit/miss stats.
+    Entries carry tags: `invalidate('menu')` gives the tag a new version in
+    the shared backend, and an entry stamped with an older version is a
+    miss everywhere. This process sees the new version at once; other
+    processes re-read tag versions at most every CACHE_TAG_CHECK_INTERVAL
+    seconds, which bounds how long they can serve a stale local entry.
+
+    `get_or_set` loads a missing key once: threads of this process wait for
+    the loading thread, and other processes wait (up to CACHE_LOCK_TIMEOUT)
+    on a lock key in the shared backend before loading it themselves.
+    """
+
+    def __init__(self):
+        self.local = LocalTier(
+            getattr(settings, 'CACHE_LOCAL_MAX_BYTES', 32 * 1024 * 1024),
+            getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 10000),
+        )
+        self._tag_versions = {}  # Tag -> (version, checked_at)
+        self._flights = {}  # Key -> [lock, waiters]
+        self._flights_lock = threading.Lock()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'shared')]
+
+    def _count(self, key: str, result: str) -> None:
+        from .metrics import increment
+
+        namespace = key.split(':', 1)[0]
+        with self._stats_lock:
+            self._stats[(namespace, result)] = self._stats.get((namespace, result), 0) + 1
+        increment('cache_requests_total', (namespace, result))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """This process's counts by namespace: local/shared hits, misses, sets, evictions, waits"""
+        with self._stats_lock:
+            counts = dict(self._stats)
+        stats = {}
+        for (namespace, result), count in sorted(counts.items()):
+            stats.setdefault(namespace, {})[result] = count
+        return stats
+
+    def _versions(self, tags) -> Dict[str, str]:
+        """Current version of each tag, re-read from the shared backend once stale"""
+        if not tags:
+            return {}
+        now = time.monotonic()
+        interval = getattr(settings, 'CACHE_TAG_CHECK_INTERVAL', 1.0)
+        versions = {}
+        stale = []
+        for tag in tags:
+            known = self._tag_versions.get(tag)
+            if known is not None and now - known[1] < interval:
+                versions[tag] = known[0]
+            else:
+                stale.append(tag)
+        if stale:
+            found = self.shared.get_many([f"tag:{tag}" for tag in stale])
+            for tag in stale:
+                version = found.get(f"tag:{tag}")
+                if version is None:
+                    # First use, or evicted: any entries stamped with the old version become misses
+                    self.shared.add(f"tag:{tag}", uuid.uuid4().hex, None)
+                    version = self.shared.get(f"tag:{tag}")
+                versions[tag] = version
+                self._tag_versions[tag] = (version, now)
+            if len(self._tag_versions) > getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 10000):
+                self._tag_versions.clear()
+        return versions
+
+    def _valid(self, entry) -> bool:
+        expires_at, tag_versions, payload = entry
+        return expires_at > time.time() and self._versions(tag_versions) == tag_versions
+
+    def _peek_local(self, key: str):
+        """
+        The local entry's value if it is valid without asking the shared backend, else MISSING
+
+        Only tag versions checked within CACHE_TAG_CHECK_INTERVAL are
+        trusted, so this never blocks on I/O; a miss here is not a miss of
+        the cache, just a reason to do the full lookup.
+        """
+        entry = self.local.get(key)
+        if entry is None:
+            return MISSING
+        now = time.monotonic()
+        interval = getattr(settings, 'CACHE_TAG_CHECK_INTERVAL', 1.0)
+        for tag, version in entry[1].items():
+            known = self._tag_versions.get(tag)
+            if known is None or now - known[1] >= interval or known[0] != version:
+                return MISSING
+        return pickle.loads(entry[2])
+
+    def _lookup(self, key: str):
+        """(value, 'local' or 'shared'), or (MISSING, 'miss')"""
+        entry = self.local.get(key)
+        if entry is not None and self._valid(entry):
+            return pickle.loads(entry[2]), 'local'
+        entry = self.shared.get(f"entry:{key}")
+        if entry is not None and self._valid(entry):
+            if self.local.set(key, entry):
+                self._count(key, 'evicted')
+            return pickle.loads(entry[2]), 'shared'
+        return MISSING, 'miss'
+
+    def get(self, key: str, default=MISSING):
+        value, result = self._lookup(key)
+        self._count(key, result)
+        return default if value is MISSING else value
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = (), versions=None) -> None:
+        """Store value in both tiers; `versions` are tag versions read before the value was computed"""
+        tags = sorted(tags)
+        entry = (time.time() + ttl, versions if versions is not None else self._versions(tags),
+                 pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        self.shared.set(f"entry:{key}", entry, ttl)
+        if self.local.set(key, entry):
+            self._count(key, 'evicted')
+        self._count(key, 'set')
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        self.shared.delete(f"entry:{key}")
+
+    def invalidate(self, *tags: str) -> None:
+        """Make every entry carrying any of the tags a miss"""
+        now = time.monotonic()
+        for tag in tags:
+            version = uuid.uuid4().hex
+            self.shared.set(f"tag:{tag}", version, None)
+            self._tag_versions[tag] = (version, now)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self._tag_versions.clear()
+        self.shared.clear()
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: int, tags: Iterable[str] = ()):
+        value, result = self._lookup(key)
+        if value is not MISSING:
+            self._count(key, result)
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                # Whoever held the lock before us may have just loaded it
+                value, result = self._lookup(key)
+                self._count(key, result)
+                if value is not MISSING:
+                    return value
+                return self._load(key, loader, ttl, tags)
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    async def aget_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, tags: Iterable[str] = ()):
+        """
+        get_or_set for a coroutine loader
+
+        A local-tier hit is answered on the event loop; anything that needs
+        the shared backend (a miss, or tag versions due for a re-check)
+        runs get_or_set in a worker thread.
+        """
+        value = self._peek_local(key)
+        if value is not MISSING:
+            self._count(key, 'local')
+            return value
+        return await sync_to_async(self.get_or_set)(key, async_to_sync(loader), ttl, tags)
+
+    def _load(self, key, loader, ttl, tags):
+        lock_key = f"lock:{key}"
+        timeout = getattr(settings, 'CACHE_LOCK_TIMEOUT', 10)
+        locked = self.shared.add(lock_key, 1, timeout)
+        if not locked:
+            # Another process is loading it; wait for its value rather than repeat the work
+            self._count(key, 'wait')
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self._lookup(key)[0]
+                if value is not MISSING:
+                    return value
+                if self.shared.get(lock_key) is None:
+                    break
+        try:
+            tags = sorted(tags)
+            versions = self._versions(tags)  # Read first, so an invalidation during the load wins
+            value = loader()
+            self.set(key, value, ttl, tags, versions)
+            return value
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+
+
+# Shared by every thread in this process
+shared_cache = TwoTierCache()
+
+
+def _ttl(ttl) -> int:
+    return ttl() if callable(ttl) else ttl
+
+
+def _digest(*parts) -> str:
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def view_key(namespace: str, request, per_user: bool = False) -> str:
+    """Cache key of a GET response: its absolute URL, and the user when per_user"""
+    user = request.user.pk if per_user else None
+    return f"{namespace}:view:{_digest(request.build_absolute_uri(), user)}"
+
+
+def cached(namespace: str, ttl, tags: Tags = ()):
+    """
+    Cache a service function's result per arguments
+
+    `ttl` is seconds, or a callable returning them (read at call time, so
+    it can come from settings); `tags` is a list or a callable taking the
+    function's arguments. Arguments must have a stable repr(). The wrapped
+    function stays reachable as `.uncached`.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = f"{namespace}:{name}:{_digest(args, sorted(kwargs.items()))}"
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return shared_cache.get_or_set(key, lambda: func(*args, **kwargs), _ttl(ttl), entry_tags)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def cache_view(namespace: str, ttl, tags: Tags = (), per_user: bool = False):
+    """
+    Cache a GET view's successful response data per URL (and user)
+
+    Wrap the handler, not the whole view, so DRF authentication,
+    permissions and throttles still run on every request: the inner
+    function of an @api_view, or a class view's method through
+    `method_decorator(cache_view(...), name='get')`. Only 200 responses
+    with `.data` are stored. `tags` may be a callable taking the view's
+    arguments. Set per_user for responses that depend on request.user.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            from rest_framework.response import Response
+
+            key = view_key(namespace, request, per_user)
+            entry_tags = tags(request, *args, **kwargs) if callable(tags) else tags
+
+            def load():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or not hasattr(response, 'data'):
+                    raise _Uncacheable(response)
+                return response.data
+
+            try:
+                return Response(shared_cache.get_or_set(key, load, _ttl(ttl), entry_tags))
+            except _Uncacheable as e:
+                return e.response
+        return wrapper
+    return decorator
@@ -0,0 +1,482 @@
+import bisect
+import contextvars
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import weakref
+from typing import Dict, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)  # Bytes
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Metric name -> (type, help, label names, histogram buckets)
+FAMILIES = {
+    'http_requests_total': (
+        'counter', 'Requests by route, method and status code.', ('route', 'method', 'status'), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency.', ('route', 'method'), DURATION_BUCKETS),
+    'http_response_size_bytes': (
+        'histogram', 'Response body size (streaming responses excluded).', ('route', 'method'), SIZE_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', 'Database queries per request.', ('route', 'method'), QUERY_BUCKETS),
+    'http_requests_in_flight': (
+        'gauge', 'Requests currently being handled.', (), None),
+    'cache_requests_total': (
+        'counter', 'Two-tier cache lookups and writes by namespace and result.', ('namespace', 'result'), None),
+}
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+ARCHIVE = 'archive.db'
+
+_USED = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_INITIAL_SIZE = 64 * 1024
+
+
+class Shard:
+    """
+    One writer's metric values in a memory-mapped file
+
+    Layout: the number of bytes used, then entries of (key length, JSON
+    key, padding to 8 bytes, float64 value). Only the owning thread
+    writes, so updates need no lock; an entry is complete before the used
+    size is bumped, so a reader in another process never sees half of one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self._file = open(path, 'w+b')
+        self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._values = memoryview(self._map).cast('d')
+        self._used = _USED.size
+        _USED.pack_into(self._map, 0, self._used)
+        self._slots = {}  # Key -> value index
+        self.routes = {}  # (route, method) -> value indexes for observe()
+        self.statuses = {}  # (route, method, status) -> value index
+        self.in_flight = None  # Value index of the in-flight gauge
+
+    def slot(self, key) -> int:
+        index = self._slots.get(key)
+        if index is None:
+            index = self._slots[key] = self._append(json.dumps(key).encode())
+        return index
+
+    def _append(self, encoded: bytes) -> int:
+        start = self._used
+        value_offset = start + (_LENGTH.size + len(encoded) + 7) // 8 * 8
+        if value_offset + 8 > len(self._map):
+            self._grow(value_offset + 8)
+        _LENGTH.pack_into(self._map, start, len(encoded))
+        self._map[start + _LENGTH.size:start + _LENGTH.size + len(encoded)] = encoded
+        self._values[value_offset // 8] = 0.0
+        self._used = value_offset + 8
+        _USED.pack_into(self._map, 0, self._used)
+        return value_offset // 8
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._values.release()
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._values = memoryview(self._map).cast('d')
+
+    def add(self, index: int, amount: float) -> None:
+        self._values[index] += amount
+
+    def close(self) -> None:
+        self._values.release()
+        self._map.close()
+        self._file.close()
+
+
+def read_shard(path: str) -> Dict[str, float]:
+    """Key (JSON) -> value for every complete entry of a shard file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    values = {}
+    if len(data) < _USED.size:
+        return values
+    used = min(_USED.unpack_from(data, 0)[0], len(data))
+    position = _USED.size
+    while position + _LENGTH.size <= used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        key = data[position + _LENGTH.size:position + _LENGTH.size + length].decode()
+        value_offset = position + (_LENGTH.size + length + 7) // 8 * 8
+        if value_offset + 8 > used:
+            break
+        values[key] = values.get(key, 0.0) + struct.unpack_from('<d', data, value_offset)[0]
+        position = value_offset + 8
+    return values
+
+
+def _is_gauge(key: str) -> bool:
+    return FAMILIES[json.loads(key)[0]][0] == 'gauge'
+
+
+def _owner_path(directory: str, owner: str) -> str:
+    return os.path.join(directory, f"{owner}.owner")
+
+
+def _shard_owner(path: str):
+    """Owner id ('<pid>-<boot id>') of a shard or owner file; None for the archive"""
+    name = os.path.basename(path).rsplit('.', 1)[0]
+    if path.endswith('.owner'):
+        return name
+    return name.rpartition('-')[0] or None
+
+
+def _dead_owners(directory: str) -> Dict[str, object]:
+    """
+    Owners whose process has exited, each with its owner lock taken
+
+    A process holds the lock on its owner file for as long as it runs, so
+    the lock can only be taken once it has exited. Unlike a PID check, this
+    cannot mistake a new process that reused the PID for the old one.
+    """
+    from jobs.queue import FileLock
+
+    own = _pool.owner
+    dead = {}
+    paths = glob.glob(os.path.join(directory, '*-*.db')) + glob.glob(os.path.join(directory, '*.owner'))
+    for owner in {_shard_owner(path) for path in paths} - {None, own}:
+        lock = FileLock(_owner_path(directory, owner))
+        if lock.acquire(blocking=False):
+            dead[owner] = lock
+    return dead
+
+
+def _archive_dead_shards(directory: str, dead) -> None:
+    """
+    Fold the shards of exited processes into the archive and delete them
+
+    Their counters and histograms must keep counting (Prometheus expects
+    them never to go down); their gauges are dropped.
+    """
+    dead_paths = [path for path in glob.glob(os.path.join(directory, '*-*.db')) if _shard_owner(path) in dead]
+    if dead_paths:
+        archive_path = os.path.join(directory, ARCHIVE)
+        totals = read_shard(archive_path) if os.path.exists(archive_path) else {}
+        for path in dead_paths:
+            for key, value in read_shard(path).items():
+                if not _is_gauge(key):
+                    totals[key] = totals.get(key, 0.0) + value
+
+        temporary = f"{archive_path}.{os.getpid()}.tmp"
+        archive = Shard(temporary)
+        try:
+            for key, value in totals.items():
+                archive.add(archive._append(key.encode()), value)
+        finally:
+            archive.close()
+        os.replace(temporary, archive_path)
+        for path in dead_paths:
+            os.remove(path)
+    for owner, lock in dead.items():
+        try:
+            os.remove(_owner_path(directory, owner))
+        except FileNotFoundError:
+            pass  # Shards written before owner files existed
+        lock.release()
+
+
+def collect(directory: str) -> Dict[str, float]:
+    """Values summed over every shard under `directory` (gauges from live processes only)"""
+    from jobs.queue import FileLock
+
+    if not os.path.isdir(directory):
+        return {}
+    with FileLock(os.path.join(directory, '.lock')):
+        _archive_dead_shards(directory, _dead_owners(directory))
+        paths = glob.glob(os.path.join(directory, '*.db'))
+    totals = {}
+    for path in paths:
+        live = _shard_owner(path) is not None
+        try:
+            values = read_shard(path)
+        except FileNotFoundError:
+            continue  # Archived by another scrape since the listing
+        for key, value in values.items():
+            if live or not _is_gauge(key):
+                totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_prometheus(totals: Dict[str, float]) -> str:
+    """Collected values in the Prometheus text exposition format"""
+    series = {}
+    for key, value in totals.items():
+        family, labels, part = json.loads(key)
+        series.setdefault(family, {}).setdefault(tuple(labels), {})[part] = value
+
+    lines = []
+    for family, (kind, help_text, label_names, buckets) in FAMILIES.items():
+        lines += [f"# HELP {family} {help_text}", f"# TYPE {family} {kind}"]
+        for labels, parts in sorted(series.get(family, {}).items()):
+            if kind != 'histogram':
+                lines.append(f"{family}{_labels(label_names, labels)} {parts.get(None, 0.0)}")
+                continue
+            cumulative = 0.0
+            for i, bound in enumerate(buckets + (float('inf'),)):
+                cumulative += parts.get(i, 0.0)
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{family}_bucket{_labels(label_names, labels, le=le)} {cumulative}")
+            lines.append(f"{family}_sum{_labels(label_names, labels)} {parts.get('sum', 0.0)}")
+            lines.append(f"{family}_count{_labels(label_names, labels)} {parts.get('count', 0.0)}")
+    return '\n'.join(lines) + '\n'
+
+
+class ShardPool:
+    """
+    This process's shards, each leased to one live thread at a time
+
+    A thread takes a free shard on its first write and hands it back when
+    it exits (its thread-local lease is collected), so threads that come
+    and go (runserver's thread per connection, sync_to_async executors,
+    per-sweep pools) reuse shard files instead of leaving one behind each.
+    The file count stays at the most threads this process ran at once.
+
+    Shards are named after this process's owner id, '<pid>-<boot id>', and
+    the process holds the lock on '<owner id>.owner' while it runs, so a
+    scrape can tell its shards from those of an exited process (see
+    _dead_owners).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = []
+        self._pid = None
+        self.owner = None
+        self._owner_lock = None
+
+    def lease(self) -> Shard:
+        from jobs.queue import FileLock
+
+        directory = settings.METRICS_DIR
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child starts its own shards, under an owner id of its own
+                self._pid = os.getpid()
+                self._free = []
+                os.makedirs(directory, exist_ok=True)
+                self.owner = f"{self._pid}-{uuid.uuid4().hex}"
+                self._owner_lock = FileLock(_owner_path(directory, self.owner))
+                # Under the directory lock, so no scrape sees the owner file before it is locked
+                with FileLock(os.path.join(directory, '.lock')):
+                    self._owner_lock.acquire()
+            if self._free:
+                return self._free.pop()
+            owner = self.owner
+        return Shard(os.path.join(directory, f"{owner}-{uuid.uuid4().hex[:12]}.db"))
+
+    def release(self, shard: Shard) -> None:
+        with self._lock:
+            if shard.pid == self._pid:
+                self._free.append(shard)
+
+
+# Shared by every thread in this process
+_pool = ShardPool()
+
+_local = threading.local()
+
+
+class _Lease:
+    """A thread's hold on its shard; returned to the pool when the thread's locals are cleared"""
+
+    def __init__(self, shard: Shard):
+        self.shard = shard
+        weakref.finalize(self, _pool.release, shard)
+
+
+def _shard() -> Shard:
+    lease = getattr(_local, 'lease', None)
+    if lease is None or lease.shard.pid != os.getpid():
+        lease = _local.lease = _Lease(_pool.lease())
+    return lease.shard
+
+
+def _histogram_slots(shard: Shard, family: str, labels: Tuple) -> Tuple:
+    buckets = FAMILIES[family][3]
+    return (
+        buckets,
+        [shard.slot((family, labels, i)) for i in range(len(buckets) + 1)],
+        shard.slot((family, labels, 'sum')),
+        shard.slot((family, labels, 'count')),
+    )
+
+
+def _observe(shard: Shard, slots: Tuple, value: float) -> None:
+    buckets, bucket_slots, sum_slot, count_slot = slots
+    shard.add(bucket_slots[bisect.bisect_left(buckets, value)], 1)
+    shard.add(sum_slot, value)
+    shard.add(count_slot, 1)
+
+
+def record_request(shard: Shard, route: str, method: str, status: int, seconds: float, size, queries: int) -> None:
+    """Record one finished request in this thread's shard"""
+    slots = shard.routes.get((route, method))
+    if slots is None:
+        labels = (route, method)
+        slots = shard.routes[(route, method)] = (
+            _histogram_slots(shard, 'http_request_duration_seconds', labels),
+            _histogram_slots(shard, 'http_response_size_bytes', labels),
+            _histogram_slots(shard, 'http_request_db_queries', labels),
+        )
+    status_slot = shard.statuses.get((route, method, status))
+    if status_slot is None:
+        status_slot = shard.statuses[(route, method, status)] = shard.slot(
+            ('http_requests_total', (route, method, str(status)), None)
+        )
+
+    shard.add(status_slot, 1)
+    _observe(shard, slots[0], seconds)
+    if size is not None:
+        _observe(shard, slots[1], size)
+    _observe(shard, slots[2], queries)
+
+
+def increment(family: str, labels: Tuple, amount: float = 1) -> None:
+    """Add to a counter or gauge in this thread's shard"""
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return
+    shard = _shard()
+    shard.add(shard.slot((family, labels, None)), amount)
+
+
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+connection_created.connect(_install_query_counter)
+
+
+class MetricsMiddleware:
+    """
+    Request metrics for Prometheus, shared by every worker on the host
+
+    Records per resolved URL name and method: a latency histogram, a
+    response size histogram, a DB queries per request histogram and
+    request counts by status, plus an in-flight gauge. Each thread writes
+    its own memory-mapped shard under METRICS_DIR, so recording takes no
+    lock; after a route's first request it only adds to preallocated
+    slots. `metrics_view` sums the shards of all processes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        shard, counter, reset = self._start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(reset)
+            shard.add(shard.in_flight, -1)
+        self._finish(shard, request, response, time.perf_counter() - started, counter[0])
+        return response
+
+    async def __acall__(self, request):
+        shard, counter, reset = self._start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(reset)
+            shard.add(shard.in_flight, -1)
+        self._finish(shard, request, response, time.perf_counter() - started, counter[0])
+        return response
+
+    def _start(self):
+        shard = _shard()
+        if shard.in_flight is None:
+            shard.in_flight = shard.slot(('http_requests_in_flight', (), None))
+        shard.add(shard.in_flight, 1)
+        counter = [0]
+        return shard, counter, _request_queries.set(counter)
+
+    def _finish(self, shard, request, response, seconds, queries):
+        try:
+            match = request.resolver_match
+            route = match.view_name if match is not None else 'unmatched'
+            method = request.method if request.method in METHODS else 'other'
+            size = None if response.streaming else len(response.content)
+            record_request(shard, route, method, response.status_code, seconds, size, queries)
+        except Exception as e:
+            logger.warning(f"Could not record request metrics: {str(e)}")
+
+
+def scrape_allowed(request) -> bool:
+    """Bearer METRICS_TOKEN when one is configured, otherwise local requests only"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1')
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Request metrics of every worker in Prometheus text format
+    GET /metrics/
+    """
+    if not scrape_allowed(request):
+        return JsonResponse({'detail': 'Forbidden'}, status=403)
+    return HttpResponse(
+        render_prometheus(collect(settings.METRICS_DIR)),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
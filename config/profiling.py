@@ -0,0 +1,257 @@
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Profile records, one JSON object per line (see the 'profiles' handler in LOGGING)
+profile_log = logging.getLogger('profiles')
+
+SIGNING_SALT = 'config.profiling'
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+_PLACEHOLDER_LISTS = re.compile(r'%s(?:\s*,\s*%s)+')
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def make_profile_token(stack: bool = False) -> str:
+    """
+    Value for the PROFILING_HEADER request header that forces a profile
+
+    Valid for PROFILING_TOKEN_MAX_AGE seconds; with stack=True the request
+    also runs under cProfile. From a shell:
+    `python manage.py shell -c "from config.profiling import make_profile_token; print(make_profile_token())"`
+    """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('stack' if stack else 'sql')
+
+
+def _token_mode(token: str):
+    try:
+        mode = signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 86400)
+        )
+    except signing.BadSignature:
+        return None
+    return mode if mode in ('sql', 'stack') else None
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and placeholder lists folded, so repeats of one query match"""
+    sql = _PLACEHOLDER_LISTS.sub('%s, ...', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    """Measurements for one profiled request"""
+
+    def __init__(self, reason: str):
+        self.id = uuid.uuid4().hex
+        self.reason = reason
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.queries = {}  # SQL -> [count, seconds]; fingerprinted only when written
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        self.view_started = None
+        self.render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: time every query and group it by fingerprint
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.query_seconds += elapsed
+            entry = self.queries.get(sql)
+            if entry is None:
+                self.queries[sql] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def duplicates(self, limit: int = 10):
+        grouped = {}
+        for sql, (count, seconds) in self.queries.items():
+            entry = grouped.setdefault(fingerprint(sql), [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        repeated = [(sql, count, seconds) for sql, (count, seconds) in grouped.items() if count > 1]
+        repeated.sort(key=lambda item: (item[1], item[2]), reverse=True)
+        return [{'sql': sql, 'count': count, 'ms': round(seconds * 1000, 2)}
+                for sql, count, seconds in repeated[:limit]]
+
+
+def _timed_serializer(method):
+    """Add outermost serializer calls to the current profile's serializer time"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.serializing:
+            return method(self, *args, **kwargs)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profile.serializer_seconds += time.perf_counter() - started
+            profile.serializing = False
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def _instrument_serializers():
+    from rest_framework import serializers
+
+    for cls, name in ((serializers.BaseSerializer, 'is_valid'),
+                      (serializers.Serializer, 'to_representation'),
+                      (serializers.ListSerializer, 'to_representation')):
+        method = getattr(cls, name)
+        if not getattr(method, 'profiled', False):
+            setattr(cls, name, _timed_serializer(method))
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling
+
+    Profiles a PROFILING_SAMPLE_RATE fraction of requests, plus any request
+    carrying a valid signed PROFILING_HEADER token (see make_profile_token).
+    A profile has the total, view, render and serializer times, SQL query
+    count and time, and the queries repeated within the request grouped by
+    fingerprint (N+1 patterns). Requests picked by PROFILING_STACK_RATE, or
+    by a 'stack' token, also run under cProfile and keep the top functions
+    by cumulative time. Profiles are written as JSON lines to the 'profiles'
+    logger (a rotating file); header-triggered requests get the profile id
+    back in X-Profile-Id.
+
+    Unsampled requests only pay for a header lookup and a random number,
+    so this can stay on at 1%. Removed from the stack unless
+    PROFILING_ENABLED. Queries run on other threads (the auth hashing pool)
+    are not captured.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = f"HTTP_{getattr(settings, 'PROFILING_HEADER', 'X-Profile').upper().replace('-', '_')}"
+        _instrument_serializers()
+
+    def _select(self, request):
+        """(reason, stack) for a request to profile, or None"""
+        token = request.META.get(self.header)
+        if token:
+            mode = _token_mode(token)
+            if mode is not None:
+                return 'header', mode == 'stack'
+        if random.random() < getattr(settings, 'PROFILING_STACK_RATE', 0.0):
+            return 'sample', True
+        if random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.01):
+            return 'sample', False
+        return None
+
+    def __call__(self, request):
+        selected = self._select(request)
+        if selected is None:
+            return self.get_response(request)
+        reason, stack = selected
+
+        profile = RequestProfile(reason)
+        request._profile = profile
+        profiler = cProfile.Profile() if stack else None
+        reset = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as wrappers:
+                for connection in connections.all():
+                    wrappers.enter_context(connection.execute_wrapper(profile))
+                if profiler is not None:
+                    try:
+                        profiler.enable()
+                    except ValueError:
+                        profiler = None  # Another profiler is already active on this thread
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _current.reset(reset)
+        finished = time.perf_counter()
+
+        try:
+            self._write(request, response, profile, started, finished, profiler)
+        except Exception as e:
+            logger.warning(f"Could not record request profile: {str(e)}")
+        if reason == 'header':
+            response['X-Profile-Id'] = profile.id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF responses render after this hook, so view and render time can be told apart
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+        return response
+
+    def _write(self, request, response, profile, started, finished, profiler):
+        view_ms = render_ms = None
+        if profile.view_started is not None:
+            view_ended = profile.render_started or finished
+            view_ms = round((view_ended - profile.view_started) * 1000, 2)
+            if profile.render_started is not None:
+                render_ms = round((finished - profile.render_started) * 1000, 2)
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'id': profile.id,
+            'at': datetime.now(dt_timezone.utc).isoformat(timespec='milliseconds'),
+            'reason': profile.reason,
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round((finished - started) * 1000, 2),
+            'view_ms': view_ms,
+            'render_ms': render_ms,
+            'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+            'sql': {
+                'count': profile.query_count,
+                'ms': round(profile.query_seconds * 1000, 2),
+                'duplicates': profile.duplicates(),
+            },
+        }
+        if profiler is not None:
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats('cumulative').print_stats(getattr(settings, 'PROFILING_STACK_LIMIT', 30))
+            record['stack'] = out.getvalue()
+        profile_log.info(json.dumps(record))
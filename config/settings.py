@@ -19,10 +19,78 @@ CHAPA_CALLBACK_URL = env('CHAPA_CALLBACK_URL', default='http://localhost:8000/ap
 FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
 CHAPA_WEBHOOK_SECRET = env('CHAPA_WEBHOOK_SECRET', default='')
 CHAPA_TIMEOUT = 30  # Request timeout in seconds
+CHAPA_BASE_URL = env('CHAPA_BASE_URL', default='https://api.chapa.co/v1')  # Point at run_fake_chapa for load tests
+
+# Background verification of pending Chapa payments
+CHAPA_VERIFY_CONCURRENCY = env.int('CHAPA_VERIFY_CONCURRENCY', default=16)  # Parallel gateway calls
+CHAPA_VERIFY_CALL_TIMEOUT = env.float('CHAPA_VERIFY_CALL_TIMEOUT', default=10)  # Per-call deadline in seconds
+CHAPA_VERIFY_SWEEP_TIMEOUT = env.float('CHAPA_VERIFY_SWEEP_TIMEOUT', default=120)  # Whole-sweep deadline in seconds
+CHAPA_VERIFY_BATCH_SIZE = env.int('CHAPA_VERIFY_BATCH_SIZE', default=500)  # Max pending payments per sweep
+PAYMENT_VERIFY_INITIAL_DELAY = env.int('PAYMENT_VERIFY_INITIAL_DELAY', default=600)  # Seconds before the first check
+PAYMENT_VERIFY_RETRY_BASE = env.int('PAYMENT_VERIFY_RETRY_BASE', default=300)  # Backoff after the first check, doubled
+PAYMENT_VERIFY_RETRY_MAX = env.int('PAYMENT_VERIFY_RETRY_MAX', default=6 * 3600)  # Longest gap between checks
+PAYMENT_PENDING_EXPIRY = env.int('PAYMENT_PENDING_EXPIRY', default=48 * 3600)  # Pending payments older than this are cancelled
+PAYMENT_EXPIRY_BATCH_SIZE = env.int('PAYMENT_EXPIRY_BATCH_SIZE', default=1000)  # Max payments expired per sweep
+PAYMENT_VERIFY_CACHE_TTL = env.int('PAYMENT_VERIFY_CACHE_TTL', default=5)  # Seconds a non-final verify result is reused
+PAYMENT_WEBHOOK_BATCH_SIZE = env.int('PAYMENT_WEBHOOK_BATCH_SIZE', default=200)  # Queued webhook events per batch
+PAYMENT_WEBHOOK_CLAIM_TIMEOUT = env.int('PAYMENT_WEBHOOK_CLAIM_TIMEOUT', default=300)  # Seconds before a dead processor's batch is retaken
+PAYMENT_WAIT_TIMEOUT = env.int('PAYMENT_WAIT_TIMEOUT', default=25)  # Max long-poll wait, below proxy idle timeouts
+PAYMENT_EVENTS_TIMEOUT = env.int('PAYMENT_EVENTS_TIMEOUT', default=120)  # Max lifetime of a payment SSE stream
+PAYMENT_EVENTS_HEARTBEAT = env.int('PAYMENT_EVENTS_HEARTBEAT', default=15)  # Seconds between SSE keep-alives
+PAYMENT_WAIT_DB_INTERVAL = env.float('PAYMENT_WAIT_DB_INTERVAL', default=2.0)  # Seconds between status reads while waiting
+PAYMENT_WAIT_MAX_WAITERS = env.int('PAYMENT_WAIT_MAX_WAITERS', default=1000)  # Concurrent waits per ASGI process; more get 503
+PAYMENT_POLL_RETRY = env.int('PAYMENT_POLL_RETRY', default=5)  # Seconds between polls under WSGI (no long-polls there)
+
+# Gateway resilience: retries (idempotent calls only), circuit breaker, in-flight cap
+CHAPA_RETRY_ATTEMPTS = env.int('CHAPA_RETRY_ATTEMPTS', default=3)
+CHAPA_RETRY_BASE_DELAY = env.float('CHAPA_RETRY_BASE_DELAY', default=0.5)  # Seconds, doubled per attempt
+CHAPA_RETRY_MAX_DELAY = env.float('CHAPA_RETRY_MAX_DELAY', default=5.0)
+CHAPA_BREAKER_FAILURE_RATE = env.float('CHAPA_BREAKER_FAILURE_RATE', default=0.5)  # Opens at this error rate
+CHAPA_BREAKER_MIN_CALLS = env.int('CHAPA_BREAKER_MIN_CALLS', default=10)  # Calls needed before it can open
+CHAPA_BREAKER_WINDOW = env.int('CHAPA_BREAKER_WINDOW', default=50)  # Rolling window of recent calls
+CHAPA_BREAKER_RESET_TIMEOUT = env.float('CHAPA_BREAKER_RESET_TIMEOUT', default=30)  # Seconds before a trial call
+CHAPA_MAX_IN_FLIGHT = env.int('CHAPA_MAX_IN_FLIGHT', default=32)  # Concurrent gateway requests per process
+CHAPA_IN_FLIGHT_WAIT = env.float('CHAPA_IN_FLIGHT_WAIT', default=1.0)  # Seconds to wait for a free slot
+CHAPA_POOL_SIZE = env.int('CHAPA_POOL_SIZE', default=0)  # Keep-alive connections per process (0 = CHAPA_MAX_IN_FLIGHT)
+CHAPA_METRICS_WINDOW = env.int('CHAPA_METRICS_WINDOW', default=1000)  # Recent calls kept per endpoint for percentiles
+METRICS_TOKEN = env('METRICS_TOKEN', default='')  # Bearer token for Prometheus scrapes
+
+# Background jobs (run with `python manage.py run_worker`)
+JOB_SCHEDULES = {  # Periodic task name -> interval in seconds
+    'payments.task.verify_pending_payments': 300,
+    'payments.task.process_payment_webhooks': 5,
+    'users.task.prune_expired_tokens': 3600,
+    'users.task.recover_login_journals': 300,
+}
+JOB_HEARTBEAT_INTERVAL = env.int('JOB_HEARTBEAT_INTERVAL', default=30)  # Seconds between a worker's heartbeats for its jobs
+JOB_STALE_TIMEOUT = env.int('JOB_STALE_TIMEOUT', default=300)  # Requeue running jobs without a heartbeat for this long
+JOB_RETENTION_DAYS = env.int('JOB_RETENTION_DAYS', default=7)  # Keep succeeded jobs this long
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
+JOB_LOCK_FILE = env('JOB_LOCK_FILE', default=str(BASE_DIR / '.jobs.lock'))  # Claim lock for SQLite
+LOGIN_JOURNAL_DIR = env('LOGIN_JOURNAL_DIR', default=str(BASE_DIR / '.logins'))  # Per-process login journals
+LOGIN_FLUSH_INTERVAL = env.int('LOGIN_FLUSH_INTERVAL', default=10)  # Seconds between bulk last_login writes
+LOGIN_FLUSH_MAX_USERS = env.int('LOGIN_FLUSH_MAX_USERS', default=1000)  # Flush early once this many users are pending
+
+# Per-request profiling (config.profiling.ProfilingMiddleware); off unless enabled
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.01)  # Fraction of requests profiled
+PROFILING_STACK_RATE = env.float('PROFILING_STACK_RATE', default=0.0)  # Fraction also run under cProfile
+PROFILING_STACK_LIMIT = env.int('PROFILING_STACK_LIMIT', default=30)  # Functions kept from a cProfile run
+PROFILING_HEADER = env('PROFILING_HEADER', default='X-Profile')  # Signed token forcing a profile (make_profile_token)
+PROFILING_TOKEN_MAX_AGE = env.int('PROFILING_TOKEN_MAX_AGE', default=24 * 3600)  # Seconds a token stays valid
+PROFILING_LOG_FILE = env('PROFILING_LOG_FILE', default=str(BASE_DIR / 'profiles.log'))  # JSON lines, rotated
+PROFILING_LOG_MAX_BYTES = env.int('PROFILING_LOG_MAX_BYTES', default=10 * 1024 * 1024)
+PROFILING_LOG_BACKUPS = env.int('PROFILING_LOG_BACKUPS', default=5)
+
+# Request metrics (config.metrics), scraped at /metrics/ with METRICS_TOKEN
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_DIR = env('METRICS_DIR', default=str(BASE_DIR / '.metrics'))  # Shared by the workers on a host; empty it on deploy
+
+# Async-native GET views for the hot read endpoints (config.async_views.read_view)
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=False)  # config/asgi.py turns it on
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-your-secret-key-here')
@@ -53,12 +121,15 @@ INSTALLED_APPS = [
     'menu',
     'orders',
     'address',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',  # First, so it times everything below
     'django.middleware.security.SecurityMiddleware',
+    'config.profiling.ProfilingMiddleware',  # No-op unless PROFILING_ENABLED
     'corsheaders.middleware.CorsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files
+    'config.staticfiles.WhiteNoiseMiddleware',  # For static files; async-capable
    
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +174,44 @@ if config('DATABASE_URL', default=''):
         ssl_require=True
     )
 
+# Cache (shared backends such as rediscache:// make invalidation cross-process)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+    # Second tier of config.caching; every worker must point at the same one
+    'shared': env.cache('SHARED_CACHE_URL', default=f"filecache://{BASE_DIR / '.cache'}?max_entries=20000"),
+}
+CACHE_SHARED_ALIAS = env('CACHE_SHARED_ALIAS', default='shared')
+CACHE_LOCAL_MAX_BYTES = env.int('CACHE_LOCAL_MAX_BYTES', default=32 * 1024 * 1024)  # Pickled bytes kept per process
+CACHE_LOCAL_MAX_ENTRIES = env.int('CACHE_LOCAL_MAX_ENTRIES', default=10000)
+CACHE_TAG_CHECK_INTERVAL = env.float('CACHE_TAG_CHECK_INTERVAL', default=1.0)  # Seconds other workers may miss an invalidation
+CACHE_LOCK_TIMEOUT = env.int('CACHE_LOCK_TIMEOUT', default=10)  # Seconds others wait for a key being loaded
+MENU_CACHE_TTL = env.int('MENU_CACHE_TTL', default=600)  # Seconds; cleared on menu changes
+DASHBOARD_CACHE_TTL = env.int('DASHBOARD_CACHE_TTL', default=30)  # Seconds; cleared on order changes
+ADDRESS_LIST_CACHE_TTL = env.int('ADDRESS_LIST_CACHE_TTL', default=600)  # Seconds; cleared on address changes
+# Auth caches live in the shared alias, so a user change reaches every worker
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=60)  # Seconds a loaded user is reused
+AUTH_CLAIMS_CACHE_TTL = env.int('AUTH_CLAIMS_CACHE_TTL', default=30)  # Seconds token claims are trusted without a load
+
+# Delivery quotes for saved addresses
+CAFE_LATITUDE = env.float('CAFE_LATITUDE', default=9.0054)  # Where deliveries start
+CAFE_LONGITUDE = env.float('CAFE_LONGITUDE', default=38.7636)
+DELIVERY_BASE_FEE = env.float('DELIVERY_BASE_FEE', default=30.0)
+DELIVERY_FEE_PER_KM = env.float('DELIVERY_FEE_PER_KM', default=10.0)
+DEFAULT_ADDRESS_CACHE_TTL = env.int('DEFAULT_ADDRESS_CACHE_TTL', default=3600)  # Seconds; cleared on address changes
+
+# Password hashing (PASSWORD_PBKDF2_ITERATIONS sets the default hasher's cost)
+PASSWORD_HASHERS = env.list('PASSWORD_HASHERS', default=[
+    'users.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+])
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=1_000_000)
+AUTH_HASH_THREADS = env.int('AUTH_HASH_THREADS', default=4)  # Threads running login/register per process
+AUTH_MAX_PENDING = env.int('AUTH_MAX_PENDING', default=16)  # Login/register requests admitted at once; the rest get 503
+AUTH_RETRY_AFTER = env.int('AUTH_RETRY_AFTER', default=1)  # Retry-After seconds on those 503s
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -143,7 +252,7 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
@@ -158,14 +267,21 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'config.throttling.AnonRateThrottle',
+        'config.throttling.UserRateThrottle',
+        'config.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day',
-        'user': '1000/day',
+        'anon': env('THROTTLE_ANON_RATE', default='100/day'),
+        'user': env('THROTTLE_USER_RATE', default='1000/day'),
+        'login': env('THROTTLE_LOGIN_RATE', default='10/min'),
+        'register': env('THROTTLE_REGISTER_RATE', default='5/hour'),
+        'order_create': env('THROTTLE_ORDER_CREATE_RATE', default='30/hour'),
+        'payment_wait': env('THROTTLE_PAYMENT_WAIT_RATE', default='30/min'),  # Payment wait/events requests
     }
 }
+THROTTLE_BACKEND = env('THROTTLE_BACKEND', default='sqlite')  # 'sqlite' (per host) or 'cache' (SHARED_CACHE_URL)
+THROTTLE_DB_PATH = env('THROTTLE_DB_PATH', default=str(BASE_DIR / '.throttle.sqlite3'))  # Used by the sqlite backend
 
 # JWT Configuration
 SIMPLE_JWT = {
@@ -173,7 +289,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CustomTokenRefreshSerializer',
+    'UPDATE_LAST_LOGIN': False,  # Buffered by users.logins instead
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -198,6 +315,14 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Refresh token blacklist retention and revocation lookups
+TOKEN_RETENTION_BATCH_SIZE = env.int('TOKEN_RETENTION_BATCH_SIZE', default=1000)  # Expired tokens deleted per batch
+TOKEN_REVOCATION_CAPACITY = env.int('TOKEN_REVOCATION_CAPACITY', default=100000)  # Bloom filter size in revoked tokens
+TOKEN_REVOCATION_ERROR_RATE = env.float('TOKEN_REVOCATION_ERROR_RATE', default=0.001)  # Bloom false positive rate
+TOKEN_REVOCATION_CACHE_SIZE = env.int('TOKEN_REVOCATION_CACHE_SIZE', default=10000)  # Exact answers kept per process
+TOKEN_REVOCATION_SYNC_INTERVAL = env.int('TOKEN_REVOCATION_SYNC_INTERVAL', default=5)  # Seconds between catch-up queries
+TOKEN_REVOCATION_REBUILD_INTERVAL = env.int('TOKEN_REVOCATION_REBUILD_INTERVAL', default=3600)  # Seconds between full rebuilds
+
 # CORS Configuration (Adjust for production)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -268,6 +393,10 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'raw': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
@@ -279,6 +408,14 @@ LOGGING = {
             'filename': BASE_DIR / 'debug.log',
             'formatter': 'verbose',
         },
+        'profiles': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PROFILING_LOG_FILE,
+            'maxBytes': PROFILING_LOG_MAX_BYTES,
+            'backupCount': PROFILING_LOG_BACKUPS,
+            'delay': True,  # No file until the first profile
+            'formatter': 'raw',
+        },
     },
     'loggers': {
         'django': {
@@ -291,6 +428,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'profiles': {
+            'handlers': ['profiles'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,171 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+from jobs.queue import FileLock
+from .caching import LocalTier, TwoTierCache
+from .metrics import ARCHIVE, Shard, collect
+from .throttling import CacheThrottleBackend, SQLiteThrottleBackend, gcra
+
+SHARED_LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+
+@override_settings(CACHES=SHARED_LOCMEM, CACHE_SHARED_ALIAS='shared', CACHE_TAG_CHECK_INTERVAL=60)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.cache = TwoTierCache()
+
+    def test_async_local_hit_stays_on_the_event_loop(self):
+        async def load():
+            return {'items': [1, 2]}
+
+        get = async_to_sync(self.cache.aget_or_set)
+        self.assertEqual(get('menu:list', load, 60, ('menu',)), {'items': [1, 2]})
+
+        with mock.patch('config.caching.sync_to_async') as sync_to_async:
+            self.assertEqual(get('menu:list', load, 60, ('menu',)), {'items': [1, 2]})
+        sync_to_async.assert_not_called()
+
+    def test_async_miss_after_invalidation_reloads(self):
+        values = iter([1, 2])
+
+        async def load():
+            return next(values)
+
+        get = async_to_sync(self.cache.aget_or_set)
+        self.assertEqual(get('menu:list', load, 60, ('menu',)), 1)
+        self.cache.invalidate('menu')
+        self.assertEqual(get('menu:list', load, 60, ('menu',)), 2)
+
+
+    def test_invalidation_in_another_process_reaches_this_one(self):
+        other = TwoTierCache()  # Another worker: its own local tier, the same shared backend
+        values = iter([1, 2])
+        self.assertEqual(self.cache.get_or_set('menu:list', lambda: next(values), 60, ('menu',)), 1)
+
+        other.invalidate('menu')
+        # Within the check interval the local copy may still be served...
+        self.assertEqual(self.cache.get_or_set('menu:list', lambda: next(values), 60, ('menu',)), 1)
+        # ...and once the tag is re-read it is a miss
+        with override_settings(CACHE_TAG_CHECK_INTERVAL=0):
+            self.assertEqual(self.cache.get_or_set('menu:list', lambda: next(values), 60, ('menu',)), 2)
+
+
+class LocalTierTests(SimpleTestCase):
+    def entry(self, size):
+        return (time.time() + 60, {}, b'x' * size)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        tier = LocalTier(max_bytes=1024, max_entries=2)
+        tier.set('a', self.entry(10))
+        tier.set('b', self.entry(10))
+        tier.get('a')
+
+        self.assertEqual(tier.set('c', self.entry(10)), 1)
+        self.assertIsNone(tier.get('b'))
+        self.assertIsNotNone(tier.get('a'))
+
+    def test_size_bound_counts_pickled_bytes(self):
+        tier = LocalTier(max_bytes=1000, max_entries=100)
+        for key in 'abcd':
+            tier.set(key, self.entry(100))
+        self.assertEqual(tier.size, 400)
+
+        self.assertEqual(tier.set('e', self.entry(200)), 0)  # Over an eighth of the tier: not kept
+        self.assertIsNone(tier.get('e'))
+        for key in 'fghijkl':
+            tier.set(key, self.entry(120))
+        self.assertLessEqual(tier.size, 1000)
+        self.assertIsNone(tier.get('a'))
+
+
+class GCRATests(SimpleTestCase):
+    def test_burst_then_one_per_interval(self):
+        # 5 per 10 seconds: a burst of 5, then one more every 2 seconds
+        tat = None
+        for _ in range(5):
+            tat, wait = gcra(tat, 100.0, 2.0, 10.0)
+            self.assertEqual(wait, 0)
+
+        self.assertEqual(gcra(tat, 100.0, 2.0, 10.0), (None, 2.0))
+        self.assertEqual(gcra(tat, 102.0, 2.0, 10.0)[1], 0)
+
+    def test_idle_key_starts_over(self):
+        tat, _ = gcra(None, 100.0, 2.0, 10.0)
+        self.assertEqual(gcra(tat, 1000.0, 2.0, 10.0), (1002.0, 0.0))
+
+
+@override_settings(CACHES=SHARED_LOCMEM, CACHE_SHARED_ALIAS='shared')
+class ThrottleBackendTests(SimpleTestCase):
+    def admitted(self, backend, requests=40):
+        """Requests admitted out of a concurrent burst against a limit of 5 per minute"""
+        now = time.time()
+
+        def acquire(_):
+            return backend.acquire('throttle_user_1', 12.0, 60.0, now) <= 0
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return sum(executor.map(acquire, range(requests)))
+
+    def test_cache_backend_uses_the_shared_alias(self):
+        caches['shared'].clear()
+        CacheThrottleBackend().acquire('throttle_user_1', 12.0, 60.0, time.time())
+
+        self.assertIsNotNone(caches['shared'].get('throttle_user_1'))
+        self.assertIsNone(caches['default'].get('throttle_user_1'))
+
+    def test_cache_backend_admits_the_limit_under_concurrency(self):
+        caches['shared'].clear()
+        self.assertEqual(self.admitted(CacheThrottleBackend()), 5)
+
+    def test_sqlite_backend_admits_the_limit_under_concurrency(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.assertEqual(self.admitted(SQLiteThrottleBackend(os.path.join(directory, 'throttle.sqlite3'))), 5)
+
+
+REQUESTS_KEY = ('http_requests_total', ('menu-item-list', 'GET', '200'), None)
+IN_FLIGHT_KEY = ('http_requests_in_flight', (), None)
+REQUESTS, IN_FLIGHT = json.dumps(REQUESTS_KEY), json.dumps(IN_FLIGHT_KEY)
+
+
+class CollectMetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_shard(self, owner):
+        shard = Shard(os.path.join(self.directory, f"{owner}-0123456789ab.db"))
+        shard.add(shard.slot(REQUESTS_KEY), 3)
+        shard.add(shard.slot(IN_FLIGHT_KEY), 1)
+        shard.close()
+        open(os.path.join(self.directory, f"{owner}.owner"), 'w').close()
+
+    def test_shards_of_an_exited_boot_with_this_pid_are_archived(self):
+        # The pid is reused by this process; the boot id shows the shard is not ours
+        self.write_shard(f"{os.getpid()}-{'0' * 32}")
+
+        self.assertEqual(collect(self.directory), {REQUESTS: 3})
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.lock', ARCHIVE])
+        self.assertEqual(collect(self.directory), {REQUESTS: 3})
+
+    def test_shards_of_a_live_owner_are_kept(self):
+        owner = f"4242-{'f' * 32}"
+        self.write_shard(owner)
+        lock = FileLock(os.path.join(self.directory, f"{owner}.owner"))
+        lock.acquire()
+        self.addCleanup(lock.release)
+
+        self.assertEqual(collect(self.directory), {REQUESTS: 3, IN_FLIGHT: 1})
+        self.assertNotIn(ARCHIVE, os.listdir(self.directory))
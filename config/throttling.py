@@ -0,0 +1,188 @@
+import itertools
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+
+def gcra(tat: Optional[float], now: float, interval: float, period: float) -> Tuple[Optional[float], float]:
+    """
+    One step of the generic cell rate algorithm
+
+    `tat` is the stored theoretical arrival time for the key (None if
+    unseen); a limit of N per period means interval = period / N with a
+    burst of up to N. Returns (new_tat, 0) when the request is allowed and
+    (None, seconds to wait) when it is not.
+    """
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return None, allow_at - now
+    return new_tat, 0.0
+
+
+class CacheThrottleBackend:
+    """
+    GCRA state in the shared cache (CACHE_SHARED_ALIAS), one float per key
+
+    Shared by every process that uses the same SHARED_CACHE_URL. Each
+    check holds a per-key lock taken with cache.add(), so concurrent
+    requests for one key are admitted one at a time; that is atomic where
+    add() is (Redis, Memcached, the database cache), not on the file
+    cache. A request that can't get the lock within LOCK_WAIT seconds is
+    refused: its key is that busy, so it is over the limit anyway.
+    """
+
+    LOCK_TIMEOUT = 2  # Seconds a crashed holder keeps the lock
+    LOCK_WAIT = 1.0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'shared')]
+
+    def acquire(self, key: str, interval: float, period: float, now: float) -> float:
+        store = self.cache
+        lock_key = f"{key}:lock"
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not store.add(lock_key, 1, self.LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return interval
+            time.sleep(0.005)
+        try:
+            new_tat, wait = gcra(store.get(key), now, interval, period)
+            if new_tat is not None:
+                store.set(key, new_tat, max(int(math.ceil(new_tat - now)), 1))
+        finally:
+            store.delete(lock_key)
+        return wait
+
+
+class SQLiteThrottleBackend:
+    """
+    GCRA state in a local SQLite file, one row per key
+
+    Shared by every worker process on the host. Each check is a single
+    BEGIN IMMEDIATE transaction, so concurrent workers never double-admit.
+    """
+
+    PRUNE_EVERY = 1000  # Checks between deletes of idle keys
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = itertools.count(1)  # next() is atomic, unlike += across request threads
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS throttle (key TEXT PRIMARY KEY, tat REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key: str, interval: float, period: float, now: float) -> float:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tat FROM throttle WHERE key = ?', (key,)).fetchone()
+            new_tat, wait = gcra(row[0] if row else None, now, interval, period)
+            if new_tat is not None:
+                conn.execute(
+                    'INSERT INTO throttle (key, tat) VALUES (?, ?) '
+                    'ON CONFLICT(key) DO UPDATE SET tat = excluded.tat',
+                    (key, new_tat)
+                )
+            if next(self._calls) % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM throttle WHERE tat < ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide throttle backend selected by THROTTLE_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if getattr(settings, 'THROTTLE_BACKEND', 'sqlite') == 'cache':
+                    _backend = CacheThrottleBackend()
+                else:
+                    _backend = SQLiteThrottleBackend(settings.THROTTLE_DB_PATH)
+    return _backend
+
+
+class GCRAThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle with one GCRA timestamp per key instead of a history list
+
+    Backend errors let the request through: a broken throttle store should
+    not take the API down with it.
+    """
+
+    _wait = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            self._wait = get_backend().acquire(
+                self.key, self.duration / self.num_requests, self.duration, self.timer()
+            )
+        except Exception as e:
+            logger.warning(f"Throttle backend failed for {self.key}: {str(e)}")
+            return True
+        return self._wait <= 0
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(GCRAThrottle, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(GCRAThrottle, throttling.UserRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(GCRAThrottle, throttling.ScopedRateThrottle):
+    """
+    Per-view limits from `throttle_scope`
+
+    A view can set `throttle_scope_methods` (e.g. ('POST',)) so the scope
+    only counts those methods, like order creation on a list/create view.
+    """
+
+    def allow_request(self, request, view):
+        methods = getattr(view, 'throttle_scope_methods', None)
+        if methods is not None and request.method not in methods:
+            return True
+
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job, PeriodicJob
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'locked_at', 'heartbeat_at', 'finished_at')
+    actions = ['requeue_jobs']
+    
+    @admin.action(description='Requeue selected jobs')
+    def requeue_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, last_error='', heartbeat_at=None
+        )
+        self.message_user(request, f'{updated} jobs requeued.')
+
+
+@admin.register(PeriodicJob)
+class PeriodicJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'interval', 'enabled', 'next_run_at', 'last_run_at')
+    list_filter = ('enabled',)
+    list_editable = ('enabled',)
@@ -0,0 +1,49 @@
+import signal
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.worker import Worker, run_worker_process
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue (and queue periodic jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Jobs run concurrently per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to start')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when no job is due')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        poll_interval = options['poll_interval']
+        burst = options['burst']
+
+        if options['processes'] <= 1:
+            worker = Worker(threads=threads, poll_interval=poll_interval, burst=burst)
+            signal.signal(signal.SIGTERM, worker.stop)
+            signal.signal(signal.SIGINT, worker.stop)
+            worker.run()
+            return
+
+        # Children must not inherit this process's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=run_worker_process, args=(threads, poll_interval, burst), daemon=False)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} worker processes with {threads} threads each")
+
+        def shutdown(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for process in processes:
+            process.join()
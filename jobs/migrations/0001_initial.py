@@ -0,0 +1,55 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodicJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='task name')),
+                ('interval', models.PositiveIntegerField(verbose_name='interval (seconds)')),
+                ('enabled', models.BooleanField(default=True, verbose_name='enabled')),
+                ('next_run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next run at')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='last run at')),
+            ],
+            options={
+                'verbose_name': 'periodic job',
+                'verbose_name_plural': 'periodic jobs',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='task name')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='arguments')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='keyword arguments')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='max attempts')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='run at')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='locked by')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='locked at')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+            ],
+            options={
+                'verbose_name': 'job',
+                'verbose_name_plural': 'jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='jobs_job_status_f5c023_idx'), models.Index(fields=['name', 'status'], name='jobs_job_name_282392_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """A unit of background work waiting for, or run by, a worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(_('task name'), max_length=200)
+    args = models.JSONField(_('arguments'), default=list, blank=True)
+    kwargs = models.JSONField(_('keyword arguments'), default=dict, blank=True)
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES, default='queued')
+    
+    # Retries
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    max_attempts = models.PositiveIntegerField(_('max attempts'), default=3)
+    last_error = models.TextField(_('last error'), blank=True)
+    
+    # Claiming
+    run_at = models.DateTimeField(_('run at'), default=timezone.now)
+    locked_by = models.CharField(_('locked by'), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_('locked at'), null=True, blank=True)
+    heartbeat_at = models.DateTimeField(_('heartbeat at'), null=True, blank=True)  # Refreshed by the worker mid-run
+    
+    # Timestamps
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('job')
+        verbose_name_plural = _('jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+            models.Index(fields=['name', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class PeriodicJob(models.Model):
+    """Schedule that enqueues a task every `interval` seconds"""
+    name = models.CharField(_('task name'), max_length=200, unique=True)
+    interval = models.PositiveIntegerField(_('interval (seconds)'))
+    enabled = models.BooleanField(_('enabled'), default=True)
+    next_run_at = models.DateTimeField(_('next run at'), default=timezone.now)
+    last_run_at = models.DateTimeField(_('last run at'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('periodic job')
+        verbose_name_plural = _('periodic jobs')
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} every {self.interval}s"
@@ -0,0 +1,298 @@
+import os
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Job, PeriodicJob
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+# Queued jobs inspected per claim, so jobs of a task at its concurrency
+# limit do not block others queued behind them
+CLAIM_SCAN = 20
+
+
+class FileLock:
+    """
+    Exclusive inter-process lock held on a file
+
+    Used instead of SELECT ... FOR UPDATE SKIP LOCKED on databases that
+    lack it (SQLite). Every holder opens its own handle, so threads of one
+    process exclude each other too. The operating system drops the lock
+    when its holder exits, however it exits.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._handle = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; without blocking, False if someone else holds it"""
+        self._handle = open(self.path, 'a+b')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                while True:
+                    try:
+                        self._handle.seek(0)
+                        msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        # LK_LOCK gives up after about 10 seconds; keep waiting
+                        continue
+            else:
+                import fcntl
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._handle.close()
+            self._handle = None
+            if blocking:
+                raise
+            return False
+        return True
+
+    def release(self) -> None:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _skip_locked() -> bool:
+    return connection.features.has_select_for_update_skip_locked
+
+
+@contextmanager
+def _claim_lock():
+    """
+    Serialize claiming where the database cannot skip locked rows
+
+    With row locks the section is one transaction. SQLite fails (instead of
+    waiting) when a read transaction later tries to write while another
+    connection writes, so there the section runs in autocommit under the
+    lock file and every claim is a conditional UPDATE. The lock file only
+    excludes workers on this host, which is every worker a SQLite file can
+    have.
+    """
+    if _skip_locked():
+        with transaction.atomic():
+            yield
+    else:
+        with FileLock(getattr(settings, 'JOB_LOCK_FILE', settings.BASE_DIR / '.jobs.lock')):
+            yield
+
+
+def enqueue(name: str, *args, run_at=None, **kwargs) -> Job:
+    """Queue a registered task; it runs on the next free worker at or after run_at"""
+    spec = get_task(name)
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=spec.max_attempts if spec else 3,
+    )
+
+
+def check_backend() -> None:
+    """
+    Refuse to run tasks with a concurrency limit where it can't be enforced
+
+    The capacity check is serialized by an advisory lock on PostgreSQL and
+    by the claim lock file on SQLite; elsewhere (MySQL) nothing stops two
+    workers from counting the same free slot.
+    """
+    from .registry import registered_tasks
+
+    if connection.vendor in ('postgresql', 'sqlite'):
+        return
+    limited = sorted(spec.name for spec in registered_tasks() if spec.concurrency)
+    if limited:
+        raise ImproperlyConfigured(
+            f"Task concurrency limits are enforced on PostgreSQL and SQLite only, not {connection.vendor}: "
+            f"{', '.join(limited)}"
+        )
+
+
+def _has_capacity(spec, now) -> bool:
+    """
+    Whether another job of this task may start
+
+    A run requeued for a missed heartbeat may still be alive (a stalled
+    worker, a lost connection), so it keeps its slot until its last
+    heartbeat is another JOB_STALE_TIMEOUT older.
+    """
+    if connection.vendor == 'postgresql':
+        # Serialize capacity checks for this task across workers until commit
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [spec.name])
+    possibly_live = now - timedelta(seconds=2 * getattr(settings, 'JOB_STALE_TIMEOUT', 300))
+    running = Job.objects.filter(
+        Q(status='running') | Q(status='queued', heartbeat_at__gt=possibly_live),
+        name=spec.name,
+    ).count()
+    return running < spec.concurrency
+
+
+def claim_job(worker_id: str) -> Optional[Job]:
+    """
+    Claim the next due job for this worker, or return None
+
+    Postgres/MySQL use SELECT ... FOR UPDATE SKIP LOCKED so workers never
+    wait on each other's rows; elsewhere a lock file serializes claims.
+    """
+    now = timezone.now()
+    with _claim_lock():
+        queryset = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at')
+        if _skip_locked():
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        for job in queryset[:CLAIM_SCAN]:
+            spec = get_task(job.name)
+            if spec and spec.concurrency and not _has_capacity(spec, now):
+                continue
+
+            claimed = Job.objects.filter(pk=job.pk, status='queued').update(
+                status='running', attempts=F('attempts') + 1, locked_by=worker_id, locked_at=now, heartbeat_at=now
+            )
+            if not claimed:
+                continue
+
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_at = job.heartbeat_at = now
+            return job
+
+    return None
+
+
+def _claimed(job: Job):
+    """
+    The job's row while this claim still holds it
+
+    A run whose heartbeats stop for JOB_STALE_TIMEOUT is requeued and may be
+    claimed again (by another worker, or another thread of this one, with
+    the same locked_by); the claim's attempt number tells the runs apart,
+    so a late finish never overwrites the newer run's state.
+    """
+    return Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by, attempts=job.attempts)
+
+
+def heartbeat(jobs) -> int:
+    """Note that these claimed jobs are still running; returns how many this worker still holds"""
+    now = timezone.now()
+    return sum(_claimed(job).update(heartbeat_at=now) for job in jobs)
+
+
+def run_job(job: Job) -> bool:
+    """Execute a claimed job and record the outcome; returns True on success"""
+    spec = get_task(job.name)
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task: {job.name}")
+        spec.func(*job.args, **job.kwargs)
+    except Exception as e:
+        logger.exception(f"Job {job.pk} ({job.name}) failed on attempt {job.attempts}")
+        now = timezone.now()
+        error = f"{type(e).__name__}: {str(e)}"
+        if job.attempts < job.max_attempts:
+            retry_delay = spec.retry_delay if spec else 30
+            recorded = _claimed(job).update(
+                status='queued',
+                run_at=now + timedelta(seconds=retry_delay * 2 ** (job.attempts - 1)),
+                last_error=error,
+                locked_by='',
+                locked_at=None,
+                heartbeat_at=None,
+            )
+        else:
+            recorded = _claimed(job).update(status='failed', finished_at=now, last_error=error, heartbeat_at=None)
+        if not recorded:
+            logger.warning(f"Job {job.pk} ({job.name}) was requeued as stale; its failure is not recorded")
+        return False
+
+    if not _claimed(job).update(status='succeeded', finished_at=timezone.now(), heartbeat_at=None):
+        logger.warning(f"Job {job.pk} ({job.name}) was requeued as stale; its success is not recorded")
+    return True
+
+
+def sync_schedules():
+    """Create or update PeriodicJob rows from settings.JOB_SCHEDULES"""
+    for name, interval in getattr(settings, 'JOB_SCHEDULES', {}).items():
+        periodic, created = PeriodicJob.objects.get_or_create(name=name, defaults={'interval': interval})
+        if not created and periodic.interval != interval:
+            periodic.interval = interval
+            periodic.save(update_fields=['interval'])
+
+
+def enqueue_due_periodic_jobs() -> int:
+    """Queue a run of every periodic job that is due; returns the number queued"""
+    now = timezone.now()
+    queued = 0
+    with _claim_lock():
+        queryset = PeriodicJob.objects.filter(enabled=True, next_run_at__lte=now)
+        if _skip_locked():
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        for periodic in queryset:
+            # Don't pile up runs behind one that is still waiting for a worker
+            if not Job.objects.filter(name=periodic.name, status='queued').exists():
+                enqueue(periodic.name)
+                queued += 1
+            periodic.last_run_at = now
+            periodic.next_run_at = now + timedelta(seconds=periodic.interval)
+            periodic.save(update_fields=['last_run_at', 'next_run_at'])
+
+    return queued
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Return jobs whose worker died mid-run to the queue
+
+    A live worker refreshes heartbeat_at every JOB_HEARTBEAT_INTERVAL, so
+    only runs without one for JOB_STALE_TIMEOUT are requeued, however long
+    they have been running. heartbeat_at is kept on the requeued row; see
+    _has_capacity.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'JOB_STALE_TIMEOUT', 300))
+    missed = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, locked_at__lt=cutoff)
+    return Job.objects.filter(missed, status='running').update(
+        status='queued', locked_by='', locked_at=None, run_at=now
+    )
+
+
+def prune_finished_jobs(batch_size: int = 1000) -> int:
+    """Delete one batch of succeeded jobs older than JOB_RETENTION_DAYS"""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'JOB_RETENTION_DAYS', 7))
+    ids = list(
+        Job.objects.filter(status='succeeded', finished_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    deleted, _ = Job.objects.filter(id__in=ids).delete()
+    return deleted
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+_tasks: Dict[str, 'TaskSpec'] = {}
+
+
+@dataclass
+class TaskSpec:
+    """A registered background task and its run policy"""
+    name: str
+    func: Callable
+    max_attempts: int = 3
+    retry_delay: int = 30  # Seconds before the first retry, doubled per attempt
+    concurrency: Optional[int] = None  # Max jobs of this task running at once
+
+
+def task(name: Optional[str] = None, max_attempts: int = 3, retry_delay: int = 30,
+         concurrency: Optional[int] = None):
+    """
+    Register a function as a background task
+
+    The function keeps working when called directly; `func.delay(*args,
+    **kwargs)` enqueues it instead. Arguments must be JSON serializable.
+    """
+    def decorator(func):
+        spec = TaskSpec(
+            name=name or f"{func.__module__}.{func.__name__}",
+            func=func,
+            max_attempts=max_attempts,
+            retry_delay=retry_delay,
+            concurrency=concurrency,
+        )
+        _tasks[spec.name] = spec
+
+        def delay(*args, **kwargs):
+            from .queue import enqueue
+            return enqueue(spec.name, *args, **kwargs)
+
+        func.task_name = spec.name
+        func.delay = delay
+        return func
+
+    return decorator
+
+
+def get_task(name: str) -> Optional[TaskSpec]:
+    return _tasks.get(name)
+
+
+def registered_tasks() -> List[TaskSpec]:
+    return list(_tasks.values())
+
+
+def autodiscover():
+    """Import `task`/`tasks` modules of installed apps so their tasks register"""
+    from django.utils.module_loading import autodiscover_modules
+    autodiscover_modules('task', 'tasks')
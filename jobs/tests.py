@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from .models import Job
+from .queue import check_backend, claim_job, enqueue, heartbeat, requeue_stale_jobs, run_job
+from .registry import task
+
+calls = []
+
+
+@task(name='jobs.tests.record', max_attempts=2, retry_delay=0, concurrency=1)
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.explode', max_attempts=1)
+def explode():
+    raise ValueError('boom')
+
+
+def age(job, seconds, **fields):
+    """Move the job's claim (and heartbeat) `seconds` into the past"""
+    then = timezone.now() - timedelta(seconds=seconds)
+    Job.objects.filter(pk=job.pk).update(locked_at=then, heartbeat_at=then, **fields)
+
+
+@override_settings(JOB_STALE_TIMEOUT=300)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claimed_job_runs_and_succeeds(self):
+        enqueue('jobs.tests.record', 1)
+        job = claim_job('worker-a')
+
+        self.assertTrue(run_job(job))
+        self.assertEqual(calls, [1])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIsNone(claim_job('worker-a'))
+
+    def test_failed_job_is_recorded(self):
+        enqueue('jobs.tests.explode')
+        job = claim_job('worker-a')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('boom', job.last_error)
+
+    def test_concurrency_limit_holds_second_job(self):
+        enqueue('jobs.tests.record', 1)
+        enqueue('jobs.tests.record', 2)
+
+        self.assertIsNotNone(claim_job('worker-a'))
+        self.assertIsNone(claim_job('worker-b'))
+
+    def test_long_run_with_heartbeats_is_not_requeued(self):
+        enqueue('jobs.tests.record', 1)
+        job = claim_job('worker-a')
+        age(job, 3600)
+        self.assertEqual(heartbeat([job]), 1)
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertIsNone(claim_job('worker-b'))
+
+    def test_run_without_heartbeat_is_requeued_but_keeps_its_slot(self):
+        enqueue('jobs.tests.record', 1)
+        job = claim_job('worker-a')
+        age(job, 301)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        # The first run may still be alive, so nothing of the task starts yet
+        self.assertIsNone(claim_job('worker-b'))
+
+        age(job, 601)
+        rerun = claim_job('worker-b')
+        self.assertEqual((rerun.pk, rerun.attempts), (job.pk, 2))
+
+    def test_late_finish_of_requeued_run_is_not_recorded(self):
+        enqueue('jobs.tests.record', 1)
+        job = claim_job('worker-a')
+        age(job, 601)
+        requeue_stale_jobs()
+        age(job, 601)
+        claim_job('worker-a')
+
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            run_job(job)
+
+        self.assertEqual(heartbeat([job]), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('running', 2))
+
+    def test_unsupported_backend_is_refused(self):
+        with mock.patch('jobs.queue.connection') as connection:
+            connection.vendor = 'mysql'
+            with self.assertRaises(ImproperlyConfigured):
+                check_backend()
@@ -0,0 +1,131 @@
+import os
+import time
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from .registry import autodiscover
+
+# Model-backed queue functions are imported lazily: spawned worker
+# processes import this module before Django is set up
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Claims queued jobs and runs them on a bounded thread pool
+
+    The claiming loop also does the scheduler's housekeeping: queueing due
+    periodic jobs, requeueing jobs of dead workers and pruning old ones.
+    It heartbeats the jobs this worker is running every
+    JOB_HEARTBEAT_INTERVAL seconds, however long they run, so only jobs of
+    a dead or stalled worker are requeued. Any number of workers (threads
+    or processes) can run side by side.
+    """
+
+    def __init__(self, threads: int = 4, poll_interval: float = 1.0, burst: bool = False):
+        self.threads = max(threads, 1)
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._slots = threading.Semaphore(self.threads)
+        self._running = {}  # Job pk -> claimed job
+        self._lock = threading.Lock()
+        self._last_heartbeat = time.monotonic()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def _housekeeping(self):
+        from .queue import enqueue_due_periodic_jobs, requeue_stale_jobs, prune_finished_jobs
+        try:
+            enqueue_due_periodic_jobs()
+            requeue_stale_jobs()
+            prune_finished_jobs()
+        except Exception as e:
+            logger.error(f"Worker housekeeping failed: {str(e)}")
+
+    def _execute(self, job):
+        from .queue import run_job
+        try:
+            run_job(job)
+        finally:
+            # Each pool thread owns its own connection; don't leak it
+            connection.close()
+            with self._lock:
+                self._running.pop(job.pk, None)
+            self._slots.release()
+
+    def _heartbeat(self):
+        from .queue import heartbeat
+        if time.monotonic() - self._last_heartbeat < getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 30):
+            return
+        self._last_heartbeat = time.monotonic()
+        with self._lock:
+            jobs = list(self._running.values())
+        try:
+            if jobs and heartbeat(jobs) < len(jobs):
+                logger.warning(f"Worker {self.worker_id} lost the claim on a running job; it was requeued as stale")
+        except Exception as e:
+            logger.error(f"Worker heartbeat failed: {str(e)}")
+
+    def run(self):
+        from .queue import check_backend, claim_job, sync_schedules
+        autodiscover()
+        check_backend()
+        sync_schedules()
+        logger.info(f"Worker {self.worker_id} started with {self.threads} threads")
+
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='job-worker')
+        last_housekeeping = 0.0
+        try:
+            while not self._stop.is_set():
+                self._heartbeat()
+
+                if time.monotonic() - last_housekeeping >= max(self.poll_interval, 1.0):
+                    self._housekeeping()
+                    last_housekeeping = time.monotonic()
+
+                if not self._slots.acquire(timeout=self.poll_interval):
+                    continue
+
+                job = claim_job(self.worker_id)
+                if job is None:
+                    self._slots.release()
+                    with self._lock:
+                        idle = not self._running
+                    if self.burst and idle:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                with self._lock:
+                    self._running[job.pk] = job
+                executor.submit(self._execute, job)
+        finally:
+            # Jobs still running are waited for, and kept from looking stale meanwhile
+            while True:
+                with self._lock:
+                    if not self._running:
+                        break
+                self._heartbeat()
+                time.sleep(0.1)
+            executor.shutdown(wait=True)
+            connection.close()
+            logger.info(f"Worker {self.worker_id} stopped")
+
+
+def run_worker_process(threads: int, poll_interval: float, burst: bool):
+    """Entry point for worker processes started by `manage.py run_worker --processes`"""
+    import signal
+    import django
+    django.setup()
+
+    worker = Worker(threads=threads, poll_interval=poll_interval, burst=burst)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent forwards shutdown as SIGTERM
+    worker.run()
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from config.caching import shared_cache
+from .models import Category, MenuItem
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu(sender, instance, **kwargs):
+    """Any menu change drops every cached menu response"""
+    transaction.on_commit(lambda: shared_cache.invalidate('menu'))
@@ -1,10 +1,12 @@
 from django.urls import path
+from config.async_views import read_view
 from .views import CategoryListAPIView, MenuItemListAPIView, MenuItemDetailAPIView, MenuItemCreateAPIView,MenuItemUpdateDestroyAPIView
+from .views import AsyncMenuItemListView, AsyncMenuItemDetailView
 
 urlpatterns = [
     path('categories/', CategoryListAPIView.as_view(), name='category-list'),
-    path('items/', MenuItemListAPIView.as_view(), name='menu-item-list'),
-    path('items/<int:pk>/', MenuItemDetailAPIView.as_view(), name='menu-item-detail'),
+    path('items/', read_view(MenuItemListAPIView, AsyncMenuItemListView), name='menu-item-list'),
+    path('items/<int:pk>/', read_view(MenuItemDetailAPIView, AsyncMenuItemDetailView), name='menu-item-detail'),
     # ✅ ADD THESE TWO LINES
     path('items/create/', MenuItemCreateAPIView.as_view(), name='menu-item-create'),
     path('items/<int:pk>/update/', MenuItemUpdateDestroyAPIView.as_view(), name='menu-item-update'),
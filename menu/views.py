@@ -1,6 +1,13 @@
+from functools import partial
 from rest_framework import generics, filters
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from django.utils.decorators import method_decorator
+from config.async_views import AsyncReadView
+from config.caching import cache_view, shared_cache, view_key
 from .models import Category, MenuItem
 from .serializers import CategorySerializer, MenuItemSerializer
 from rest_framework import permissions
@@ -20,6 +27,13 @@ class MenuItemUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         instance.is_available = False
         instance.save()
 
+def menu_cache_ttl():
+    return getattr(settings, 'MENU_CACHE_TTL', 600)
+
+# Public menu reads are served from the two-tier cache until the menu changes (see menu.signals)
+cache_menu = method_decorator(cache_view('menu', ttl=menu_cache_ttl, tags=('menu',)), name='get')
+
+@cache_menu
 class CategoryListAPIView(generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -27,6 +41,7 @@ class CategoryListAPIView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category_type']
 
+@cache_menu
 class MenuItemListAPIView(generics.ListAPIView):
     queryset = MenuItem.objects.filter(is_available=True)
     serializer_class = MenuItemSerializer
@@ -37,7 +52,43 @@ class MenuItemListAPIView(generics.ListAPIView):
     ordering_fields = ['price', 'name', 'created_at']
     ordering = ['category', 'name']
 
+@cache_menu
 class MenuItemDetailAPIView(generics.RetrieveAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
\ No newline at end of file
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+
+class AsyncMenuItemListView(AsyncReadView):
+    """Async GET for MenuItemListAPIView under ASGI; shares its cache entries"""
+    api_view = MenuItemListAPIView
+
+    async def get_data(self, api_view, *args, **kwargs):
+        return await shared_cache.aget_or_set(
+            view_key('menu', api_view.request), partial(self.load, api_view), menu_cache_ttl(), ('menu',)
+        )
+
+    async def load(self, api_view):
+        # The filter backends may validate against the database (e.g. ?category=)
+        queryset = await sync_to_async(api_view.filter_queryset)(
+            api_view.get_queryset().select_related('category')
+        )
+        items = [item async for item in queryset]
+        return MenuItemSerializer(items, many=True, context=api_view.get_serializer_context()).data
+
+
+class AsyncMenuItemDetailView(AsyncReadView):
+    """Async GET for MenuItemDetailAPIView under ASGI; shares its cache entries"""
+    api_view = MenuItemDetailAPIView
+
+    async def get_data(self, api_view, *args, **kwargs):
+        return await shared_cache.aget_or_set(
+            view_key('menu', api_view.request), partial(self.load, api_view, kwargs['pk']),
+            menu_cache_ttl(), ('menu',)
+        )
+
+    async def load(self, api_view, pk):
+        item = await api_view.get_queryset().select_related('category').filter(pk=pk).afirst()
+        if item is None:
+            raise Http404(f"No {MenuItem._meta.object_name} matches the given query.")
+        return MenuItemSerializer(item, context=api_view.get_serializer_context()).data
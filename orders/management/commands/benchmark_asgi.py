@@ -0,0 +1,284 @@
+import asyncio
+import importlib.util
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from menu.models import MenuItem
+from orders.models import Order
+from payments.metrics import percentile
+from payments.models import Payment
+from users.models import User
+from users.serializers import CustomTokenObtainPairSerializer
+
+# URL name -> how its requests are built (see Command._requests)
+ROUTES = {
+    'menu-item-list': 'anonymous',
+    'menu-item-detail': 'menu_item',
+    'order-detail': 'order',
+    'order-tracking': 'order',
+    'payments:payment-status': 'payment',
+}
+
+SERVERS = ('wsgi', 'asgi')
+
+
+def _server_command(kind, port, options):
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--bind', f"127.0.0.1:{port}", '--worker-class', 'gthread',
+            '--workers', str(options['workers']), '--threads', str(options['threads']),
+            '--backlog', '2048', '--keep-alive', '75', '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(options['workers']),
+        '--backlog', '2048', '--timeout-keep-alive', '75', '--no-access-log', '--log-level', 'warning',
+    ]
+
+
+async def _read_response(reader):
+    """(status, keep-alive) of one HTTP/1.1 response, with its body consumed"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') != 'close'
+
+
+async def _connection(port, requests, offset, deadline, record):
+    """One client connection sending requests back to back until the deadline"""
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        request = requests[i % len(requests)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            record(time.perf_counter() - started, None)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        record(time.perf_counter() - started, status)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, requests, connections, duration):
+    """Latencies (seconds) of successful responses and the error count over `duration` seconds"""
+    latencies = []
+    errors = [0]
+
+    def record(seconds, status):
+        if status is not None and status < 400:
+            latencies.append(seconds)
+        else:
+            errors[0] += 1
+
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        _connection(port, requests, n, deadline, record) for n in range(connections)
+    ))
+    return latencies, errors[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the hot read endpoints under ASGI (async views, uvicorn) against the sync DRF '
+        'views under WSGI (gunicorn, gthread): requests/s and p50/p95/p99 latency at a number of '
+        'concurrent keep-alive connections. Runs both servers against the configured database, '
+        'which must hold data (see seed_scale). Needs gunicorn and uvicorn[standard] installed. '
+        'Under ASGI, DRF authentication, permissions and throttling still run in a worker thread '
+        '(one hop per request); local cache hits and the async ORM reads run on the event loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=15.0, help='Timed seconds per route and server')
+        parser.add_argument('--warmup', type=float, default=3.0, help='Untimed seconds per route first')
+        parser.add_argument('--workers', type=int, default=2, help='Server processes for both servers')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--actors', type=int, default=100, help='Customers (and records) requests rotate over')
+        parser.add_argument('--routes', default='', help=f"Only these URL names (from {', '.join(ROUTES)})")
+        parser.add_argument('--servers', default=','.join(SERVERS), help='Comma-separated: wsgi, asgi')
+        parser.add_argument('--output', default='', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        self.options = options
+        for module in ('gunicorn', 'uvicorn'):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed (pip install gunicorn 'uvicorn[standard]')")
+        routes = [name.strip() for name in options['routes'].split(',') if name.strip()] or list(ROUTES)
+        unknown = [name for name in routes if name not in ROUTES]
+        if unknown:
+            raise CommandError(f"Unknown route(s) {', '.join(unknown)} (choose from {', '.join(ROUTES)})")
+        servers = [kind.strip() for kind in options['servers'].split(',') if kind.strip()]
+        if any(kind not in SERVERS for kind in servers):
+            raise CommandError(f"--servers takes {' and '.join(SERVERS)}")
+
+        requests = {name: self._requests(name, ROUTES[name]) for name in routes}
+        results = {}
+        self.stdout.write(
+            f"{'route':<26} {'server':<6} {'requests':>9} {'req/s':>9} {'p50 (ms)':>9} "
+            f"{'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'errors':>7}"
+        )
+        for kind in servers:
+            with tempfile.TemporaryDirectory(prefix=f"benchmark_asgi_{kind}_") as scratch:
+                server = self._start(kind, scratch)
+                try:
+                    for name in routes:
+                        stats = self._run(requests[name])
+                        results.setdefault(name, {})[kind] = stats
+                        self.stdout.write(
+                            f"{name:<26} {kind:<6} {stats['requests']:>9} {stats['rps']:>9.1f} "
+                            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+                            f"{stats['max_ms']:>9.2f} {stats['errors']:>7}"
+                        )
+                finally:
+                    self._stop(server)
+
+        if set(servers) == set(SERVERS):
+            self.stdout.write('')
+            for name, by_server in results.items():
+                wsgi, asgi = by_server['wsgi'], by_server['asgi']
+                self.stdout.write(
+                    f"{name:<26} ASGI/WSGI throughput x{asgi['rps'] / max(wsgi['rps'], 0.001):.2f}, "
+                    f"p99 {wsgi['p99_ms']:.1f} -> {asgi['p99_ms']:.1f} ms"
+                )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'at': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+                    'options': {key: options[key] for key in
+                                ('connections', 'duration', 'warmup', 'workers', 'threads', 'actors')},
+                    'routes': results,
+                }, f, indent=2, sort_keys=True)
+                f.write('\n')
+
+    def _requests(self, name, kind):
+        """Raw HTTP requests for a route, rotating over records and their owners"""
+        actors = self.options['actors']
+        if kind == 'anonymous':
+            calls = [(None, {})]
+        elif kind == 'menu_item':
+            menu_items = MenuItem.objects.order_by('id').values_list('id', flat=True)[:actors]
+            calls = [(None, {'pk': pk}) for pk in menu_items]
+        elif kind == 'order':
+            calls = [(customer_id, {'pk': pk}) for customer_id, pk in
+                     self._per_customer(Order.objects.values_list('customer_id', 'id'))]
+        else:
+            calls = [(customer_id, {'id': pk}) for customer_id, pk in
+                     self._per_customer(Payment.objects.values_list('customer_id', 'id'))]
+        if not calls:
+            raise CommandError(f"No records for {name}; seed the database first (python manage.py seed_scale)")
+
+        tokens = {}
+        requests = []
+        for user_id, kwargs in calls:
+            lines = [f"GET {reverse(name, kwargs=kwargs or None)} HTTP/1.1", 'Host: 127.0.0.1',
+                     'Accept: application/json']
+            if user_id is not None:
+                if user_id not in tokens:
+                    user = User.objects.get(pk=user_id)
+                    tokens[user_id] = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+                lines.append(f"Authorization: Bearer {tokens[user_id]}")
+            requests.append(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        return requests
+
+    def _per_customer(self, rows):
+        """First row for each of up to --actors customers"""
+        picked = {}
+        for row in rows.order_by('pk').iterator(chunk_size=2000):
+            picked.setdefault(row[0], row)
+            if len(picked) >= self.options['actors']:
+                break
+        return list(picked.values())
+
+    def _start(self, kind, scratch):
+        env = dict(os.environ)
+        # Both servers get the same throttling-free, cold-cache setup; only the view stack differs
+        env.update({
+            'THROTTLE_ANON_RATE': '1000000000/day',
+            'THROTTLE_USER_RATE': '1000000000/day',
+            'THROTTLE_DB_PATH': os.path.join(scratch, 'throttle.sqlite3'),
+            'METRICS_DIR': os.path.join(scratch, 'metrics'),
+            'SHARED_CACHE_URL': f"filecache://{os.path.join(scratch, 'cache')}",
+            'ALLOWED_HOSTS': '127.0.0.1',
+            'DEBUG': 'False',
+        })
+        if kind == 'wsgi':
+            env.pop('ASYNC_READ_VIEWS', None)
+        server = subprocess.Popen(_server_command(kind, self.options['port'], self.options),
+                                  cwd=str(settings.BASE_DIR), env=env)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The {kind} server exited with status {server.returncode}")
+            try:
+                with socket.create_connection(('127.0.0.1', self.options['port']), timeout=1):
+                    return server
+            except OSError:
+                time.sleep(0.2)
+        self._stop(server)
+        raise CommandError(f"The {kind} server did not start listening within 60s")
+
+    def _stop(self, server):
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+    def _run(self, requests):
+        options = self.options
+        asyncio.run(_load(options['port'], requests, options['connections'], options['warmup']))
+        latencies, errors = asyncio.run(
+            _load(options['port'], requests, options['connections'], options['duration'])
+        )
+        if not latencies:
+            raise CommandError(f"No successful responses ({errors} errors)")
+        latencies = [seconds * 1000 for seconds in latencies]
+        return {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / options['duration'], 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+            'errors': errors,
+        }
@@ -0,0 +1,531 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from contextlib import nullcontext
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import URLResolver, get_resolver, reverse
+from address.models import UserAddress
+from config.caching import shared_cache
+from menu.models import Category, MenuItem
+from orders.models import Order
+from payments.metrics import percentile
+from payments.models import Payment
+from users.logins import login_tracker
+from users.models import User
+from users.serializers import CustomTokenObtainPairSerializer
+from .seed_scale import SEED_PASSWORD
+
+# Dataset presets for --sizes (passed to seed_scale)
+SIZES = {
+    'small': {'users': 200, 'orders': 2000},
+    'medium': {'users': 2000, 'orders': 50000},
+    'large': {'users': 20000, 'orders': 500000},
+}
+
+# (URL name, method, request builder on Dataset). Every route under api/
+# needs at least one entry; the command refuses to run otherwise.
+ROUTES = (
+    ('token_obtain_pair', 'post', 'login'),
+    ('token_refresh', 'post', 'refresh'),
+    ('register', 'post', 'register'),
+    ('user_detail', 'get', 'customer'),
+    ('update_user', 'patch', 'update_user'),
+    ('user_list', 'get', 'staff'),
+    ('category-list', 'get', 'anonymous'),
+    ('menu-item-list', 'get', 'anonymous'),
+    ('menu-item-detail', 'get', 'menu_item'),
+    ('menu-item-create', 'post', 'create_menu_item'),
+    ('menu-item-update', 'patch', 'update_menu_item'),
+    ('order-list-create', 'get', 'customer'),
+    ('order-list-create', 'post', 'create_order'),
+    ('order-detail', 'get', 'order'),
+    ('order-tracking', 'get', 'order'),
+    ('order-status-update', 'patch', 'cancel_order'),
+    ('dashboard-stats', 'get', 'staff'),
+    ('analytics', 'get', 'staff'),
+    ('cafe-order-list', 'get', 'staff'),
+    ('cafe-order-update', 'patch', 'advance_order'),
+    ('payments:initialize-payment', 'post', 'initialize_payment'),
+    ('payments:verify-payment', 'get', 'paid_tx_ref'),
+    ('payments:wait-payment', 'get', 'wait_payment'),
+    ('payments:payment-events', 'get', 'wait_payment'),
+    ('payments:payment-status', 'get', 'payment'),
+    ('payments:payment-history', 'get', 'customer'),
+    ('payments:gateway-health', 'get', 'staff'),
+    ('payments:gateway-metrics', 'get', 'metrics_scrape'),
+    ('payments:webhook', 'post', 'webhook'),
+    ('address-list-create', 'get', 'customer'),
+    ('address-list-create', 'post', 'create_address'),
+    ('default-address', 'get', 'address_owner'),
+    ('address-detail', 'get', 'address'),
+    ('set-default-address', 'patch', 'address'),
+)
+
+# These run on the auth hashing pool (another thread and connection), so
+# they can't share the rollback transaction; their rows are left behind
+NO_ROLLBACK = {'token_obtain_pair', 'register'}
+
+STAFF_USERS = 10
+
+
+def api_route_names():
+    """URL names of every route under api/, namespaced like 'payments:webhook'"""
+    names = set()
+
+    def walk(patterns, prefix, namespace):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, route,
+                     f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace)
+            elif route.startswith('api/') and pattern.name:
+                names.add(namespace + pattern.name)
+
+    walk(get_resolver().url_patterns, '', '')
+    return names
+
+
+class QueryCounter:
+    """
+    execute_wrapper counting queries on every connection
+
+    Installed on connections as they open, so queries from pool threads
+    (login, register) are counted too. Requests run one at a time, so the
+    difference across a request is that request's count.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Dataset:
+    """
+    Request builders over a seeded database
+
+    Each builder takes the iteration number and returns the call: acting
+    user (None for anonymous), URL kwargs, body or query string and extra
+    request headers. Customers and records rotate with the iteration so
+    per-user throttles and caches behave like real traffic.
+    """
+
+    def __init__(self, actors):
+        self.sequence = 0
+        self.customers = self._per_customer(
+            Order.objects.filter(customer__is_staff=False).values_list('customer_id', 'id'), actors
+        )
+        self.cancellable = self._per_customer(
+            Order.objects.filter(status__in=['pending', 'confirmed']).values_list('customer_id', 'id'), actors
+        )
+        self.paid = self._per_customer(
+            Payment.objects.filter(status='completed').values_list('customer_id', 'id', 'tx_ref'), actors
+        )
+        self.unpaid = self._per_customer(
+            Payment.objects.filter(status='pending', checkout_url__isnull=False)
+            .values_list('customer_id', 'order_id', 'amount'), actors
+        )
+        self.addresses = self._per_customer(UserAddress.objects.values_list('user_id', 'id'), actors)
+        self.menu_items = list(MenuItem.objects.order_by('id').values_list('id', flat=True)[:actors])
+        self.category_id = Category.objects.order_by('id').values_list('id', flat=True).first()
+        self.staff_ids = self._create_staff()
+        self._tokens = {}
+
+    def _per_customer(self, rows, limit):
+        """First row for each of up to `limit` users"""
+        picked = {}
+        for row in rows.order_by('pk').iterator(chunk_size=2000):
+            picked.setdefault(row[0], row)
+            if len(picked) >= limit:
+                break
+        return list(picked.values())
+
+    def _create_staff(self):
+        password = make_password(SEED_PASSWORD)
+        first = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        User.objects.bulk_create([
+            User(pk=pk, username=f"benchstaff{pk}", email=f"benchstaff{pk}@bench.local", password=password,
+                 is_staff=True, is_cafe_staff=True, is_customer=False)
+            for pk in range(first, first + STAFF_USERS)
+        ])
+        return list(range(first, first + STAFF_USERS))
+
+    def _pick(self, rows, i, what):
+        if not rows:
+            raise CommandError(f"The dataset has no {what}; use a larger size")
+        return rows[i % len(rows)]
+
+    def token(self, user_id):
+        if user_id not in self._tokens:
+            user = User.objects.get(pk=user_id)
+            self._tokens[user_id] = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        return self._tokens[user_id]
+
+    def anonymous(self, i):
+        return {}
+
+    def customer(self, i):
+        return {'user': self._pick(self.customers, i, 'customers with orders')[0]}
+
+    def staff(self, i):
+        return {'user': self.staff_ids[i % len(self.staff_ids)]}
+
+    def login(self, i):
+        user = User.objects.get(pk=self._pick(self.customers, i, 'customers with orders')[0])
+        return {'data': {'username': user.username, 'password': SEED_PASSWORD}}
+
+    def refresh(self, i):
+        # Refresh tokens rotate and are blacklisted after use, so each call gets a fresh one
+        user = User.objects.get(pk=self._pick(self.customers, i, 'customers with orders')[0])
+        return {'data': {'refresh': str(CustomTokenObtainPairSerializer.get_token(user))}}
+
+    def register(self, i):
+        self.sequence += 1
+        username = f"benchnew{self.sequence}"
+        return {'data': {'username': username, 'email': f"{username}@bench.local",
+                         'password': SEED_PASSWORD, 'password2': SEED_PASSWORD}}
+
+    def update_user(self, i):
+        return dict(self.customer(i), data={'first_name': f"Bench{i}"})
+
+    def menu_item(self, i):
+        return {'kwargs': {'pk': self._pick(self.menu_items, i, 'menu items')}}
+
+    def create_menu_item(self, i):
+        return dict(self.staff(i), data={'name': f"Bench item {i}", 'price': '120.00',
+                                         'category': self.category_id, 'preparation_time': 10})
+
+    def update_menu_item(self, i):
+        return dict(self.staff(i), kwargs=self.menu_item(i)['kwargs'], data={'price': '130.00'})
+
+    def create_order(self, i):
+        items = [{'menu_item': self.menu_items[(i + n) % len(self.menu_items)], 'quantity': n + 1}
+                 for n in range(3)]
+        return dict(self.customer(i), data={
+            'items': items, 'delivery_address': 'Bole Road, Addis Ababa', 'delivery_latitude': '8.99',
+            'delivery_longitude': '38.79', 'phone_number': '+251900000000', 'payment_method': 'cash',
+        })
+
+    def order(self, i):
+        user_id, order_id = self._pick(self.customers, i, 'customers with orders')
+        return {'user': user_id, 'kwargs': {'pk': order_id}}
+
+    def cancel_order(self, i):
+        user_id, order_id = self._pick(self.cancellable, i, 'pending orders')
+        return {'user': user_id, 'kwargs': {'pk': order_id}, 'data': {'action': 'cancel'}}
+
+    def advance_order(self, i):
+        return dict(self.staff(i), kwargs=self.order(i)['kwargs'], data={'status': 'confirmed'})
+
+    def initialize_payment(self, i):
+        # Already-initialized payments answer with their checkout URL, without calling Chapa
+        user_id, order_id, amount = self._pick(self.unpaid, i, 'pending Chapa payments')
+        return {'user': user_id, 'data': {'order_id': order_id, 'amount': str(amount)}}
+
+    def paid_tx_ref(self, i):
+        user_id, _, tx_ref = self._pick(self.paid, i, 'completed payments')
+        return {'user': user_id, 'kwargs': {'tx_ref': tx_ref}}
+
+    def wait_payment(self, i):
+        return dict(self.paid_tx_ref(i), query={'timeout': 0})
+
+    def payment(self, i):
+        user_id, payment_id, _ = self._pick(self.paid, i, 'completed payments')
+        return {'user': user_id, 'kwargs': {'id': payment_id}}
+
+    def metrics_scrape(self, i):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        extra = {'REMOTE_ADDR': '127.0.0.1'}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+        return {'extra': extra}
+
+    def webhook(self, i):
+        _, _, tx_ref = self._pick(self.paid, i, 'completed payments')
+        return {'data': {'event': 'charge.success', 'data': {'tx_ref': tx_ref, 'status': 'success'}}}
+
+    def create_address(self, i):
+        return dict(self.customer(i), data={'address_type': 'other', 'label': f"Bench {i}",
+                                            'full_address': 'Bole Road, Addis Ababa',
+                                            'latitude': '8.990000', 'longitude': '38.790000'})
+
+    def address_owner(self, i):
+        return {'user': self._pick(self.addresses, i, 'saved addresses')[0]}
+
+    def address(self, i):
+        user_id, address_id = self._pick(self.addresses, i, 'saved addresses')
+        return {'user': user_id, 'kwargs': {'pk': address_id}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API route against seeded datasets of several sizes: query count, '
+        'p50/p95 latency and peak memory per route. Compares with a baseline JSON and fails '
+        'when a route regresses past the threshold. Runs against throwaway test databases.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small', help=f"Comma-separated: {', '.join(SIZES)}")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route first')
+        parser.add_argument('--route-budget', type=float, default=30.0,
+                            help='Seconds per route after which remaining iterations are skipped')
+        parser.add_argument('--actors', type=int, default=100, help='Customers (and records) requests rotate over')
+        parser.add_argument('--routes', default='', help='Only these URL names (comma-separated)')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'endpoints.json'))
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write these results to the baseline instead of comparing')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative increase of p95 latency and peak memory')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='p95 increases smaller than this never count as regressions')
+        parser.add_argument('--query-slack', type=int, default=0, help='Extra queries allowed per route')
+
+    def handle(self, *args, **options):
+        self.options = options
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = [size for size in sizes if size not in SIZES]
+        if unknown:
+            raise CommandError(f"Unknown size(s) {', '.join(unknown)} (choose from {', '.join(SIZES)})")
+        routes = self._routes(options['routes'])
+
+        for connection in connections.all():
+            if connection.vendor == 'sqlite':
+                # In-memory shared-cache SQLite fails writers on other threads with "table is locked"
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    tempfile.gettempdir(), f"benchmark_endpoints_{connection.alias}.sqlite3"
+                )
+        self.counter = QueryCounter()
+        connection_created.connect(self.counter.install)
+        throttle_db = os.path.join(tempfile.gettempdir(), f"benchmark_endpoints_throttle_{os.getpid()}.sqlite3")
+        shared_cache_dir = tempfile.mkdtemp(prefix='benchmark_endpoints_cache_')
+        caches_setting = {**settings.CACHES, getattr(settings, 'CACHE_SHARED_ALIAS', 'shared'): {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': shared_cache_dir,
+        }}
+        self.request_sequence = 0
+
+        results = {}
+        failures = []
+        try:
+            # Gateway routes never reach Chapa here (see Dataset), but the client needs a key to exist
+            with override_settings(THROTTLE_DB_PATH=throttle_db, CACHES=caches_setting,
+                                   CHAPA_SECRET_KEY=getattr(settings, 'CHAPA_SECRET_KEY', '') or 'benchmark'):
+                for size in sizes:
+                    results[size] = self._run_size(size, routes, failures)
+        finally:
+            connection_created.disconnect(self.counter.install)
+            shutil.rmtree(shared_cache_dir, ignore_errors=True)
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(throttle_db + suffix):
+                    os.remove(throttle_db + suffix)
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f"{len(failures)} route(s) did not return a successful response")
+
+        if options['update_baseline']:
+            self._save_baseline(results)
+            return
+
+        baseline = self._load_baseline()
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --update-baseline to create one")
+            return
+        regressions = self._compare(baseline, results)
+        if regressions:
+            self.stdout.write(self.style.ERROR('Regressions against the baseline:'))
+            for regression in regressions:
+                self.stdout.write(f"  {regression}")
+            raise CommandError(f"{len(regressions)} regression(s) past the threshold")
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def _routes(self, only):
+        defined = {name for name, _, _ in ROUTES}
+        missing = sorted(api_route_names() - defined)
+        if missing:
+            raise CommandError(f"No benchmark defined for route(s): {', '.join(missing)}")
+        if not only:
+            return ROUTES
+        wanted = {name.strip() for name in only.split(',') if name.strip()}
+        unknown = wanted - defined
+        if unknown:
+            raise CommandError(f"Unknown route(s): {', '.join(sorted(unknown))}")
+        return [route for route in ROUTES if route[0] in wanted]
+
+    def _run_size(self, size, routes, failures):
+        preset = SIZES[size]
+        self.stdout.write(f"\n{size}: seeding {preset['users']} users, {preset['orders']} orders ...")
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command('seed_scale', seed=self.options['seed'], stdout=StringIO(), **preset)
+            for connection in connections.all():
+                self.counter.install(connection=connection)
+            dataset = Dataset(self.options['actors'])
+
+            self.stdout.write(
+                f"{'route':<38} {'n':>4} {'queries':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'peak (KiB)':>11}"
+            )
+            measured = {}
+            for name, method, builder in routes:
+                key = f"{method.upper()} {name}"
+                # Every route starts cold, so its query count doesn't depend on what ran before it
+                cache.clear()
+                shared_cache.clear()
+                stats, error = self._measure(dataset, name, method, getattr(dataset, builder))
+                if error:
+                    failures.append(f"{size} {key}: {error}")
+                    continue
+                measured[key] = stats
+                self.stdout.write(
+                    f"{key:<38} {stats['samples']:>4} {stats['queries']:>7} {stats['p50_ms']:>9.2f} "
+                    f"{stats['p95_ms']:>9.2f} {stats['peak_kib']:>11.1f}"
+                )
+            return measured
+        finally:
+            login_tracker.flush()
+            teardown_databases(old_config, verbosity=0)
+
+    def _measure(self, dataset, name, method, builder):
+        options = self.options
+        latencies = []
+        queries = 0
+        spent = 0.0
+        i = 0
+        while len(latencies) < options['iterations']:
+            # A slow route stops early once over budget, but always gets one timed sample
+            if spent > options['route_budget']:
+                if latencies:
+                    break
+                i = max(i, options['warmup'])
+            status_code, elapsed, count, content = self._request(dataset, name, method, builder(i))
+            if status_code >= 400:
+                return None, f"HTTP {status_code}: {content[:200]!r}"
+            spent += elapsed
+            if i >= options['warmup']:
+                latencies.append(elapsed * 1000)
+                queries = max(queries, count)
+            i += 1
+
+        # One more call under tracemalloc: it slows everything down, so it's kept out of the timings
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+            self._request(dataset, name, method, builder(i))
+            peak = tracemalloc.get_traced_memory()[1] - baseline_memory
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'samples': len(latencies),
+            'queries': queries,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'peak_kib': round(peak / 1024, 1),
+        }, None
+
+    def _request(self, dataset, name, method, call):
+        """Send one request; returns (status, seconds, queries, body)"""
+        self.request_sequence += 1
+        n = self.request_sequence
+        # A distinct client address per request keeps the per-IP throttles out of the measurement
+        extra = {'REMOTE_ADDR': f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"}
+        if call.get('user') is not None:
+            extra['HTTP_AUTHORIZATION'] = f"Bearer {dataset.token(call['user'])}"
+        extra.update(call.get('extra', {}))
+        path = reverse(name, kwargs=call.get('kwargs'))
+        client = Client(raise_request_exception=False)
+
+        # Writes are rolled back so every iteration sees the same dataset
+        with nullcontext() if name in NO_ROLLBACK else transaction.atomic():
+            queries_before = self.counter.count
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(path, call.get('query'), **extra)
+            else:
+                response = getattr(client, method)(path, json.dumps(call.get('data', {})),
+                                                   content_type='application/json', **extra)
+            if response.streaming:
+                with warnings.catch_warnings():
+                    # The sync test client drains async streams (SSE) itself; expected here
+                    warnings.simplefilter('ignore')
+                    content = b''.join(response)
+            else:
+                content = response.content
+            elapsed = time.perf_counter() - started
+            queries = self.counter.count - queries_before
+            if name not in NO_ROLLBACK:
+                transaction.set_rollback(True)
+        return response.status_code, elapsed, queries, content
+
+    def _load_baseline(self):
+        if not os.path.exists(self.options['baseline']):
+            return None
+        with open(self.options['baseline']) as f:
+            return json.load(f)
+
+    def _save_baseline(self, results):
+        baseline = self._load_baseline() or {'sizes': {}, 'routes': {}}
+        for size, measured in results.items():
+            baseline['sizes'][size] = SIZES[size]
+            baseline['routes'].setdefault(size, {}).update(measured)
+        baseline['updated_at'] = datetime.now(dt_timezone.utc).isoformat(timespec='seconds')
+        baseline['seed'] = self.options['seed']
+        os.makedirs(os.path.dirname(self.options['baseline']) or '.', exist_ok=True)
+        with open(self.options['baseline'], 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Baseline written to {self.options['baseline']}"))
+
+    def _compare(self, baseline, results):
+        threshold = self.options['threshold']
+        regressions = []
+        for size, measured in results.items():
+            if baseline.get('sizes', {}).get(size) != SIZES[size]:
+                self.stdout.write(f"No baseline for the {size} dataset; skipped")
+                continue
+            previous_routes = baseline['routes'].get(size, {})
+            for key, stats in measured.items():
+                previous = previous_routes.get(key)
+                if previous is None:
+                    continue
+                if stats['queries'] > previous['queries'] + self.options['query_slack']:
+                    regressions.append(f"{size} {key}: queries {previous['queries']} -> {stats['queries']}")
+                if (stats['p95_ms'] > previous['p95_ms'] * (1 + threshold)
+                        and stats['p95_ms'] - previous['p95_ms'] >= self.options['min_delta_ms']):
+                    regressions.append(
+                        f"{size} {key}: p95 {previous['p95_ms']:.2f}ms -> {stats['p95_ms']:.2f}ms "
+                        f"(+{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:.0f}%)"
+                    )
+                # Small allocations are noisy; only flag growth past 64 KiB
+                if (stats['peak_kib'] > previous['peak_kib'] * (1 + threshold)
+                        and stats['peak_kib'] - previous['peak_kib'] >= 64):
+                    regressions.append(
+                        f"{size} {key}: peak memory {previous['peak_kib']:.0f} -> {stats['peak_kib']:.0f} KiB"
+                    )
+        return regressions
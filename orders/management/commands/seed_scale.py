@@ -0,0 +1,359 @@
+import json
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from address.models import UserAddress
+from menu.models import Category, MenuItem
+from orders.models import Order, OrderItem
+from payments.models import Payment, PaymentWebhook
+from users.models import User, CustomerStats
+
+# Fixed end of the generated timeline, so a seed always produces the same rows
+DEFAULT_UNTIL = '2026-01-01'
+
+SEED_PASSWORD = 'SeedUser!2345'
+
+CATEGORY_NAMES = {
+    'food': ['Breakfast', 'Burgers', 'Pasta', 'Salads', 'Sandwiches', 'Pizza', 'Traditional', 'Desserts'],
+    'drink': ['Coffee', 'Tea', 'Juices', 'Smoothies', 'Soft Drinks'],
+}
+
+# Final state mix of historical orders
+ORDER_STATUS_WEIGHTS = (('delivered', 88), ('cancelled', 7), ('pending', 1), ('confirmed', 1),
+                        ('preparing', 1), ('ready', 1), ('on_the_way', 1))
+
+PAYMENT_STATUS_FOR_ORDER = {'delivered': 'completed', 'cancelled': 'failed'}
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _sqlite_adapter(field):
+    """Convert a value the way Django's SQLite backend stores it, minus the per-value dispatch"""
+    kind = (field.target_field if field.is_relation else field).get_internal_type()
+    if kind == 'DateTimeField':
+        return lambda value: None if value is None else str(value.astimezone(dt_timezone.utc).replace(tzinfo=None))
+    if kind == 'DecimalField':
+        return lambda value: None if value is None else str(value)
+    if kind == 'UUIDField':
+        return lambda value: None if value is None else value.hex
+    if kind == 'JSONField':
+        return json.dumps
+    return None
+
+
+class RowWriter:
+    """
+    Insert rows (dicts keyed by attname) for one model
+
+    Uses bulk_create, except on SQLite: there bulk_create's per-field
+    preparation keeps it CPU-bound near 10k rows/s, so rows go straight to
+    executemany with the same column encoding. Missing columns take the
+    field default.
+    """
+
+    def __init__(self, model, batch_size):
+        self.model = model
+        self.batch_size = batch_size
+        self.fields = model._meta.concrete_fields
+        self.count = 0
+        self.elapsed = 0.0
+        self.raw = connection.vendor == 'sqlite'
+        if self.raw:
+            quote = connection.ops.quote_name
+            self.sql = (
+                f"INSERT INTO {quote(model._meta.db_table)} "
+                f"({', '.join(quote(field.column) for field in self.fields)}) "
+                f"VALUES ({', '.join('%s' for _ in self.fields)})"
+            )
+            self.adapters = [_sqlite_adapter(field) for field in self.fields]
+
+    def write(self, rows):
+        started = time.monotonic()
+        if self.raw:
+            defaults = {}
+            for field in self.fields:
+                if field.attname not in rows[0]:
+                    defaults[field.attname] = field.get_default()
+            columns = [(field.attname, adapter) for field, adapter in zip(self.fields, self.adapters)]
+            values = [
+                tuple(
+                    (adapter(row.get(name, defaults.get(name))) if adapter else row.get(name, defaults.get(name)))
+                    for name, adapter in columns
+                )
+                for row in rows
+            ]
+            with connection.cursor() as cursor:
+                for start in range(0, len(values), self.batch_size):
+                    cursor.executemany(self.sql, values[start:start + self.batch_size])
+        else:
+            self.model.objects.bulk_create([self.model(**row) for row in rows], batch_size=self.batch_size)
+        self.count += len(rows)
+        self.elapsed += time.monotonic() - started
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let generated created_at/updated_at values through bulk_create (auto_now* would overwrite them)"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic, production-shaped dataset (users, addresses, menu, orders, '
+        'order items, payments, webhooks) with batched inserts. Appends after existing rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=12, help='Up to 13')
+        parser.add_argument('--menu-items', type=int, default=150)
+        parser.add_argument('--max-addresses', type=int, default=3, help='Saved addresses per user (0..N)')
+        parser.add_argument('--max-items', type=int, default=5, help='Items per order (1..N)')
+        parser.add_argument('--chapa-rate', type=float, default=0.6,
+                            help='Fraction of orders paid through Chapa (with payments and webhooks)')
+        parser.add_argument('--days', type=int, default=365, help='Length of the order history')
+        parser.add_argument('--until', default=DEFAULT_UNTIL, help='Date the history ends (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--chunk-size', type=int, default=100000, help='Orders per transaction')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.until = datetime.strptime(options['until'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+        self.since = self.until - timedelta(days=options['days'])
+        self.writers = {}
+        started = time.monotonic()
+
+        with self._fast_inserts(), manual_timestamps(User, UserAddress, Category, MenuItem, Order,
+                                                     Payment, PaymentWebhook, CustomerStats):
+            user_ids = self._insert_all(User, self._users())
+            self._insert_all(UserAddress, self._addresses(user_ids))
+            category_ids = self._insert_all(Category, self._categories())
+            self.menu = list(self._menu_items(category_ids))
+            self._insert_all(MenuItem, iter(self.menu))
+            self.menu = [(row['id'], row['price']) for row in self.menu]
+
+            # Parents before children within each transaction, ids ascending
+            self.stats = {}
+            for chunk in _chunks(self._orders(user_ids), options['chunk_size']):
+                payments = list(self._payments(chunk))
+                with transaction.atomic():
+                    self._writer(Order).write([order for order, _, _ in chunk])
+                    self._writer(OrderItem).write(list(self._order_items(chunk)))
+                    if payments:
+                        self._writer(Payment).write(payments)
+                        webhooks = list(self._webhooks(payments))
+                        if webhooks:
+                            self._writer(PaymentWebhook).write(webhooks)
+                self.stdout.write(f"  orders: {self._writer(Order).count}", ending='\r')
+                self.stdout.flush()
+
+            self._insert_all(CustomerStats, self._customer_stats())
+
+        self.stdout.write(f"{'table':<28} {'rows':>12} {'seconds':>9} {'rows/s':>10}")
+        for model, writer in self.writers.items():
+            rate = writer.count / writer.elapsed if writer.elapsed else 0
+            self.stdout.write(f"{model._meta.db_table:<28} {writer.count:>12} {writer.elapsed:>9.1f} {rate:>10.0f}")
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.monotonic() - started:.1f}s"))
+
+    @contextmanager
+    def _fast_inserts(self):
+        if connection.vendor != 'sqlite':
+            yield
+            return
+        # A throwaway dataset: trade durability for insert speed while seeding
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA cache_size=-262144')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous=FULL')
+
+    def _writer(self, model):
+        if model not in self.writers:
+            self.writers[model] = RowWriter(model, self.options['batch_size'])
+        return self.writers[model]
+
+    def _insert_all(self, model, rows):
+        """Insert rows in chunk-sized transactions; returns their primary keys"""
+        pk_name = model._meta.pk.attname
+        ids = []
+        for chunk in _chunks(rows, self.options['chunk_size']):
+            with transaction.atomic():
+                self._writer(model).write(chunk)
+            ids.extend(row[pk_name] for row in chunk)
+        return ids
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def _moment(self, start=None):
+        start = start or self.since
+        return start + timedelta(seconds=self.rng.random() * (self.until - start).total_seconds())
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _street(self):
+        return f"{self.rng.randint(1, 999)} Street {self.rng.randint(1, 300)}, Addis Ababa"
+
+    def _users(self):
+        password = make_password(SEED_PASSWORD)
+        first = self._next_id(User)
+        for pk in range(first, first + self.options['users']):
+            joined = self._moment(self.since - timedelta(days=self.options['days']))
+            yield {
+                'id': pk, 'username': f"user{pk}", 'email': f"user{pk}@seed.example", 'password': password,
+                'first_name': f"First{pk % 997}", 'last_name': f"Last{pk % 991}",
+                'phone_number': f"+2519{pk % 100000000:08d}", 'is_customer': True,
+                'is_cafe_staff': pk % 500 == 0, 'is_staff': pk % 500 == 0, 'date_joined': joined, 'last_login': joined,
+            }
+
+    def _addresses(self, user_ids):
+        pk = self._next_id(UserAddress)
+        kinds = [kind for kind, _ in UserAddress.ADDRESS_TYPES]
+        for user_id in user_ids:
+            for n in range(self.rng.randint(0, self.options['max_addresses'])):
+                created = self._moment()
+                yield {
+                    'id': pk, 'user_id': user_id, 'address_type': kinds[n % len(kinds)],
+                    'label': f"Address {n + 1}", 'full_address': self._street(),
+                    'latitude': Decimal(f"{8.95 + self.rng.random() * 0.1:.6f}"),
+                    'longitude': Decimal(f"{38.70 + self.rng.random() * 0.12:.6f}"),
+                    'is_default': n == 0, 'created_at': created, 'updated_at': created,
+                }
+                pk += 1
+
+    def _categories(self):
+        names = [(kind, name) for kind, group in CATEGORY_NAMES.items() for name in group]
+        pk = self._next_id(Category)
+        for offset, (kind, name) in enumerate(names[:self.options['categories']]):
+            yield {'id': pk + offset, 'name': name, 'category_type': kind,
+                   'created_at': self.since, 'updated_at': self.since}
+
+    def _menu_items(self, category_ids):
+        first = self._next_id(MenuItem)
+        for pk in range(first, first + self.options['menu_items']):
+            yield {
+                'id': pk, 'name': f"Item {pk}", 'category_id': category_ids[pk % len(category_ids)],
+                'price': Decimal(f"{self.rng.randint(40, 900)}.{self.rng.choice(['00', '50'])}"),
+                'is_available': self.rng.random() > 0.05, 'preparation_time': self.rng.randint(5, 40),
+                'image': '', 'created_at': self.since, 'updated_at': self.since,
+            }
+
+    def _orders(self, user_ids):
+        """Yield (order row, [(menu item id, price, quantity)], paid through Chapa)"""
+        statuses, weights = zip(*ORDER_STATUS_WEIGHTS)
+        first = self._next_id(Order)
+        rng = self.rng
+        for pk in range(first, first + self.options['orders']):
+            customer_id = rng.choice(user_ids)
+            created = self._moment()
+            status = rng.choices(statuses, weights)[0]
+            lines = []
+            total = Decimal('0')
+            for _ in range(rng.randint(1, self.options['max_items'])):
+                item_id, price = rng.choice(self.menu)
+                quantity = rng.randint(1, 3)
+                lines.append((item_id, price, quantity))
+                total += price * quantity
+            chapa = rng.random() < self.options['chapa_rate']
+            delivered_at = created + timedelta(minutes=rng.randint(25, 90)) if status == 'delivered' else None
+
+            if delivered_at is not None:
+                entry = self.stats.get(customer_id)
+                if entry is None:
+                    self.stats[customer_id] = [1, total, delivered_at]
+                else:
+                    entry[0] += 1
+                    entry[1] += total
+                    entry[2] = max(entry[2], delivered_at)
+
+            order = {
+                'id': pk, 'customer_id': customer_id, 'order_number': f"S{pk:012d}", 'status': status,
+                'payment_method': 'online' if chapa else 'cash',
+                'payment_status': chapa and status == 'delivered', 'total_amount': total,
+                'delivery_address': self._street(), 'phone_number': f"+2519{customer_id % 100000000:08d}",
+                'delivery_distance': round(rng.uniform(0.5, 12), 2), 'created_at': created,
+                'confirmed_at': created + timedelta(minutes=2) if status not in ('pending', 'cancelled') else None,
+                'delivered_at': delivered_at,
+                'cancelled_at': created + timedelta(minutes=5) if status == 'cancelled' else None,
+            }
+            yield order, lines, chapa
+
+    def _order_items(self, chunk):
+        for order, lines, _ in chunk:
+            for item_id, price, quantity in lines:
+                yield {'order_id': order['id'], 'menu_item_id': item_id, 'quantity': quantity,
+                       'price': price, 'special_request': ''}
+
+    def _payments(self, chunk):
+        for order, _, chapa in chunk:
+            if not chapa:
+                continue
+            payment_status = PAYMENT_STATUS_FOR_ORDER.get(order['status'], 'pending')
+            payment_id = self._uuid()
+            created = order['created_at']
+            paid_at = created + timedelta(minutes=3)
+            yield {
+                'id': payment_id, 'order_id': order['id'], 'customer_id': order['customer_id'],
+                'amount': order['total_amount'], 'payment_method': 'chapa', 'status': payment_status,
+                'tx_ref': f"TX-{order['id']}-{payment_id.hex[:8]}",
+                'chapa_transaction_id': f"CH{payment_id.hex[:16]}" if payment_status == 'completed' else None,
+                'checkout_url': f"https://checkout.chapa.co/checkout/payment/{payment_id.hex}",
+                'created_at': created, 'updated_at': paid_at,
+                'paid_at': paid_at if payment_status == 'completed' else None,
+                'next_check_at': created + timedelta(minutes=10) if payment_status == 'pending' else None,
+                'metadata': {},
+            }
+
+    def _webhooks(self, payments):
+        for payment in payments:
+            if payment['status'] == 'pending':
+                continue
+            event = 'charge.success' if payment['status'] == 'completed' else 'charge.failed'
+            received = payment['updated_at']
+            yield {
+                'id': self._uuid(), 'payment_id': payment['id'], 'event_type': event, 'tx_ref': payment['tx_ref'],
+                'payload': {'event': event, 'tx_ref': payment['tx_ref'],
+                            'status': 'success' if payment['status'] == 'completed' else 'failed'},
+                'headers': {}, 'is_verified': True, 'received_at': received,
+                'processed_at': received + timedelta(seconds=2),
+            }
+
+    def _customer_stats(self):
+        # Every customer here was inserted by this run (no signals), so none has a row yet
+        for user_id, (count, spend, last_order_at) in sorted(self.stats.items()):
+            yield {'user_id': user_id, 'lifetime_orders': count, 'lifetime_spend': spend,
+                   'last_order_at': last_order_at, 'updated_at': self.until}
@@ -53,6 +53,13 @@ class Order(models.Model):
     def __str__(self):
         return f"Order #{self.order_number} - {self.customer.username}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a save tell whether the order just became (or stopped being) delivered
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
             import uuid
@@ -3,6 +3,12 @@ from .models import Order, OrderItem
 from menu.serializers import MenuItemSerializer
 from users.serializers import UserSerializer
 
+# Everything the tracking endpoint reads from an order
+TRACKING_FIELDS = (
+    'id', 'order_number', 'status', 'created_at', 'confirmed_at', 'prepared_at',
+    'dispatched_at', 'delivered_at', 'cancelled_at'
+)
+
 class OrderItemSerializer(serializers.ModelSerializer):
     menu_item_details = MenuItemSerializer(source='menu_item', read_only=True)
     
@@ -49,6 +55,14 @@ class OrderSerializer(serializers.ModelSerializer):
         order.save()
         return order
 
+class OrderTrackingSerializer(serializers.ModelSerializer):
+    """Status and timeline of an order, for polling while it is on its way"""
+    status_progress = serializers.IntegerField(source='get_status_progress', read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = TRACKING_FIELDS + ('status_progress',)
+
 class OrderCreateSerializer(serializers.Serializer):
     items = serializers.ListField(
         child=serializers.DictField(),
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from config.caching import shared_cache
+from users.models import CustomerStats
+from .models import Order, OrderItem
+
+
+@receiver(post_save, sender=Order)
+def update_customer_stats(sender, instance, created, **kwargs):
+    """Keep CustomerStats in step as orders move in and out of 'delivered'
+
+    The loaded status only decides whether to look: another request may have
+    changed the row since it was read, so the totals are recomputed from the
+    orders themselves rather than adjusted by one.
+    """
+    loaded_status = getattr(instance, '_loaded_status', None)
+    if instance.status == 'delivered' or (not created and loaded_status != instance.status):
+        CustomerStats.refresh_for(instance.customer_id)
+
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def remove_deleted_order_from_stats(sender, instance, **kwargs):
+    if 'delivered' in (getattr(instance, '_loaded_status', None), instance.status):
+        CustomerStats.refresh_for(instance.customer_id, create=False)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_dashboard(sender, instance, **kwargs):
+    """Order creation, status changes and cancellations drop the cached admin stats"""
+    transaction.on_commit(lambda: shared_cache.invalidate('dashboard'))
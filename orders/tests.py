@@ -1,3 +1,51 @@
+from decimal import Decimal
 from django.test import TestCase
+from users.models import CustomerStats, User
+from .models import Order
 
-# Create your tests here.
+
+class CustomerStatsTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='regular', email='regular@example.com', password='pass')
+        self.order = Order.objects.create(
+            customer=self.customer, status='on_the_way', total_amount=Decimal('120.00'),
+            delivery_address='Bole', phone_number='0911000000',
+        )
+
+    def stats(self):
+        return CustomerStats.objects.values_list('lifetime_orders', 'lifetime_spend').get(user=self.customer)
+
+    def test_delivery_saved_twice_from_stale_copies_counts_once(self):
+        # Two requests that both loaded the order before either marked it delivered
+        first, second = Order.objects.get(pk=self.order.pk), Order.objects.get(pk=self.order.pk)
+        for order in (first, second):
+            order.status = 'delivered'
+            order.save()
+
+        self.assertEqual(self.stats(), (1, Decimal('120.00')))
+
+    def test_undelivered_and_deleted_orders_are_taken_back(self):
+        self.order.status = 'delivered'
+        self.order.save()
+        other = Order.objects.create(
+            customer=self.customer, status='delivered', total_amount=Decimal('30.00'),
+            delivery_address='Bole', phone_number='0911000000',
+        )
+        self.assertEqual(self.stats(), (2, Decimal('150.00')))
+
+        stale = Order.objects.get(pk=self.order.pk)
+        stale.status = 'cancelled'
+        stale.save()
+        stale.save()
+        self.assertEqual(self.stats(), (1, Decimal('30.00')))
+
+        other.delete()
+        self.assertEqual(self.stats(), (0, Decimal('0.00')))
+
+    def test_deleting_a_customer_with_delivered_orders(self):
+        self.order.status = 'delivered'
+        self.order.save()
+
+        self.customer.delete()
+
+        self.assertFalse(CustomerStats.objects.exists())
@@ -1,14 +1,17 @@
 from django.urls import path
+from config.async_views import read_view
 from . import views
 from .views import dashboard_stats, analytics_data
 from .views import (OrderListCreateAPIView, OrderDetailAPIView, 
                    OrderStatusUpdateAPIView, CafeOrderListAPIView,
-                   CafeOrderUpdateAPIView, CafeOrderListAPIView, CafeOrderDetailAPIView)
+                   CafeOrderUpdateAPIView, CafeOrderListAPIView, CafeOrderDetailAPIView,
+                   OrderTrackingAPIView, AsyncOrderDetailView, AsyncOrderTrackingView)
 
 urlpatterns = [
     # Customer endpoints
     path('', OrderListCreateAPIView.as_view(), name='order-list-create'),
-    path('<int:pk>/', OrderDetailAPIView.as_view(), name='order-detail'),
+    path('<int:pk>/', read_view(OrderDetailAPIView, AsyncOrderDetailView), name='order-detail'),
+    path('<int:pk>/track/', read_view(OrderTrackingAPIView, AsyncOrderTrackingView), name='order-tracking'),
     path('<int:pk>/status/', OrderStatusUpdateAPIView.as_view(), name='order-status-update'),
     path('admin/dashboard-stats/', dashboard_stats, name='dashboard-stats'),
     path('admin/analytics/', analytics_data, name='analytics'),
@@ -2,11 +2,16 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import api_view, permission_classes
+from django.conf import settings
 from django.utils import timezone
 from rest_framework.permissions import IsAdminUser
+from django.http import Http404
+from config.async_views import AsyncReadView
+from config.caching import cached, cache_view
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderCreateSerializer
+from .serializers import OrderSerializer, OrderCreateSerializer, OrderTrackingSerializer, TRACKING_FIELDS
 from menu.models import MenuItem
+from address.defaults import get_default_address
 from django.db.models import Count, Sum, Avg, F, Q
 from users.models import User
 from datetime import timedelta
@@ -38,12 +43,25 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'payment_method', 'payment_status']
+    throttle_scope = 'order_create'
+    throttle_scope_methods = ('POST',)
     
     def get_queryset(self):
         return Order.objects.filter(customer=self.request.user)
     
     def create(self, request, *args, **kwargs):
-        create_serializer = OrderCreateSerializer(data=request.data)
+        data = request.data
+        default_address = None
+        if not data.get('delivery_address'):
+            # Deliver to the saved default address (cached with its quote) unless one is given
+            default_address = get_default_address(request.user.id)
+            if default_address is not None:
+                data = data.copy()
+                data['delivery_address'] = default_address['full_address']
+                data['delivery_latitude'] = default_address['latitude']
+                data['delivery_longitude'] = default_address['longitude']
+        
+        create_serializer = OrderCreateSerializer(data=data)
         if create_serializer.is_valid():
             # Create order with user instance, not just ID
             order_data = {
@@ -55,6 +73,9 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
                 'phone_number': create_serializer.validated_data['phone_number'],
                 'payment_method': create_serializer.validated_data['payment_method'],
             }
+            if default_address is not None:
+                order_data['delivery_distance'] = default_address['quote']['distance_km']
+                order_data['delivery_fee'] = default_address['quote']['fee']
             
             # Create order first
             order = Order.objects.create(**order_data)
@@ -110,6 +131,39 @@ class OrderDetailAPIView(generics.RetrieveUpdateAPIView):
     def get_queryset(self):
         return Order.objects.filter(customer=self.request.user)
 
+class AsyncOrderDetailView(AsyncReadView):
+    """Async GET for OrderDetailAPIView under ASGI (updates still go to it)"""
+    api_view = OrderDetailAPIView
+    
+    async def get_data(self, api_view, *args, **kwargs):
+        order = await api_view.get_queryset().select_related('customer').prefetch_related(
+            'items__menu_item__category'
+        ).filter(pk=kwargs['pk']).afirst()
+        if order is None:
+            raise Http404(f"No {Order._meta.object_name} matches the given query.")
+        return OrderSerializer(order, context=api_view.get_serializer_context()).data
+
+class OrderTrackingAPIView(generics.RetrieveAPIView):
+    """
+    Status and timeline of one of the user's orders
+    GET /api/orders/{id}/track/
+    """
+    serializer_class = OrderTrackingSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return Order.objects.filter(customer=self.request.user).only(*TRACKING_FIELDS)
+
+class AsyncOrderTrackingView(AsyncReadView):
+    """Async GET for OrderTrackingAPIView under ASGI"""
+    api_view = OrderTrackingAPIView
+    
+    async def get_data(self, api_view, *args, **kwargs):
+        order = await api_view.get_queryset().filter(pk=kwargs['pk']).afirst()
+        if order is None:
+            raise Http404(f"No {Order._meta.object_name} matches the given query.")
+        return OrderTrackingSerializer(order, context=api_view.get_serializer_context()).data
+
 class OrderStatusUpdateAPIView(generics.UpdateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -164,6 +218,8 @@ class CafeOrderUpdateAPIView(generics.UpdateAPIView):
                 instance.prepared_at = timezone.now()
             elif new_status == 'on_the_way':
                 instance.dispatched_at = timezone.now()
+            elif new_status == 'delivered':
+                instance.delivered_at = timezone.now()
             
             instance.status = new_status
             instance.save()
@@ -173,81 +229,87 @@ class CafeOrderUpdateAPIView(generics.UpdateAPIView):
     
 
 
+@cached('dashboard', ttl=lambda: getattr(settings, 'DASHBOARD_CACHE_TTL', 30), tags=('dashboard', 'menu'))
+def dashboard_summary():
+    """Admin dashboard figures; cached until orders or the menu change, or DASHBOARD_CACHE_TTL seconds"""
+    # Calculate basic stats
+    total_orders = Order.objects.count()
+    pending_orders = Order.objects.filter(
+        status__in=['pending', 'confirmed', 'preparing', 'ready', 'on_the_way']
+    ).count()
+    total_users = User.objects.count()
+    
+    # Menu items count by category type
+    total_foods = MenuItem.objects.filter(category__category_type='food').count()
+    total_drinks = MenuItem.objects.filter(category__category_type='drink').count()
+    
+    # Revenue calculation
+    delivered_orders = Order.objects.filter(status='delivered')
+    total_revenue = delivered_orders.aggregate(total=Sum('total_amount'))['total'] or 0
+    avg_order_value = delivered_orders.aggregate(avg=Avg('total_amount'))['avg'] or 0
+    
+    # Delivered today
+    today = timezone.now().date()
+    delivered_today = delivered_orders.filter(
+        delivered_at__date=today
+    ).count()
+    
+    # Recent orders with customer details
+    recent_orders = Order.objects.select_related('customer').order_by('-created_at')[:5]
+    
+    # Top products - FIXED: Calculate revenue correctly
+    top_products = OrderItem.objects.select_related(
+        'menu_item',
+        'menu_item__category'
+    ).values(
+        'menu_item__id',
+        'menu_item__name',
+        'menu_item__category__category_type'
+    ).annotate(
+        total_sold=Sum('quantity'),
+        total_revenue=Sum(F('price') * F('quantity'))  # FIXED: Multiply price by quantity
+    ).order_by('-total_sold')[:5]
+    
+    stats = {
+        'total_orders': total_orders,
+        'pending_orders': pending_orders,
+        'total_users': total_users,
+        'total_foods': total_foods,
+        'total_drinks': total_drinks,
+        'total_revenue': float(total_revenue),
+        'average_order_value': float(avg_order_value),
+        'delivered_today': delivered_today,
+        'recent_orders': [
+            {
+                'id': order.id,
+                'order_number': order.order_number,
+                'customer': order.customer.username if order.customer else 'Guest',
+                'customer_email': order.customer.email if order.customer else '',
+                'status': order.status,
+                'total_amount': float(order.total_amount),
+                'created_at': order.created_at.isoformat(),
+            }
+            for order in recent_orders
+        ],
+        'top_products': [
+            {
+                'id': item['menu_item__id'],
+                'name': item['menu_item__name'] or 'Unknown',
+                'type': item['menu_item__category__category_type'] or 'unknown',
+                'sales_count': item['total_sold'] or 0,
+                'revenue': float(item['total_revenue'] or 0),
+            }
+            for item in top_products
+        ]
+    }
+    return stats
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def dashboard_stats(request):
     try:
-        # Calculate basic stats
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(
-            status__in=['pending', 'confirmed', 'preparing', 'ready', 'on_the_way']
-        ).count()
-        total_users = User.objects.count()
-        
-        # Menu items count by category type
-        total_foods = MenuItem.objects.filter(category__category_type='food').count()
-        total_drinks = MenuItem.objects.filter(category__category_type='drink').count()
-        
-        # Revenue calculation
-        delivered_orders = Order.objects.filter(status='delivered')
-        total_revenue = delivered_orders.aggregate(total=Sum('total_amount'))['total'] or 0
-        avg_order_value = delivered_orders.aggregate(avg=Avg('total_amount'))['avg'] or 0
-        
-        # Delivered today
-        today = timezone.now().date()
-        delivered_today = delivered_orders.filter(
-            delivered_at__date=today
-        ).count()
-        
-        # Recent orders with customer details
-        recent_orders = Order.objects.select_related('customer').order_by('-created_at')[:5]
-        
-        # Top products - FIXED: Calculate revenue correctly
-        top_products = OrderItem.objects.select_related(
-            'menu_item',
-            'menu_item__category'
-        ).values(
-            'menu_item__id',
-            'menu_item__name',
-            'menu_item__category__category_type'
-        ).annotate(
-            total_sold=Sum('quantity'),
-            total_revenue=Sum(F('price') * F('quantity'))  # FIXED: Multiply price by quantity
-        ).order_by('-total_sold')[:5]
-        
-        stats = {
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'total_users': total_users,
-            'total_foods': total_foods,
-            'total_drinks': total_drinks,
-            'total_revenue': float(total_revenue),
-            'average_order_value': float(avg_order_value),
-            'delivered_today': delivered_today,
-            'recent_orders': [
-                {
-                    'id': order.id,
-                    'order_number': order.order_number,
-                    'customer': order.customer.username if order.customer else 'Guest',
-                    'customer_email': order.customer.email if order.customer else '',
-                    'status': order.status,
-                    'total_amount': float(order.total_amount),
-                    'created_at': order.created_at.isoformat(),
-                }
-                for order in recent_orders
-            ],
-            'top_products': [
-                {
-                    'id': item['menu_item__id'],
-                    'name': item['menu_item__name'] or 'Unknown',
-                    'type': item['menu_item__category__category_type'] or 'unknown',
-                    'sales_count': item['total_sold'] or 0,
-                    'revenue': float(item['total_revenue'] or 0),
-                }
-                for item in top_products
-            ]
-        }
-        
+        stats = dashboard_summary()
         return Response(stats, status=200)
         
     except Exception as e:
@@ -274,6 +336,7 @@ def dashboard_stats(request):
         
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cache_view('dashboard', ttl=lambda: getattr(settings, 'DASHBOARD_CACHE_TTL', 30), tags=('dashboard',))
 def analytics_data(request):
     time_range = request.GET.get('time_range', 'week')
     
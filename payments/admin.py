@@ -28,13 +28,13 @@ class PaymentAdmin(admin.ModelAdmin):
 
 @admin.register(PaymentWebhook)
 class PaymentWebhookAdmin(admin.ModelAdmin):
-    list_display = ('payment', 'event_type', 'is_verified', 'received_at')
+    list_display = ('tx_ref', 'payment', 'event_type', 'is_verified', 'received_at', 'processed_at')
     list_filter = ('event_type', 'is_verified', 'received_at')
-    search_fields = ('payment__tx_ref', 'event_type')
+    search_fields = ('tx_ref', 'event_type')
     readonly_fields = ('payload', 'headers', 'received_at')
     fieldsets = (
         ('Basic Information', {
-            'fields': ('payment', 'event_type', 'is_verified')
+            'fields': ('tx_ref', 'payment', 'event_type', 'is_verified')
         }),
         ('Webhook Data', {
             'fields': ('payload', 'headers'),
@@ -24,4 +24,16 @@ class InvalidPaymentDataError(PaymentError):
 
 class WebhookVerificationError(PaymentError):
     """Exception for webhook verification errors"""
-    pass
\ No newline at end of file
+    pass
+
+class GatewayUnavailableError(ChapaAPIError):
+    """Exception when Chapa could not be reached (timeout or connection failure)"""
+    pass
+
+class CircuitOpenError(ChapaAPIError):
+    """Exception when the gateway circuit breaker is open and calls fail fast"""
+    pass
+
+class GatewayBusyError(ChapaAPIError):
+    """Exception when too many gateway requests are already in flight"""
+    pass
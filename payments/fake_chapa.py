@@ -0,0 +1,253 @@
+import json
+import time
+import random
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import requests
+
+
+@dataclass
+class FakeChapaConfig:
+    """Behaviour of the local Chapa stand-in"""
+    latency: float = 0.05  # Base response latency in seconds
+    jitter: float = 0.0  # Extra uniform random latency in seconds
+    slow_rate: float = 0.0  # Fraction of calls that take slow_latency instead
+    slow_latency: float = 5.0
+    error_rate: float = 0.0  # Fraction of API calls answered with a 500
+    strict: bool = False  # Unknown tx_refs 404 like Chapa; otherwise they verify as paid
+    webhooks: bool = True  # Send charge.success / charge.failure callbacks
+    webhook_delay: float = 0.0  # Seconds before the callback; 0 delivers it inline
+    webhook_duplicates: int = 1  # Times each callback is sent, like gateway retries
+    webhook_timeout: float = 30.0
+
+
+class FakeChapaHandler(BaseHTTPRequestHandler):
+    """
+    Request handler implementing the parts of the Chapa API we use
+
+    POST /v1/transaction/initialize      register a transaction, return a checkout_url
+    GET  /v1/transaction/verify/<tx_ref> report the transaction status
+    GET  /checkout/<tx_ref>?outcome=...  act as the customer paying (or failing to)
+                                         and fire the webhook callback
+    """
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    @property
+    def config(self) -> FakeChapaConfig:
+        return self.server.config
+
+    def _sleep(self):
+        config = self.config
+        if config.slow_rate and random.random() < config.slow_rate:
+            time.sleep(config.slow_latency)
+        else:
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+
+    def _inject_error(self) -> bool:
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self._send_json(500, {'status': 'failed', 'message': 'Injected server error'})
+            return True
+        return False
+
+    def _send_json(self, status_code, body):
+        data = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/v1/transaction/initialize':
+            self._send_json(404, {'status': 'failed', 'message': 'Not found'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'status': 'failed', 'message': 'Invalid JSON'})
+            return
+
+        self._sleep()
+        if self._inject_error():
+            return
+
+        missing = [f for f in ('amount', 'email', 'first_name', 'tx_ref') if not payload.get(f)]
+        if missing:
+            self._send_json(400, {'status': 'failed', 'message': f"Missing fields: {', '.join(missing)}"})
+            return
+
+        tx_ref = payload['tx_ref']
+        if not self.server.register(tx_ref, payload):
+            self._send_json(400, {'status': 'failed', 'message': 'Transaction reference has been used before'})
+            return
+
+        host, port = self.server.server_address[:2]
+        self._send_json(200, {
+            'status': 'success',
+            'message': 'Hosted Link',
+            'data': {'checkout_url': f"http://{host}:{port}/checkout/{tx_ref}"}
+        })
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path.startswith('/v1/transaction/verify/'):
+            self._verify(parts.path[len('/v1/transaction/verify/'):])
+        elif parts.path.startswith('/checkout/'):
+            outcome = parse_qs(parts.query).get('outcome', ['success'])[0]
+            self._checkout(parts.path[len('/checkout/'):].rstrip('/'), outcome)
+        else:
+            self._send_json(404, {'status': 'failed', 'message': 'Not found'})
+
+    def _verify(self, tx_ref):
+        self._sleep()
+        if self._inject_error():
+            return
+
+        transaction = self.server.get(tx_ref)
+        if transaction is None:
+            if self.config.strict:
+                self._send_json(404, {'status': 'failed', 'message': 'Invalid transaction or Transaction not found'})
+                return
+            transaction = {'tx_ref': tx_ref, 'status': 'success', 'amount': '100.00', 'currency': 'ETB',
+                           'email': 'customer@example.com', 'first_name': 'Test', 'last_name': 'Customer'}
+
+        self._send_json(200, {
+            'status': 'success',
+            'message': 'Payment details',
+            'data': {
+                'id': f"CH-{tx_ref}",
+                'tx_ref': tx_ref,
+                'status': transaction['status'],
+                'amount': str(transaction.get('amount', '0')),
+                'currency': transaction.get('currency', 'ETB'),
+                'email': transaction.get('email'),
+                'first_name': transaction.get('first_name', ''),
+                'last_name': transaction.get('last_name', ''),
+            }
+        })
+
+    def _checkout(self, tx_ref, outcome):
+        status = 'success' if outcome == 'success' else 'failed'
+        transaction = self.server.set_status(tx_ref, status)
+        if transaction is None:
+            self._send_json(404, {'status': 'failed', 'message': 'Unknown transaction'})
+            return
+
+        webhook = {'sent': False}
+        if self.config.webhooks and transaction.get('callback_url'):
+            if self.config.webhook_delay:
+                threading.Timer(
+                    self.config.webhook_delay, self.server.send_webhook, args=(transaction,)
+                ).start()
+            else:
+                webhook = self.server.send_webhook(transaction)
+
+        self._send_json(200, {'tx_ref': tx_ref, 'status': status, 'webhook': webhook})
+
+
+class _FakeChapaHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Accept bursts of concurrent connections
+
+    def __init__(self, server_address, handler_class, config):
+        super().__init__(server_address, handler_class)
+        self.config = config
+        self.transactions = {}
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their deadline hang up mid-response; that is expected
+        pass
+
+    def register(self, tx_ref, payload) -> bool:
+        with self._lock:
+            if tx_ref in self.transactions:
+                return False
+            self.transactions[tx_ref] = dict(payload, status='pending')
+            return True
+
+    def get(self, tx_ref):
+        with self._lock:
+            transaction = self.transactions.get(tx_ref)
+            return dict(transaction) if transaction else None
+
+    def set_status(self, tx_ref, status):
+        with self._lock:
+            transaction = self.transactions.get(tx_ref)
+            if transaction is None:
+                return None
+            transaction['status'] = status
+            return dict(transaction)
+
+    def send_webhook(self, transaction):
+        """POST the charge event to the transaction's callback_url"""
+        event = 'charge.success' if transaction['status'] == 'success' else 'charge.failure'
+        payload = {
+            'event': event,
+            'data': {
+                'tx_ref': transaction['tx_ref'],
+                'status': transaction['status'],
+                'amount': str(transaction.get('amount')),
+                'currency': transaction.get('currency', 'ETB'),
+                'email': transaction.get('email'),
+            }
+        }
+        result = {'sent': True, 'event': event, 'status_code': None, 'elapsed_ms': None, 'error': None}
+        for _ in range(max(self.config.webhook_duplicates, 1)):
+            started = time.monotonic()
+            try:
+                response = requests.post(transaction['callback_url'], json=payload,
+                                         timeout=self.config.webhook_timeout)
+                result['status_code'] = response.status_code
+            except requests.exceptions.RequestException as e:
+                result['error'] = str(e)
+            result['elapsed_ms'] = (time.monotonic() - started) * 1000
+        return result
+
+
+class FakeChapaServer:
+    """
+    Threaded HTTP server imitating the Chapa API on localhost
+
+    Usage:
+        with FakeChapaServer(FakeChapaConfig(latency=0.2)) as server:
+            client = ChapaClient(base_url=server.base_url)
+    """
+
+    def __init__(self, config: FakeChapaConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.httpd = _FakeChapaHTTPServer((host, port), FakeChapaHandler, config or FakeChapaConfig())
+        self._thread = None
+
+    @property
+    def config(self) -> FakeChapaConfig:
+        return self.httpd.config
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,65 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from payments.fake_chapa import FakeChapaConfig, FakeChapaServer
+from payments.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent payment verification against a local fake Chapa gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200, help='Pending payments to verify')
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='Comma-separated worker counts to compare')
+        parser.add_argument('--latency', type=float, default=0.1, help='Base gateway latency (s)')
+        parser.add_argument('--jitter', type=float, default=0.05, help='Extra random latency (s)')
+        parser.add_argument('--slow-rate', type=float, default=0.02,
+                            help='Fraction of calls that hang for --slow-latency')
+        parser.add_argument('--slow-latency', type=float, default=5.0, help='Slow call latency (s)')
+        parser.add_argument('--call-timeout', type=float, default=2.0, help='Per-call deadline (s)')
+
+    def handle(self, *args, **options):
+        config = FakeChapaConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            slow_rate=options['slow_rate'],
+            slow_latency=options['slow_latency'],
+        )
+        tx_refs = [f"BENCH-{i:06d}" for i in range(options['payments'])]
+        worker_counts = [int(n) for n in options['concurrency'].split(',') if n.strip()]
+
+        # The gateway client refuses to start without a key; any value works locally
+        with override_settings(CHAPA_SECRET_KEY=settings.CHAPA_SECRET_KEY or 'fake-chapa-key'):
+            from payments.services import ChapaClient
+            from payments.verification import VerificationRunner
+
+            with FakeChapaServer(config) as server:
+                self.stdout.write(
+                    f"{len(tx_refs)} payments, latency {config.latency}s "
+                    f"+ {config.jitter}s jitter, {config.slow_rate:.0%} slow calls "
+                    f"({config.slow_latency}s), per-call deadline {options['call_timeout']}s"
+                )
+                self.stdout.write(
+                    f"{'workers':>8} {'total (s)':>10} {'verify/s':>10} "
+                    f"{'p50 (ms)':>10} {'p95 (ms)':>10} {'errors':>7}"
+                )
+
+                for workers in worker_counts:
+                    runner = VerificationRunner(
+                        ChapaClient(base_url=server.base_url),
+                        max_workers=workers,
+                        call_timeout=options['call_timeout'],
+                        sweep_timeout=3600,
+                    )
+                    started = time.monotonic()
+                    outcomes = runner.verify_many(tx_refs)
+                    total = time.monotonic() - started
+
+                    elapsed = [o['elapsed'] * 1000 for o in outcomes.values() if o['elapsed'] is not None]
+                    errors = sum(1 for o in outcomes.values() if o['error'])
+                    self.stdout.write(
+                        f"{workers:>8} {total:>10.2f} {len(tx_refs) / total:>10.1f} "
+                        f"{percentile(elapsed, 50):>10.1f} {percentile(elapsed, 95):>10.1f} {errors:>7}"
+                    )
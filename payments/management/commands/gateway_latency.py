@@ -0,0 +1,59 @@
+import time
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from payments.metrics import parse_prometheus_samples
+
+
+class Command(BaseCommand):
+    help = 'Print p50/p95/p99 Chapa call latency from a running server\'s rolling window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/payments/gateway/metrics/',
+                            help='Gateway metrics endpoint of the server to inspect')
+        parser.add_argument('--token', default=None, help='Metrics token (defaults to METRICS_TOKEN)')
+        parser.add_argument('--watch', type=float, default=0,
+                            help='Refresh every N seconds instead of printing once')
+
+    def handle(self, *args, **options):
+        token = options['token'] or getattr(settings, 'METRICS_TOKEN', '')
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        try:
+            while True:
+                self._print(self._fetch(options['url'], headers))
+                if not options['watch']:
+                    break
+                time.sleep(options['watch'])
+        except KeyboardInterrupt:
+            pass
+
+    def _fetch(self, url, headers):
+        try:
+            response = requests.get(url, headers=headers, timeout=10)
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"Could not reach {url}: {str(e)}")
+        if response.status_code != 200:
+            raise CommandError(f"Metrics request failed ({response.status_code}): {response.text[:200]}")
+        return response.text
+
+    def _print(self, text):
+        rows = {}
+        for sample in parse_prometheus_samples(text, 'chapa_request_duration_window_seconds'):
+            quantile = float(sample['labels']['quantile'])
+            rows.setdefault(sample['labels']['endpoint'], {})[f"p{round(quantile * 100)}"] = sample['value']
+        for sample in parse_prometheus_samples(text, 'chapa_request_duration_seconds_count'):
+            rows.setdefault(sample['labels']['endpoint'], {})['calls'] = int(sample['value'])
+        for sample in parse_prometheus_samples(text, 'chapa_timeouts_total'):
+            rows.setdefault(sample['labels']['endpoint'], {})['timeouts'] = int(sample['value'])
+
+        if not rows:
+            self.stdout.write('No Chapa calls recorded yet')
+            return
+
+        self.stdout.write(f"{'endpoint':<12} {'calls':>8} {'timeouts':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for endpoint, row in sorted(rows.items()):
+            self.stdout.write(
+                f"{endpoint:<12} {row.get('calls', 0):>8} {row.get('timeouts', 0):>9} "
+                f"{row.get('p50', 0) * 1000:>9.1f} {row.get('p95', 0) * 1000:>9.1f} {row.get('p99', 0) * 1000:>9.1f}"
+            )
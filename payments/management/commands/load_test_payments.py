@@ -0,0 +1,165 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from orders.models import Order
+from payments.metrics import percentile
+
+User = get_user_model()
+
+STEPS = ('initialize', 'webhook', 'verify')
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive initialize -> webhook -> verify against a running API at a target rate '
+        'and report per-step latency percentiles. Start the API with CHAPA_BASE_URL '
+        'pointing at `manage.py run_fake_chapa` first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--rps', type=float, default=5.0, help='Checkout flows started per second')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to keep starting flows')
+        parser.add_argument('--workers', type=int, default=64, help='Maximum concurrent flows')
+        parser.add_argument('--username', default='loadtest')
+        parser.add_argument('--password', default='LoadTest!2345')
+        parser.add_argument('--amount', default='150.00')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='Fraction of checkouts the customer abandons with a failed charge')
+
+    def handle(self, *args, **options):
+        self.api_url = options['api_url'].rstrip('/')
+        self.amount = Decimal(options['amount'])
+        total_flows = max(int(options['rps'] * options['duration']), 1)
+
+        user = self._get_user(options['username'], options['password'])
+        token = self._login(options['username'], options['password'])
+        order_ids = self._create_orders(user, total_flows)
+
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._token = token
+        fail_every = int(1 / options['failure_rate']) if options['failure_rate'] else 0
+
+        self.stdout.write(
+            f"Running {total_flows} checkout flows at {options['rps']}/s "
+            f"against {self.api_url} ..."
+        )
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for i, order_id in enumerate(order_ids):
+                # Open-loop pacing: flows start on schedule however slow earlier ones are
+                delay = started + i / options['rps'] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                outcome = 'failed' if fail_every and i % fail_every == 0 else 'success'
+                executor.submit(self._run_flow, order_id, outcome)
+        elapsed = time.monotonic() - started
+
+        self._report(total_flows, elapsed)
+
+    def _get_user(self, username, password):
+        user, created = User.objects.get_or_create(
+            username=username,
+            defaults={'email': f"{username}@loadtest.local", 'first_name': 'Load', 'last_name': 'Test'}
+        )
+        if created:
+            user.set_password(password)
+            user.save()
+        return user
+
+    def _login(self, username, password):
+        response = requests.post(f"{self.api_url}/api/auth/login/",
+                                 json={'username': username, 'password': password}, timeout=30)
+        if response.status_code != 200:
+            raise CommandError(f"Login failed ({response.status_code}): {response.text}")
+        return response.json()['access']
+
+    def _create_orders(self, user, count):
+        orders = [
+            Order(
+                customer=user,
+                order_number=f"LT{time.time_ns() % 10 ** 12:012d}{i:06d}",
+                payment_method='online',
+                total_amount=self.amount,
+                delivery_address='Load test address',
+                phone_number='0900000000',
+            )
+            for i in range(count)
+        ]
+        Order.objects.bulk_create(orders, batch_size=1000)
+        numbers = [order.order_number for order in orders]
+        return list(Order.objects.filter(order_number__in=numbers).values_list('id', flat=True))
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['Authorization'] = f"Bearer {self._token}"
+            self._local.session = session
+        return session
+
+    def _record(self, step, elapsed_ms=None, error=False):
+        with self._lock:
+            if error:
+                self.errors[step] += 1
+            else:
+                self.samples[step].append(elapsed_ms)
+
+    def _run_flow(self, order_id, outcome):
+        session = self._session()
+
+        started = time.monotonic()
+        try:
+            response = session.post(f"{self.api_url}/api/payments/initialize/",
+                                    json={'order_id': order_id, 'amount': str(self.amount)}, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            self._record('initialize', error=True)
+            return
+        self._record('initialize', (time.monotonic() - started) * 1000)
+
+        # The fake gateway "pays" and reports how long our webhook endpoint took
+        try:
+            response = requests.get(f"{data['checkout_url']}?outcome={outcome}", timeout=60)
+            webhook = response.json().get('webhook', {})
+            if webhook.get('error') or not webhook.get('status_code') or webhook['status_code'] >= 500:
+                self._record('webhook', error=True)
+            else:
+                self._record('webhook', webhook['elapsed_ms'])
+        except (requests.exceptions.RequestException, ValueError):
+            self._record('webhook', error=True)
+
+        started = time.monotonic()
+        try:
+            response = session.get(f"{self.api_url}/api/payments/verify/{data['tx_ref']}/", timeout=60)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self._record('verify', error=True)
+            return
+        self._record('verify', (time.monotonic() - started) * 1000)
+
+    def _report(self, total_flows, elapsed):
+        completed = len(self.samples['verify'])
+        self.stdout.write(
+            f"\n{completed}/{total_flows} flows completed in {elapsed:.1f}s "
+            f"({completed / elapsed:.1f} flows/s)\n"
+        )
+        self.stdout.write(
+            f"{'step':<12} {'ok':>7} {'errors':>7} {'p50 (ms)':>10} "
+            f"{'p95 (ms)':>10} {'p99 (ms)':>10} {'max (ms)':>10}"
+        )
+        for step in STEPS:
+            values = self.samples[step]
+            self.stdout.write(
+                f"{step:<12} {len(values):>7} {self.errors[step]:>7} "
+                f"{percentile(values, 50):>10.1f} {percentile(values, 95):>10.1f} "
+                f"{percentile(values, 99):>10.1f} {max(values, default=0):>10.1f}"
+            )
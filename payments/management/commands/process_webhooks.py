@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Apply queued Chapa webhook events, coalescing duplicates per tx_ref'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        from payments.services import payment_service
+
+        batch_size = options['batch_size']
+        try:
+            while True:
+                summary = payment_service.process_webhook_events(batch_size=batch_size)
+                if summary['events']:
+                    self.stdout.write(f"Processed webhook batch: {summary}")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,45 @@
+import sys
+import time
+from datetime import datetime, time as dt_time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.reconciliation import SettlementReconciler, read_settlement_rows
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), dt_time.min))
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Reconcile a Chapa settlement export (CSV or JSON lines, optionally .gz) against local payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement export file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--output', default='-', help='Report CSV path (default: stdout)')
+        parser.add_argument('--since', help='Settlement window start (YYYY-MM-DD) for missing_at_gateway')
+        parser.add_argument('--until', help='Settlement window end, exclusive (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = _parse_date(options['since']) if options['since'] else None
+        until = _parse_date(options['until']) if options['until'] else None
+
+        report = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+        started = time.monotonic()
+        try:
+            reconciler = SettlementReconciler(report, chunk_size=options['chunk_size'])
+            rows = read_settlement_rows(options['path'], options['format'])
+            counts = reconciler.reconcile(rows, since=since, until=until)
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+        finally:
+            if report is not sys.stdout:
+                report.close()
+
+        summary = ', '.join(f"{category}={count}" for category, count in counts.items())
+        self.stderr.write(f"Reconciled in {time.monotonic() - started:.1f}s: {summary}")
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from payments.fake_chapa import FakeChapaConfig, FakeChapaServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local Chapa stand-in. Point the API at it with '
+        'CHAPA_BASE_URL=http://127.0.0.1:<port>/v1'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--latency', type=float, default=0.05, help='Base response latency (s)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency (s)')
+        parser.add_argument('--slow-rate', type=float, default=0.0,
+                            help='Fraction of calls that take --slow-latency')
+        parser.add_argument('--slow-latency', type=float, default=5.0)
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Fraction of API calls answered with HTTP 500')
+        parser.add_argument('--strict', action='store_true',
+                            help='404 unknown tx_refs instead of reporting them paid')
+        parser.add_argument('--no-webhooks', action='store_true', help='Do not send webhook callbacks')
+        parser.add_argument('--webhook-delay', type=float, default=0.0,
+                            help='Seconds before sending the callback (0 = inline)')
+        parser.add_argument('--webhook-duplicates', type=int, default=1,
+                            help='Times each callback is delivered')
+
+    def handle(self, *args, **options):
+        config = FakeChapaConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            slow_rate=options['slow_rate'],
+            slow_latency=options['slow_latency'],
+            error_rate=options['error_rate'],
+            strict=options['strict'],
+            webhooks=not options['no_webhooks'],
+            webhook_delay=options['webhook_delay'],
+            webhook_duplicates=options['webhook_duplicates'],
+        )
+        server = FakeChapaServer(config, host=options['host'], port=options['port'])
+        self.stdout.write(self.style.SUCCESS(f"Fake Chapa listening on {server.base_url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
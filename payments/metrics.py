@@ -0,0 +1,222 @@
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable
+from django.conf import settings
+
+# Latency histogram bucket bounds in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+QUANTILES = (50, 95, 99)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _EndpointStats:
+    def __init__(self, buckets, window):
+        self.bucket_counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.duration_sum = 0.0
+        self.duration_count = 0
+        self.recent = deque(maxlen=window)
+        self.outcomes = {}
+        self.rejections = {}
+        self.in_flight = 0
+
+
+class GatewayMetrics:
+    """
+    In-process metrics for payment gateway calls
+
+    Per endpoint: a latency histogram, a rolling window of recent
+    latencies for p50/p95/p99, counts per outcome (HTTP status code,
+    'timeout', 'connection_error', 'error'), fail-fast rejections and an
+    in-flight gauge. Values are per process; Prometheus aggregates them
+    across workers.
+    """
+
+    def __init__(self, prefix: str = 'chapa', buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 window: int = 1000):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointStats] = {}
+        # Set by the gateway client: callable returning its connection pool stats
+        self.pool_stats = None
+
+    def _stats(self, endpoint: str) -> _EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats(self.buckets, self.window)
+        return stats
+
+    @contextmanager
+    def in_flight(self, endpoint: str):
+        with self._lock:
+            self._stats(endpoint).in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stats(endpoint).in_flight -= 1
+
+    def observe(self, endpoint: str, seconds: float, outcome: str) -> None:
+        """Record one completed (or failed) call"""
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            stats.duration_sum += seconds
+            stats.duration_count += 1
+            stats.recent.append(seconds)
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+
+    def record_rejection(self, endpoint: str, reason: str) -> None:
+        """Record a call refused before reaching the gateway (breaker open, busy)"""
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.rejections[reason] = stats.rejections.get(reason, 0) + 1
+
+    def percentiles(self, quantiles: Iterable[int] = QUANTILES) -> Dict[str, Dict[str, Any]]:
+        """Latency percentiles over the rolling window, per endpoint"""
+        with self._lock:
+            windows = {endpoint: list(stats.recent) for endpoint, stats in self._endpoints.items()}
+        return {
+            endpoint: dict(
+                {'count': len(values)},
+                **{f'p{q}': percentile(values, q) for q in quantiles}
+            )
+            for endpoint, values in windows.items()
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                endpoint: {
+                    'calls': stats.duration_count,
+                    'outcomes': dict(stats.outcomes),
+                    'rejections': dict(stats.rejections),
+                    'in_flight': stats.in_flight,
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        name = f"{self.prefix}_request_duration_seconds"
+        window_name = f"{self.prefix}_request_duration_window_seconds"
+        lines = [
+            f"# HELP {name} Latency of {self.prefix} gateway calls.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            windows = {endpoint: list(stats.recent) for endpoint, stats in endpoints}
+
+            for endpoint, stats in endpoints:
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), stats.bucket_counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(endpoint=endpoint, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(endpoint=endpoint)} {stats.duration_sum}")
+                lines.append(f"{name}_count{_labels(endpoint=endpoint)} {stats.duration_count}")
+
+            lines += [
+                f"# HELP {window_name} Latency percentiles over the last {self.window} calls.",
+                f"# TYPE {window_name} gauge",
+            ]
+            for endpoint, stats in endpoints:
+                for q in QUANTILES:
+                    value = percentile(windows[endpoint], q)
+                    lines.append(f"{window_name}{_labels(endpoint=endpoint, quantile=q / 100)} {value}")
+
+            lines += [
+                f"# HELP {self.prefix}_responses_total Gateway calls by outcome (status code or error kind).",
+                f"# TYPE {self.prefix}_responses_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                for outcome, count in sorted(stats.outcomes.items()):
+                    lines.append(
+                        f"{self.prefix}_responses_total{_labels(endpoint=endpoint, outcome=outcome)} {count}"
+                    )
+
+            lines += [
+                f"# HELP {self.prefix}_timeouts_total Gateway calls that timed out.",
+                f"# TYPE {self.prefix}_timeouts_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                lines.append(
+                    f"{self.prefix}_timeouts_total{_labels(endpoint=endpoint)} {stats.outcomes.get('timeout', 0)}"
+                )
+
+            lines += [
+                f"# HELP {self.prefix}_rejected_total Calls refused before reaching the gateway.",
+                f"# TYPE {self.prefix}_rejected_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                for reason, count in sorted(stats.rejections.items()):
+                    lines.append(
+                        f"{self.prefix}_rejected_total{_labels(endpoint=endpoint, reason=reason)} {count}"
+                    )
+
+            lines += [
+                f"# HELP {self.prefix}_in_flight Gateway calls currently in flight.",
+                f"# TYPE {self.prefix}_in_flight gauge",
+            ]
+            for endpoint, stats in endpoints:
+                lines.append(f"{self.prefix}_in_flight{_labels(endpoint=endpoint)} {stats.in_flight}")
+
+        if self.pool_stats is not None:
+            pool = self.pool_stats()
+            lines += [
+                f"# HELP {self.prefix}_pool_requests_total Requests sent through the keep-alive pool.",
+                f"# TYPE {self.prefix}_pool_requests_total counter",
+                f"{self.prefix}_pool_requests_total {pool['requests']}",
+                f"# HELP {self.prefix}_pool_new_connections_total Connections opened by the keep-alive pool.",
+                f"# TYPE {self.prefix}_pool_new_connections_total counter",
+                f"{self.prefix}_pool_new_connections_total {pool['new_connections']}",
+                f"# HELP {self.prefix}_pool_idle_connections Open connections waiting for reuse.",
+                f"# TYPE {self.prefix}_pool_idle_connections gauge",
+                f"{self.prefix}_pool_idle_connections {pool['idle_connections']}",
+            ]
+
+        return '\n'.join(lines) + '\n'
+
+
+def parse_prometheus_samples(text: str, metric: str) -> Iterable[Dict[str, Any]]:
+    """Yield {'labels': {...}, 'value': float} for each sample of one metric"""
+    for line in text.splitlines():
+        if not line.startswith(metric):
+            continue
+        head, _, value = line.rpartition(' ')
+        name, _, label_text = head.partition('{')
+        if name != metric:
+            continue
+        labels = {}
+        for pair in label_text.rstrip('}').split(','):
+            if '=' in pair:
+                key, _, raw = pair.partition('=')
+                labels[key] = raw.strip('"')
+        yield {'labels': labels, 'value': float(value)}
+
+
+# Shared by every ChapaClient in this process
+gateway_metrics = GatewayMetrics('chapa', window=getattr(settings, 'CHAPA_METRICS_WINDOW', 1000))
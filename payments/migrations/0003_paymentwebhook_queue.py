@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:52
+
+from django.db import migrations, models
+
+
+def backfill_webhooks(apps, schema_editor):
+    """Copy tx_ref out of stored payloads and close events handled before the queue existed"""
+    PaymentWebhook = apps.get_model('payments', 'PaymentWebhook')
+    for webhook in PaymentWebhook.objects.iterator(chunk_size=1000):
+        data = (webhook.payload or {}).get('data') or {}
+        webhook.tx_ref = data.get('tx_ref') or ''
+        webhook.processed_at = webhook.processed_at or webhook.received_at
+        webhook.save(update_fields=['tx_ref', 'processed_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_alter_paymentwebhook_payment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='tx_ref',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(backfill_webhooks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='paymentwebhook',
+            index=models.Index(fields=['tx_ref'], name='payments_pa_tx_ref_ecb0dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhook',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at'], name='payment_webhook_queue_idx'),
+        ),
+    ]
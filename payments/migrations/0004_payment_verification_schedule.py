@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:54
+
+import payments.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_paymentwebhook_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, default=payments.models.default_next_check_at, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='verify_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'payment_method', 'next_check_at'], name='payments_pa_status_1d3748_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'payment_method', 'created_at'], name='payments_pa_status_095511_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_payment_verification_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhook',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
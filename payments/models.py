@@ -1,8 +1,16 @@
 import uuid
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+
+def default_next_check_at():
+    """First background verification happens after the initial grace period"""
+    return timezone.now() + timedelta(seconds=getattr(settings, 'PAYMENT_VERIFY_INITIAL_DELAY', 600))
+
+
 class Payment(models.Model):
     """Model to track payment transactions"""
     STATUS_CHOICES = (
@@ -12,6 +20,7 @@ class Payment(models.Model):
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
     )
+    FINAL_STATUSES = ('completed', 'failed', 'cancelled')
     
     PAYMENT_METHODS = (
         ('chapa', 'Chapa'),
@@ -40,6 +49,10 @@ class Payment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     paid_at = models.DateTimeField(null=True, blank=True)
     
+    # Background verification schedule
+    next_check_at = models.DateTimeField(null=True, blank=True, default=default_next_check_at)
+    verify_attempts = models.PositiveIntegerField(default=0)
+    
     # Metadata
     metadata = models.JSONField(default=dict, blank=True)  # Store additional data
     
@@ -51,6 +64,9 @@ class Payment(models.Model):
             models.Index(fields=['tx_ref']),
             models.Index(fields=['status']),
             models.Index(fields=['customer', 'created_at']),
+            # Due-check sweep and expiry of abandoned pending payments
+            models.Index(fields=['status', 'payment_method', 'next_check_at']),
+            models.Index(fields=['status', 'payment_method', 'created_at']),
         ]
     
     def __str__(self):
@@ -67,6 +83,10 @@ class Payment(models.Model):
     @property
     def is_failed(self):
         return self.status == 'failed'
+    
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
 
 class PaymentWebhook(models.Model):
     """Model to store webhook logs from Chapa"""
@@ -81,6 +101,7 @@ class PaymentWebhook(models.Model):
     # ... rest stays the same
     # Webhook data
     event_type = models.CharField(max_length=50)
+    tx_ref = models.CharField(max_length=100, blank=True)  # Copied from payload for coalescing
     payload = models.JSONField(default=dict)
     headers = models.JSONField(default=dict)
     
@@ -92,10 +113,23 @@ class PaymentWebhook(models.Model):
     received_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     
+    # Background processing claim, so two processors never take the same event
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-received_at']
         verbose_name = _('payment webhook')
         verbose_name_plural = _('payment webhooks')
+        indexes = [
+            models.Index(fields=['tx_ref']),
+            # Queue of events still waiting for the background processor
+            models.Index(
+                fields=['received_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='payment_webhook_queue_idx'
+            ),
+        ]
     
     def __str__(self):
-        return f"Webhook {self.event_type} for {self.payment.tx_ref}"
\ No newline at end of file
+        return f"Webhook {self.event_type} for {self.tx_ref}"
\ No newline at end of file
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def status_cache_key(tx_ref: str) -> str:
+    return f"payments:status:{tx_ref}"
+
+
+class PaymentStatusNotifier:
+    """
+    Wake clients waiting on a payment once it reaches a final status
+
+    Waiters in this process are woken immediately. The status is also put
+    in the cache so waiters in other processes notice it on their next tick
+    when the cache is shared; the database is checked as the fallback.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._admitted = 0
+
+    def admit(self) -> bool:
+        """Take one of this process's PAYMENT_WAIT_MAX_WAITERS wait slots; give it back with leave()"""
+        with self._lock:
+            if self._admitted >= getattr(settings, 'PAYMENT_WAIT_MAX_WAITERS', 1000):
+                return False
+            self._admitted += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    def publish(self, tx_ref: str, status: str) -> None:
+        """Announce a final status; safe to call from any thread"""
+        try:
+            cache.set(status_cache_key(tx_ref), status, getattr(settings, 'PAYMENT_WAIT_TIMEOUT', 25) * 2)
+        except Exception as e:
+            logger.warning(f"Failed to cache status of payment {tx_ref}: {str(e)}")
+
+        with self._lock:
+            waiters = list(self._waiters.get(tx_ref, ()))
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _register(self, tx_ref, waiter):
+        with self._lock:
+            self._waiters.setdefault(tx_ref, set()).add(waiter)
+
+    def _unregister(self, tx_ref, waiter):
+        with self._lock:
+            waiters = self._waiters.get(tx_ref)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[tx_ref]
+
+    async def wait(self, tx_ref: str, timeout: float,
+                   load_status: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Wait up to `timeout` seconds for a final status of tx_ref
+
+        load_status reads the status from the database; it runs first, then
+        every PAYMENT_WAIT_DB_INTERVAL seconds. Returns the final status, or
+        None if the payment is still open when the wait ends.
+        """
+        from .models import Payment
+
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        tick = getattr(settings, 'PAYMENT_WAIT_TICK', 0.5)
+        db_interval = getattr(settings, 'PAYMENT_WAIT_DB_INTERVAL', 2.0)
+
+        self._register(tx_ref, waiter)
+        try:
+            deadline = loop.time() + timeout
+            next_db_check = loop.time()
+            while True:
+                woken = event.is_set()
+                event.clear()
+                status = await cache.aget(status_cache_key(tx_ref))
+                if status is None and (woken or loop.time() >= next_db_check):
+                    status = await load_status()
+                    next_db_check = loop.time() + db_interval
+                if status in Payment.FINAL_STATUSES:
+                    return status
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, tick))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._unregister(tx_ref, waiter)
+
+
+# Shared by every request in this process
+payment_notifier = PaymentStatusNotifier()
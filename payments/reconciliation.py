@@ -0,0 +1,213 @@
+import os
+import csv
+import gzip
+import json
+import sqlite3
+import logging
+import tempfile
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Column names seen in Chapa exports, mapped to the names we use
+FIELD_ALIASES = {
+    'tx_ref': ('tx_ref', 'trx_ref'),
+    'chapa_transaction_id': ('chapa_transaction_id', 'reference', 'ref_id', 'id'),
+    'amount': ('amount', 'charge_amount'),
+    'currency': ('currency',),
+}
+
+CATEGORIES = ('matched', 'amount_mismatch', 'status_mismatch', 'missing_locally', 'missing_at_gateway', 'unparseable')
+
+REPORT_FIELDS = [
+    'category', 'line', 'tx_ref', 'chapa_transaction_id',
+    'gateway_amount', 'local_amount', 'gateway_currency', 'local_currency', 'local_status',
+]
+
+CENT = Decimal('0.01')
+
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8')
+    return open(path, newline='', encoding='utf-8')
+
+
+def read_settlement_rows(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows of a settlement export (CSV or JSON lines, optionally gzipped)
+
+    Yields dicts with normalized keys (see FIELD_ALIASES) plus the source
+    line number under 'line'. Nothing is buffered beyond the current row.
+    A JSON line that is not an object yields its line number with 'error'
+    set (and no fields) instead of aborting the whole file.
+    """
+    if fmt is None:
+        name = path[:-3] if path.endswith('.gz') else path
+        fmt = 'csv' if name.endswith('.csv') else 'jsonl'
+
+    with _open_text(path) as handle:
+        if fmt == 'csv':
+            records = ((i, row) for i, row in enumerate(csv.DictReader(handle), start=2))
+        else:
+            records = ((i, _parse_json_line(line)) for i, line in enumerate(handle, start=1) if line.strip())
+
+        for line, record in records:
+            if isinstance(record, str):
+                logger.warning(f"Settlement line {line} is unparseable: {record}")
+                yield dict({field: None for field in FIELD_ALIASES}, line=line, error=record)
+                continue
+            row = {'line': line}
+            for field, aliases in FIELD_ALIASES.items():
+                row[field] = next((record[a] for a in aliases if record.get(a) not in (None, '')), None)
+            yield row
+
+
+def _parse_json_line(line: str):
+    """The line's JSON object, or an error message if it is not one"""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return f"invalid JSON ({e})"
+    if not isinstance(record, dict):
+        return f"expected a JSON object, got {type(record).__name__}"
+    return record
+
+
+def _to_amount(value) -> Optional[Decimal]:
+    try:
+        return Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+class SettlementReconciler:
+    """
+    Match a settlement export against local Payment rows
+
+    Rows are processed in chunks: one in_bulk lookup by tx_ref per chunk,
+    plus one by chapa_transaction_id for rows without a tx_ref or whose
+    tx_ref is not found locally (exports sometimes carry Chapa's own ref). References
+    seen in the file are kept in a temporary on-disk SQLite table rather
+    than in memory, so completed local payments absent from the file
+    (missing_at_gateway) can be found afterwards in constant memory.
+    """
+
+    def __init__(self, report_file, chunk_size: int = 2000):
+        self.chunk_size = chunk_size
+        self.writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        self.counts = {category: 0 for category in CATEGORIES}
+
+    def reconcile(self, rows: Iterable[Dict[str, Any]], since=None, until=None) -> Dict[str, int]:
+        """
+        Reconcile all rows and write the report
+
+        since/until bound the paid_at window of local payments checked for
+        missing_at_gateway; settlement exports usually cover a date range.
+        """
+        self.writer.writeheader()
+        fd, seen_path = tempfile.mkstemp(suffix='.sqlite3', prefix='reconcile-')
+        os.close(fd)
+        self.seen = sqlite3.connect(seen_path)
+        try:
+            self.seen.execute('PRAGMA journal_mode=OFF')
+            self.seen.execute('PRAGMA synchronous=OFF')
+            self.seen.execute('CREATE TABLE seen (tx_ref TEXT PRIMARY KEY) WITHOUT ROWID')
+
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    self._process_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._process_chunk(chunk)
+
+            self._find_missing_at_gateway(since, until)
+        finally:
+            self.seen.close()
+            os.remove(seen_path)
+
+        return dict(self.counts)
+
+    def _write(self, category: str, row: Optional[Dict[str, Any]] = None, payment=None):
+        self.counts[category] += 1
+        row = row or {}
+        self.writer.writerow({
+            'category': category,
+            'line': row.get('line', ''),
+            'tx_ref': row.get('tx_ref') or (payment.tx_ref if payment else ''),
+            'chapa_transaction_id': row.get('chapa_transaction_id') or (payment.chapa_transaction_id if payment else ''),
+            'gateway_amount': row.get('amount', ''),
+            'local_amount': payment.amount if payment else '',
+            'gateway_currency': row.get('currency', ''),
+            'local_currency': payment.currency if payment else '',
+            'local_status': payment.status if payment else '',
+        })
+
+    def _process_chunk(self, chunk):
+        from .models import Payment
+
+        fields = ('tx_ref', 'chapa_transaction_id', 'amount', 'currency', 'status')
+        tx_refs = [row['tx_ref'] for row in chunk if row['tx_ref']]
+        by_tx_ref = Payment.objects.only(*fields).in_bulk(tx_refs, field_name='tx_ref') if tx_refs else {}
+
+        chapa_ids = [row['chapa_transaction_id'] for row in chunk
+                     if row['tx_ref'] not in by_tx_ref and row['chapa_transaction_id']]
+        by_chapa_id = {}
+        if chapa_ids:
+            for payment in Payment.objects.only(*fields).filter(chapa_transaction_id__in=chapa_ids):
+                by_chapa_id[payment.chapa_transaction_id] = payment
+
+        seen = []
+        for row in chunk:
+            if row.get('error'):
+                self._write('unparseable', row)
+                continue
+
+            payment = by_tx_ref.get(row['tx_ref']) or by_chapa_id.get(row['chapa_transaction_id'])
+            if payment is None:
+                self._write('missing_locally', row)
+                continue
+
+            seen.append((payment.tx_ref,))
+            amount = _to_amount(row['amount'])
+            currency = row['currency'] or payment.currency
+            if amount != payment.amount.quantize(CENT) or currency != payment.currency:
+                self._write('amount_mismatch', row, payment)
+            elif payment.status != 'completed':
+                self._write('status_mismatch', row, payment)
+            else:
+                self._write('matched', row, payment)
+
+        self.seen.executemany('INSERT OR IGNORE INTO seen (tx_ref) VALUES (?)', seen)
+
+    def _find_missing_at_gateway(self, since, until):
+        from .models import Payment
+
+        completed = Payment.objects.filter(status='completed', payment_method='chapa')
+        if since:
+            completed = completed.filter(paid_at__gte=since)
+        if until:
+            completed = completed.filter(paid_at__lt=until)
+
+        chunk = []
+        for payment in completed.only('tx_ref', 'chapa_transaction_id', 'amount', 'currency', 'status') \
+                .order_by('pk').iterator(chunk_size=self.chunk_size):
+            chunk.append(payment)
+            if len(chunk) >= self.chunk_size:
+                self._report_unseen(chunk)
+                chunk = []
+        if chunk:
+            self._report_unseen(chunk)
+
+    def _report_unseen(self, payments):
+        refs = [payment.tx_ref for payment in payments]
+        placeholders = ','.join('?' * len(refs))
+        found = {ref for (ref,) in self.seen.execute(
+            f'SELECT tx_ref FROM seen WHERE tx_ref IN ({placeholders})', refs
+        )}
+        for payment in payments:
+            if payment.tx_ref not in found:
+                self._write('missing_at_gateway', payment=payment)
@@ -0,0 +1,170 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any
+
+from .exceptions import ChapaAPIError, GatewayUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether a gateway error is worth retrying and counts against the breaker
+
+    Timeouts, connection failures, rate limiting and 5xx responses are
+    transient; other 4xx responses mean our request was wrong.
+    """
+    if isinstance(error, GatewayUnavailableError):
+        return True
+    if isinstance(error, ChapaAPIError) and error.status_code:
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 5.0):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        """Delay before retrying after the given (1-based) failed attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker over a rolling window of recent calls
+
+    closed    -> calls pass through; opens once at least `min_calls` outcomes
+                 are recorded and the failure rate reaches `failure_rate`
+    open      -> calls fail fast until `reset_timeout` seconds have passed
+    half_open -> a single trial call is let through; success closes the
+                 breaker, failure opens it again
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 10,
+                 window: int = 50, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._outcomes = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Reserve permission for one call; False means fail fast"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                logger.info(f"Circuit breaker '{self.name}' closed after successful trial call")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self._times_opened += 1
+        logger.warning(
+            f"Circuit breaker '{self.name}' opened; failing fast for {self.reset_timeout}s"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0)
+            return {
+                'state': state,
+                'window_calls': calls,
+                'window_failures': failures,
+                'failure_rate': round(failures / calls, 3) if calls else 0.0,
+                'times_opened': self._times_opened,
+                'rejected_calls': self._rejected,
+                'retry_in_seconds': retry_in,
+            }
+
+
+class ConcurrencyLimiter:
+    """Cap on concurrent in-flight gateway requests"""
+
+    def __init__(self, max_in_flight: int = 32, acquire_timeout: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._rejected += 1
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'rejected_calls': self._rejected,
+            }
@@ -23,7 +23,7 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 class InitializePaymentSerializer(serializers.Serializer):
     """Serializer for initializing payment"""
-    order_id = serializers.UUIDField(required=True)
+    order_id = serializers.IntegerField(required=True)  # Order uses an integer primary key
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=True)
     currency = serializers.CharField(max_length=3, default='ETB')
     return_url = serializers.URLField(required=False)
@@ -1,11 +1,21 @@
 import uuid
 import json
+import time
 import logging
 import requests
+import threading
+from requests.adapters import HTTPAdapter
+from datetime import timedelta
 from typing import Dict, Any, Optional
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from .exceptions import ChapaAPIError, PaymentVerificationError
+from .exceptions import (
+    ChapaAPIError, PaymentVerificationError, GatewayUnavailableError,
+    CircuitOpenError, GatewayBusyError
+)
+from .resilience import RetryPolicy, CircuitBreaker, ConcurrencyLimiter, is_transient_error
+from .metrics import gateway_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +31,7 @@ class ChapaClient:
     INITIALIZE_URL = f"{BASE_URL}/transaction/initialize"
     VERIFY_URL = f"{BASE_URL}/transaction/verify"
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None):
         self.secret_key = getattr(settings, 'CHAPA_SECRET_KEY', '')
         if not self.secret_key:
             raise ValueError("CHAPA_SECRET_KEY is not configured in settings")
@@ -32,42 +42,215 @@ class ChapaClient:
             'Accept': 'application/json',
         }
         
-        # Configure requests session
+        # Configure requests session with a keep-alive pool sized to the
+        # in-flight cap, so every concurrent call can reuse a warm TLS connection
+        self.pool_size = getattr(settings, 'CHAPA_POOL_SIZE', 0) or getattr(settings, 'CHAPA_MAX_IN_FLIGHT', 32)
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
         
         # Timeout settings
         self.timeout = getattr(settings, 'CHAPA_TIMEOUT', 30)
         
         # Enable debug mode for development
         self.debug = getattr(settings, 'DEBUG', False)
+        
+        # Gateway location is configurable so a local fake can stand in for Chapa
+        base_url = base_url or getattr(settings, 'CHAPA_BASE_URL', '') or self.BASE_URL
+        self.BASE_URL = base_url.rstrip('/')
+        self.INITIALIZE_URL = f"{self.BASE_URL}/transaction/initialize"
+        self.VERIFY_URL = f"{self.BASE_URL}/transaction/verify"
+        
+        # Resilience: retries for idempotent calls, circuit breaker, in-flight cap
+        self.retry_policy = RetryPolicy(
+            max_attempts=getattr(settings, 'CHAPA_RETRY_ATTEMPTS', 3),
+            base_delay=getattr(settings, 'CHAPA_RETRY_BASE_DELAY', 0.5),
+            max_delay=getattr(settings, 'CHAPA_RETRY_MAX_DELAY', 5.0),
+        )
+        self.circuit_breaker = CircuitBreaker(
+            'chapa',
+            failure_rate=getattr(settings, 'CHAPA_BREAKER_FAILURE_RATE', 0.5),
+            min_calls=getattr(settings, 'CHAPA_BREAKER_MIN_CALLS', 10),
+            window=getattr(settings, 'CHAPA_BREAKER_WINDOW', 50),
+            reset_timeout=getattr(settings, 'CHAPA_BREAKER_RESET_TIMEOUT', 30),
+        )
+        self.limiter = ConcurrencyLimiter(
+            max_in_flight=getattr(settings, 'CHAPA_MAX_IN_FLIGHT', 32),
+            acquire_timeout=getattr(settings, 'CHAPA_IN_FLIGHT_WAIT', 1.0),
+        )
+        
+        # Latency, outcome, in-flight and pool metrics (see /api/payments/gateway/metrics/)
+        self.metrics = gateway_metrics
+        self.metrics.pool_stats = self.get_pool_stats
     
-    def _make_request(self, method: str, url: str, data: Dict = None) -> Dict:
+    def get_health(self) -> Dict[str, Any]:
         """
-        Make HTTP request to Chapa API with proper error handling
+        Resilience state for monitoring (breaker state, error rate, in-flight calls)
         """
-        try:
-            logger.info(f"Making {method} request to {url}")
-            
-            if self.debug:
-                logger.debug(f"Request data: {data}")
-            
-            if method.upper() == 'POST':
-                response = self.session.post(
-                    url, 
-                    json=data, 
-                    timeout=self.timeout,
-                    verify=True  # Always verify SSL
-                )
-            elif method.upper() == 'GET':
-                response = self.session.get(
-                    url,
-                    timeout=self.timeout,
-                    verify=True
+        return {
+            'base_url': self.BASE_URL,
+            'circuit_breaker': self.circuit_breaker.snapshot(),
+            'concurrency': self.limiter.snapshot(),
+            'calls': self.metrics.snapshot(),
+            'latency': self.metrics.percentiles(),
+            'pool': self.get_pool_stats(),
+            'retry': {
+                'max_attempts': self.retry_policy.max_attempts,
+                'base_delay': self.retry_policy.base_delay,
+                'max_delay': self.retry_policy.max_delay,
+            },
+        }
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Keep-alive pool usage in this process: requests sent, connections
+        opened and the share of requests that reused an open connection
+        """
+        requests_sent = new_connections = idle = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+            if pool.pool is not None:
+                idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        
+        reused = max(requests_sent - new_connections, 0)
+        return {
+            'size': self.pool_size,
+            'requests': requests_sent,
+            'new_connections': new_connections,
+            'reused': reused,
+            'reuse_rate': round(reused / requests_sent, 4) if requests_sent else None,
+            'idle_connections': idle,
+        }
+    
+    def _make_request(self, method: str, url: str, data: Dict = None,
+                      timeout: Optional[float] = None, idempotent: bool = False) -> Dict:
+        """
+        Make HTTP request to Chapa API through the resilience layer
+        
+        Idempotent calls (verify) are retried on transient errors with
+        jittered exponential backoff. Every attempt must pass the circuit
+        breaker and obtain an in-flight slot, otherwise it fails fast.
+        """
+        attempts = self.retry_policy.max_attempts if idempotent else 1
+        
+        for attempt in range(1, attempts + 1):
+            try:
+                return self._attempt(method, url, data, timeout)
+            except ChapaAPIError as e:
+                if attempt == attempts or not is_transient_error(e):
+                    raise
+                
+                delay = self.retry_policy.get_delay(attempt)
+                logger.warning(
+                    f"Transient Chapa error on {url} (attempt {attempt}/{attempts}): "
+                    f"{str(e)}; retrying in {delay:.2f}s"
                 )
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                time.sleep(delay)
+    
+    def _attempt(self, method: str, url: str, data: Dict = None,
+                 timeout: Optional[float] = None) -> Dict:
+        """
+        One gateway call guarded by the in-flight cap and circuit breaker
+        """
+        if not self.limiter.acquire():
+            self.metrics.record_rejection(self._endpoint_name(url), 'busy')
+            raise GatewayBusyError("Too many concurrent requests to Chapa")
+        
+        try:
+            if not self.circuit_breaker.allow_request():
+                self.metrics.record_rejection(self._endpoint_name(url), 'circuit_open')
+                raise CircuitOpenError("Chapa is unavailable: circuit breaker is open")
             
+            try:
+                response = self._send(method, url, data, timeout)
+            except ChapaAPIError as e:
+                if is_transient_error(e):
+                    self.circuit_breaker.record_failure()
+                else:
+                    # The gateway answered; the request itself was rejected
+                    self.circuit_breaker.record_success()
+                raise
+            
+            self.circuit_breaker.record_success()
+            return response
+        finally:
+            self.limiter.release()
+    
+    def _endpoint_name(self, url: str) -> str:
+        """Metrics label for a gateway URL (without the tx_ref)"""
+        if url.startswith(self.VERIFY_URL):
+            return 'verify'
+        if url.startswith(self.INITIALIZE_URL):
+            return 'initialize'
+        return 'other'
+    
+    def _send(self, method: str, url: str, data: Dict = None,
+              timeout: Optional[float] = None) -> Dict:
+        """
+        Make a single HTTP request to Chapa API, recording its latency and outcome
+        """
+        endpoint = self._endpoint_name(url)
+        started = time.monotonic()
+        outcome = 'error'
+        try:
+            with self.metrics.in_flight(endpoint):
+                response = self._request(method, url, data, timeout)
+            outcome = str(response.status_code)
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            logger.error(f"Request timeout for {url}")
+            raise GatewayUnavailableError("Request timeout: Could not connect to Chapa")
+        except requests.exceptions.ConnectionError:
+            outcome = 'connection_error'
+            logger.error(f"Connection error for {url}")
+            raise GatewayUnavailableError("Connection error: Could not connect to Chapa")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request exception for {url}: {str(e)}")
+            raise ChapaAPIError(f"Request failed: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error for {url}: {str(e)}")
+            raise ChapaAPIError(f"Unexpected error: {str(e)}")
+        finally:
+            self.metrics.observe(endpoint, time.monotonic() - started, outcome)
+        
+        return self._handle_response(response, url)
+    
+    def _request(self, method: str, url: str, data: Dict = None,
+                 timeout: Optional[float] = None) -> requests.Response:
+        """Raw HTTP call to the gateway"""
+        timeout = timeout or self.timeout
+        logger.info(f"Making {method} request to {url}")
+        
+        if self.debug:
+            logger.debug(f"Request data: {data}")
+        
+        if method.upper() == 'POST':
+            return self.session.post(
+                url, 
+                json=data, 
+                timeout=timeout,
+                verify=True  # Always verify SSL
+            )
+        elif method.upper() == 'GET':
+            return self.session.get(
+                url,
+                timeout=timeout,
+                verify=True
+            )
+        raise ValueError(f"Unsupported HTTP method: {method}")
+    
+    def _handle_response(self, response: requests.Response, url: str) -> Dict:
+        """
+        Map a Chapa API response to its JSON body or a ChapaAPIError
+        """
+        try:
             # Log response for debugging
             if self.debug:
                 logger.debug(f"Response status: {response.status_code}")
@@ -122,15 +305,8 @@ class ChapaClient:
                     status_code=response.status_code
                 )
                 
-        except requests.exceptions.Timeout:
-            logger.error(f"Request timeout for {url}")
-            raise ChapaAPIError("Request timeout: Could not connect to Chapa")
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error for {url}")
-            raise ChapaAPIError("Connection error: Could not connect to Chapa")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request exception for {url}: {str(e)}")
-            raise ChapaAPIError(f"Request failed: {str(e)}")
+        except ChapaAPIError:
+            raise
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error for {url}: {str(e)}")
             raise ChapaAPIError(f"Invalid response format: {str(e)}")
@@ -220,9 +396,13 @@ class ChapaClient:
             logger.error(f"Failed to initialize payment: {str(e)}")
             raise
     
-    def verify_payment(self, tx_ref: str) -> Dict[str, Any]:
+    def verify_payment(self, tx_ref: str, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Verify a payment using transaction reference
+        
+        Args:
+            tx_ref: Transaction reference to verify
+            timeout: Optional per-call timeout overriding CHAPA_TIMEOUT
         """
         if not tx_ref:
             raise ValueError("Transaction reference is required")
@@ -231,7 +411,7 @@ class ChapaClient:
         logger.info(f"Verifying payment with tx_ref: {tx_ref}")
         
         try:
-            response = self._make_request('GET', verify_url)
+            response = self._make_request('GET', verify_url, timeout=timeout, idempotent=True)
             
             # Check if status is success
             if response.get('status') != 'success':
@@ -305,7 +485,23 @@ class PaymentService:
     """
     
     def __init__(self):
-        self.chapa_client = ChapaClient()
+        self._chapa_client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def chapa_client(self) -> ChapaClient:
+        """
+        Gateway client, created on first use
+        
+        Importing the payments app (startup, management commands, tests)
+        needs neither CHAPA_SECRET_KEY nor a session, and forked server
+        workers each build their own connection pool.
+        """
+        if self._chapa_client is None:
+            with self._client_lock:
+                if self._chapa_client is None:
+                    self._chapa_client = ChapaClient()
+        return self._chapa_client
     
     def create_payment(self, order, customer, amount, currency='ETB', metadata=None):
         """
@@ -373,11 +569,80 @@ class PaymentService:
             logger.error(f"Failed to initialize payment: {str(e)}")
             raise
     
+    def get_verification_status(self, payment) -> Dict[str, Any]:
+        """
+        Verification status for polling clients (the payment-success page)
+        
+        Final payments are answered from the database without a gateway
+        call. Otherwise concurrent requests for the same tx_ref share one
+        verification, and a non-final result is cached for
+        PAYMENT_VERIFY_CACHE_TTL seconds. Across processes a cache lock keeps
+        a second worker from verifying while another is already doing so.
+        """
+        from .models import Payment
+        from .verification import verification_flight
+        
+        if payment.is_final:
+            return {
+                'verified': payment.is_paid,
+                'status': payment.status,
+                'message': 'Payment already completed' if payment.is_paid else f'Payment {payment.status}',
+            }
+        
+        tx_ref = payment.tx_ref
+        result_key = f"payments:verify:{tx_ref}"
+        lock_key = f"payments:verify-lock:{tx_ref}"
+        ttl = getattr(settings, 'PAYMENT_VERIFY_CACHE_TTL', 5)
+        
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached
+        
+        def load():
+            # Another flight may have filled the cache while we queued
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached
+            
+            lock_timeout = self.chapa_client.timeout + 1
+            if not cache.add(lock_key, 1, timeout=lock_timeout):
+                # Another process is verifying this tx_ref; wait briefly for its result
+                deadline = time.monotonic() + min(lock_timeout, ttl * 2)
+                while time.monotonic() < deadline:
+                    time.sleep(0.1)
+                    cached = cache.get(result_key)
+                    if cached is not None:
+                        return cached
+                return {
+                    'verified': False,
+                    'status': payment.status,
+                    'message': 'Payment verification in progress',
+                    'checkout_url': payment.checkout_url,
+                }
+            
+            try:
+                result = self.verify_and_complete_payment(tx_ref)
+            finally:
+                cache.delete(lock_key)
+            
+            data = {
+                'verified': result.get('verified', False),
+                'status': result.get('status'),
+                'message': result.get('message'),
+                'checkout_url': result.get('checkout_url'),
+            }
+            if data['status'] not in Payment.FINAL_STATUSES:
+                cache.set(result_key, data, ttl)
+            return data
+        
+        return verification_flight.do(tx_ref, load)
+    
     def verify_and_complete_payment(self, tx_ref: str) -> Dict[str, Any]:
         """
         Verify payment with Chapa and update payment status
         """
         from .models import Payment
+        from .verification import complete_payments
         
         try:
             # Get payment by tx_ref
@@ -396,6 +661,16 @@ class PaymentService:
                     'message': 'Payment already completed'
                 }
             
+            # Failed or cancelled payments are not re-verified either
+            if payment.is_final:
+                return {
+                    'payment': payment,
+                    'verified': False,
+                    'status': payment.status,
+                    'chapa_transaction_id': payment.chapa_transaction_id,
+                    'message': f'Payment {payment.status}'
+                }
+            
             # Verify with Chapa
             verification_result = self.chapa_client.verify_payment(tx_ref)
             
@@ -410,29 +685,20 @@ class PaymentService:
                     'checkout_url': payment.checkout_url  # Return checkout URL to retry
                 }
             
-            # Update payment status
-            new_status = verification_result.get('status', 'pending')
-            payment.status = new_status
-            
-            if verification_result.get('chapa_transaction_id'):
-                payment.chapa_transaction_id = verification_result['chapa_transaction_id']
-            
-            if payment.is_paid:
-                payment.paid_at = timezone.now()
-            
-            payment.save()
-            
-            # Update order status if payment completed
-            if payment.is_paid and payment.order:
-                payment.order.payment_status = True
-                payment.order.save()
+            # Update payment and order in one transaction unless a webhook
+            # finalized the payment while we were verifying
+            changed = complete_payments({payment.pk: verification_result})
+            if payment.pk in changed:
+                payment = changed[payment.pk]
+            else:
+                payment.refresh_from_db()
             
             return {
                 'payment': payment,
-                'verified': verification_result.get('verified', False),
-                'status': new_status,
-                'chapa_transaction_id': verification_result.get('chapa_transaction_id'),
-                'message': 'Payment verified successfully' if verification_result.get('verified') else 'Payment pending'
+                'verified': payment.is_paid,
+                'status': payment.status,
+                'chapa_transaction_id': payment.chapa_transaction_id,
+                'message': 'Payment verified successfully' if payment.is_paid else f'Payment {payment.status}'
             }
             
         except PaymentVerificationError:
@@ -445,100 +711,202 @@ class PaymentService:
         
     def handle_webhook(self, payload: Dict, headers: Dict) -> Dict[str, Any]:
         """
-        Handle webhook from Chapa
+        Accept a webhook from Chapa
+        
+        The event is persisted with a single insert and acknowledged
+        immediately; process_webhook_events() applies it in the background.
         """
-        from .models import Payment, PaymentWebhook
+        from .models import PaymentWebhook
         
         # Extract event data
         event_type = payload.get('event', '')
-        data = payload.get('data', {})
+        data = payload.get('data') or {}
         tx_ref = data.get('tx_ref')
         
         if not tx_ref:
             raise ValueError("No transaction reference in webhook payload")
         
-        # Log webhook
         webhook = PaymentWebhook.objects.create(
             event_type=event_type,
+            tx_ref=tx_ref,
             payload=payload,
-            headers=headers,
-            payment=None  # Will be set after verification
+            headers=headers
         )
         
-        try:
-            # Get payment
-            try:
-                payment = Payment.objects.get(tx_ref=tx_ref)
-            except Payment.DoesNotExist:
-                webhook.verification_error = f"Payment not found: {tx_ref}"
-                webhook.save()
-                raise PaymentVerificationError(f"Payment not found: {tx_ref}")
-            
-            webhook.payment = payment
-            webhook.save()
-            
-            # Handle different event types
-            if event_type == 'charge.success':
-                # Verify payment
-                verification_result = self.chapa_client.verify_payment(tx_ref)
-                
-                if verification_result['status'] == 'completed':
-                    payment.status = 'completed'
-                    payment.paid_at = timezone.now()
-                    payment.chapa_transaction_id = verification_result.get('chapa_transaction_id')
-                    payment.save()
-                    
-                    # Update order
-                    if payment.order:
-                        payment.order.payment_status = True
-                        payment.order.save()
-                    
-                    webhook.is_verified = True
-                    webhook.processed_at = timezone.now()
-                    webhook.save()
-                    
-                    return {
-                        'success': True,
-                        'message': 'Payment completed successfully',
-                        'payment_id': str(payment.id)
-                    }
-            
-            elif event_type == 'charge.failure':
-                payment.status = 'failed'
-                payment.save()
-                
-                webhook.is_verified = True
-                webhook.processed_at = timezone.now()
-                webhook.save()
-                
-                return {
-                    'success': True,
-                    'message': 'Payment failed',
-                    'payment_id': str(payment.id)
-                }
-            
-            webhook.is_verified = True
-            webhook.processed_at = timezone.now()
-            webhook.save()
-            
-            return {
-                'success': True,
-                'message': f'Webhook {event_type} processed',
-                'payment_id': str(payment.id)
-            }
-            
-        except Exception as e:
-            webhook.verification_error = str(e)
-            webhook.save()
-            logger.error(f"Webhook processing failed: {str(e)}")
-            raise
+        return {
+            'success': True,
+            'message': f'Webhook {event_type} received',
+            'webhook_id': str(webhook.id)
+        }
+    
+    def claim_webhook_events(self, batch_size: int):
+        """
+        Claim up to `batch_size` queued webhook events for this caller
+
+        The claim is a conditional UPDATE on events that are unclaimed (or
+        whose claim is older than PAYMENT_WEBHOOK_CLAIM_TIMEOUT, left by a
+        processor that died), so concurrent processors each get their own
+        events on every database backend. Returns the claimed events.
+        """
+        from django.db.models import Q
+        from .models import PaymentWebhook
+        
+        now = timezone.now()
+        expired = now - timedelta(seconds=getattr(settings, 'PAYMENT_WEBHOOK_CLAIM_TIMEOUT', 300))
+        claimable = PaymentWebhook.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired),
+            processed_at__isnull=True,
+        )
+        ids = list(claimable.order_by('received_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        
+        token = uuid.uuid4().hex
+        claimable.filter(id__in=ids).update(claimed_by=token, claimed_at=now)
+        return list(PaymentWebhook.objects.filter(claimed_by=token).order_by('received_at'))
+    
+    def process_webhook_events(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Apply one batch of queued webhook events
+        
+        The batch is claimed first (see claim_webhook_events), so the
+        process_webhooks command, the queued job and any number of workers
+        never verify the same events twice. Events are coalesced per tx_ref
+        so duplicate deliveries cost a single gateway verification, and
+        results are written with bulk updates. Events whose verification
+        fails are closed with the error recorded; the pending-payment sweep
+        picks those payments up later.
+        """
+        from .models import Payment, PaymentWebhook
+        from .verification import VerificationRunner, complete_payments
+        
+        batch_size = batch_size or getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 200)
+        events = self.claim_webhook_events(batch_size)
+        summary = {'events': len(events), 'payments': 0, 'completed': 0, 'failed': 0, 'errors': 0}
+        if not events:
+            return summary
+        
+        # Coalesce duplicate deliveries per transaction reference
+        events_by_ref = {}
+        for event in events:
+            events_by_ref.setdefault(event.tx_ref, []).append(event)
+        summary['payments'] = len(events_by_ref)
+        
+        payments = Payment.objects.in_bulk(list(events_by_ref), field_name='tx_ref')
+        
+        # A success event needs one verification; final payments need none
+        to_verify = [
+            tx_ref for tx_ref, group in events_by_ref.items()
+            if tx_ref in payments and not payments[tx_ref].is_final
+            and any(event.event_type == 'charge.success' for event in group)
+        ]
+        outcomes = VerificationRunner(self.chapa_client).verify_many(to_verify)
+        
+        now = timezone.now()
+        results = {}
+        
+        for tx_ref, group in events_by_ref.items():
+            payment = payments.get(tx_ref)
+            event_types = {event.event_type for event in group}
+            error = None
+            
+            if payment is None:
+                error = f"Payment not found: {tx_ref}"
+            elif tx_ref in outcomes:
+                outcome = outcomes[tx_ref]
+                if outcome['error']:
+                    error = outcome['error']
+                elif outcome['result']['status'] == 'completed':
+                    results[payment.pk] = outcome['result']
+            elif 'charge.failure' in event_types and not payment.is_final:
+                results[payment.pk] = {'status': 'failed'}
+            
+            if error:
+                summary['errors'] += 1
+                logger.error(f"Webhook processing failed for {tx_ref}: {error}")
+            
+            for event in group:
+                event.payment = payment
+                event.is_verified = error is None
+                event.verification_error = error
+                event.processed_at = now
+        
+        # Skips any payment a verify poll finalized meanwhile. Events are
+        # closed after; if that is lost they are retaken and re-applied as a no-op
+        changed = complete_payments(results)
+        PaymentWebhook.objects.bulk_update(
+            events,
+            ['payment', 'is_verified', 'verification_error', 'processed_at']
+        )
+        
+        for payment in changed.values():
+            summary[payment.status] = summary.get(payment.status, 0) + 1
+        
+        return summary
+    
+    def expire_stale_payments(self) -> int:
+        """
+        Cancel Chapa payments still pending after PAYMENT_PENDING_EXPIRY
+        
+        At most PAYMENT_EXPIRY_BATCH_SIZE rows are touched per call, oldest
+        first, so a pile of abandoned checkouts is worked off over several
+        sweeps. Each payment gets one last gateway check, when its next
+        background check is due: one paid late is completed instead, and
+        one that can't be checked is backed off like any other failed check
+        (see next_check_delay), so it neither hits the gateway every sweep
+        nor holds up the rows behind it. Changes go through
+        complete_payments, so waiting clients hear about them. Returns the
+        number cancelled.
+        """
+        from django.db.models import Q
+        from .models import Payment
+        from .verification import VerificationRunner, complete_payments, next_check_delay
+        
+        now = timezone.now()
+        horizon = now - timedelta(seconds=getattr(settings, 'PAYMENT_PENDING_EXPIRY', 48 * 3600))
+        limit = getattr(settings, 'PAYMENT_EXPIRY_BATCH_SIZE', 1000)
+        
+        stale = list(
+            Payment.objects.filter(
+                Q(next_check_at__isnull=True) | Q(next_check_at__lte=now),
+                status='pending',
+                payment_method='chapa',
+                created_at__lt=horizon
+            ).order_by('created_at').only('id', 'tx_ref', 'verify_attempts')[:limit]
+        )
+        if not stale:
+            return 0
+        
+        outcomes = VerificationRunner(self.chapa_client).verify_many(payment.tx_ref for payment in stale)
+        results = {}
+        failed = []
+        for payment in stale:
+            outcome = outcomes[payment.tx_ref]
+            if outcome['error']:
+                logger.warning(f"Not expiring payment {payment.tx_ref} yet, final check failed: {outcome['error']}")
+                payment.verify_attempts += 1
+                payment.next_check_at = now + next_check_delay(payment.verify_attempts)
+                failed.append(payment)
+                continue
+            result = outcome['result']
+            results[payment.pk] = result if result['status'] in Payment.FINAL_STATUSES else {'status': 'cancelled'}
+        
+        Payment.objects.bulk_update(failed, ['verify_attempts', 'next_check_at'])
+        
+        # Skips any a webhook or verify poll finalized meanwhile
+        changed = complete_payments(results)
+        return sum(1 for payment in changed.values() if payment.status == 'cancelled')
     
     def _get_callback_url(self) -> str:
         """Get callback URL for Chapa"""
+        webhook_path = '/api/payments/webhook/'
         base_url = getattr(settings, 'CHAPA_CALLBACK_URL', '')
+        if base_url.endswith(webhook_path):
+            # Already the full webhook URL (the default setting is)
+            return base_url
         if not base_url:
             base_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')
-        return f"{base_url}/api/payments/webhook/"
+        return f"{base_url.rstrip('/')}{webhook_path}"
     
     def _get_return_url(self) -> str:
         """Get return URL for Chapa"""
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Payment
+from .notifications import payment_notifier
+
+
+@receiver(post_save, sender=Payment)
+def notify_final_payment_status(sender, instance, **kwargs):
+    """Wake checkout clients waiting on this payment once it is final"""
+    if instance.status in Payment.FINAL_STATUSES:
+        tx_ref, status = instance.tx_ref, instance.status
+        transaction.on_commit(lambda: payment_notifier.publish(tx_ref, status))
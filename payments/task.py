@@ -1,48 +1,48 @@
-from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from datetime import timedelta
 from .models import Payment
 from .services import payment_service
+from .verification import VerificationRunner
+from jobs.registry import task
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
+@task(max_attempts=1, concurrency=1)
 def verify_pending_payments():
     """
     Background task to verify pending payments
     Runs every 5 minutes
     """
-    try:
-        # Find payments that are pending for more than 10 minutes
-        ten_minutes_ago = timezone.now() - timedelta(minutes=10)
-        pending_payments = Payment.objects.filter(
-            status='pending',
-            created_at__lt=ten_minutes_ago,
-            payment_method='chapa'
-        )[:20]  # Limit to 20 at a time
-        
-        for payment in pending_payments:
-            try:
-                result = payment_service.chapa_client.verify_payment(payment.tx_ref)
-                
-                if result['verified']:
-                    payment.status = result['status']
-                    payment.chapa_transaction_id = result.get('chapa_transaction_id')
-                    
-                    if result['status'] == 'completed':
-                        payment.paid_at = timezone.now()
-                        # Update order
-                        if payment.order:
-                            payment.order.payment_status = True
-                            payment.order.save()
-                    
-                    payment.save()
-                    logger.info(f"Verified payment {payment.tx_ref}: {result['status']}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to verify payment {payment.tx_ref}: {str(e)}")
-                continue
-                
-    except Exception as e:
-        logger.error(f"Error in verify_pending_payments task: {str(e)}")
\ No newline at end of file
+    # Abandoned checkouts are cancelled instead of being re-checked forever
+    expired = payment_service.expire_stale_payments()
+    if expired:
+        logger.info(f"Cancelled {expired} expired pending payments")
+
+    # Each payment carries its own next check time, backed off per attempt
+    batch_size = getattr(settings, 'CHAPA_VERIFY_BATCH_SIZE', 500)
+    due_payments = Payment.objects.filter(
+        status='pending',
+        payment_method='chapa',
+        next_check_at__lte=timezone.now()
+    ).order_by('next_check_at')[:batch_size]
+
+    # Gateway calls run concurrently, each bounded by its own deadline
+    runner = VerificationRunner(payment_service.chapa_client)
+    summary = runner.run(due_payments)
+    logger.info(f"Pending payment sweep finished: {summary}")
+    return summary
+
+
+@task(max_attempts=1, concurrency=1)
+def process_payment_webhooks():
+    """
+    Background task to apply queued Chapa webhook events
+    Drains the queue batch by batch
+    """
+    while True:
+        summary = payment_service.process_webhook_events()
+        if summary['events']:
+            logger.info(f"Processed webhook batch: {summary}")
+        if summary['events'] < getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 200):
+            break
@@ -1,3 +1,295 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from orders.models import Order
+from .models import Payment, PaymentWebhook
+from .reconciliation import SettlementReconciler, read_settlement_rows
+from .resilience import CircuitBreaker
+from .services import ChapaClient, payment_service
+from .verification import complete_payments
 
-# Create your tests here.
+User = get_user_model()
+
+COMPLETED = {'verified': True, 'status': 'completed', 'chapa_transaction_id': 'CHAPA-1'}
+
+
+def create_payment(tx_ref='TX-TEST-1'):
+    user = User.objects.create_user(username=f'customer-{tx_ref}', email=f'{tx_ref}@example.com', password='pass')
+    order = Order.objects.create(
+        customer=user,
+        order_number=f'ORD-{tx_ref}'[:20],
+        total_amount=100,
+        delivery_address='Bole, Addis Ababa',
+        phone_number='0911000000',
+    )
+    return Payment.objects.create(order=order, customer=user, amount=100, tx_ref=tx_ref)
+
+
+def order_updates(queries):
+    return [q for q in queries if q['sql'].startswith('UPDATE') and Order._meta.db_table in q['sql']]
+
+
+class CompletePaymentsTests(TestCase):
+    def setUp(self):
+        self.payment = create_payment()
+
+    def test_completes_payment_and_order(self):
+        changed = complete_payments({self.payment.pk: COMPLETED})
+
+        self.assertIn(self.payment.pk, changed)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertEqual(self.payment.chapa_transaction_id, 'CHAPA-1')
+        self.assertIsNotNone(self.payment.paid_at)
+        self.assertIsNone(self.payment.next_check_at)
+        self.assertTrue(Order.objects.get(pk=self.payment.order_id).payment_status)
+
+    def test_final_payment_is_left_alone(self):
+        complete_payments({self.payment.pk: COMPLETED})
+        self.payment.refresh_from_db()
+        paid_at = self.payment.paid_at
+
+        with CaptureQueriesContext(connection) as queries:
+            changed = complete_payments({self.payment.pk: dict(COMPLETED, chapa_transaction_id='CHAPA-2')})
+
+        self.assertEqual(changed, {})
+        self.assertEqual(order_updates(queries.captured_queries), [])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.paid_at, paid_at)
+        self.assertEqual(self.payment.chapa_transaction_id, 'CHAPA-1')
+
+    def test_payment_finalized_after_it_was_read_is_left_alone(self):
+        atomic = transaction.atomic
+
+        def finalize_first(*args, **kwargs):
+            # Another caller wins between the read and the conditional update
+            Payment.objects.filter(pk=self.payment.pk).update(status='failed')
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, 'atomic', side_effect=finalize_first), \
+                CaptureQueriesContext(connection) as queries:
+            changed = complete_payments({self.payment.pk: COMPLETED})
+
+        self.assertEqual(changed, {})
+        self.assertEqual(order_updates(queries.captured_queries), [])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'failed')
+        self.assertFalse(Order.objects.get(pk=self.payment.order_id).payment_status)
+
+
+@override_settings(CHAPA_SECRET_KEY='test-secret-key')
+class ConcurrentCompletionTests(TestCase):
+    def setUp(self):
+        self.payment = create_payment()
+
+    def test_webhook_completing_during_verify_poll(self):
+        """A webhook finalizes the payment while a verify poll waits on the gateway"""
+        def verify_payment(client, tx_ref, timeout=None):
+            complete_payments({self.payment.pk: dict(COMPLETED, chapa_transaction_id='CHAPA-WEBHOOK')})
+            return dict(COMPLETED, chapa_transaction_id='CHAPA-POLL')
+
+        with mock.patch.object(ChapaClient, 'verify_payment', autospec=True, side_effect=verify_payment), \
+                CaptureQueriesContext(connection) as queries:
+            result = payment_service.verify_and_complete_payment(self.payment.tx_ref)
+
+        # The order was marked paid once, by the webhook; the poll reports its result
+        self.assertEqual(len(order_updates(queries.captured_queries)), 1)
+        self.assertTrue(result['verified'])
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(result['chapa_transaction_id'], 'CHAPA-WEBHOOK')
+
+    def test_final_payment_skips_gateway(self):
+        complete_payments({self.payment.pk: COMPLETED})
+
+        with mock.patch.object(ChapaClient, 'verify_payment') as verify_payment:
+            result = payment_service.verify_and_complete_payment(self.payment.tx_ref)
+
+        verify_payment.assert_not_called()
+        self.assertTrue(result['verified'])
+
+
+def receive_webhook(tx_ref, event='charge.success'):
+    return PaymentWebhook.objects.create(event_type=event, tx_ref=tx_ref, payload={'event': event, 'data': {'tx_ref': tx_ref}})
+
+
+@override_settings(CHAPA_SECRET_KEY='test-secret-key')
+class WebhookProcessingTests(TestCase):
+    def setUp(self):
+        self.payment = create_payment()
+
+    def test_duplicate_deliveries_verify_once(self):
+        receive_webhook(self.payment.tx_ref)
+        receive_webhook(self.payment.tx_ref)
+
+        with mock.patch.object(ChapaClient, 'verify_payment', return_value=COMPLETED) as verify_payment:
+            summary = payment_service.process_webhook_events()
+
+        verify_payment.assert_called_once()
+        self.assertEqual((summary['events'], summary['completed']), (2, 1))
+        self.assertFalse(PaymentWebhook.objects.filter(processed_at__isnull=True).exists())
+
+    def test_claimed_events_are_not_processed_again(self):
+        receive_webhook(self.payment.tx_ref)
+        claimed = payment_service.claim_webhook_events(10)
+
+        with mock.patch.object(ChapaClient, 'verify_payment', return_value=COMPLETED) as verify_payment:
+            summary = payment_service.process_webhook_events()
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(summary['events'], 0)
+        verify_payment.assert_not_called()
+
+    def test_claim_of_dead_processor_is_retaken(self):
+        receive_webhook(self.payment.tx_ref)
+        payment_service.claim_webhook_events(10)
+
+        with override_settings(PAYMENT_WEBHOOK_CLAIM_TIMEOUT=0), \
+                mock.patch.object(ChapaClient, 'verify_payment', return_value=COMPLETED):
+            summary = payment_service.process_webhook_events()
+
+        self.assertEqual(summary['events'], 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+
+
+@override_settings(CHAPA_SECRET_KEY='test-secret-key')
+class ExpireStalePaymentsTests(TestCase):
+    def setUp(self):
+        self.payment = create_payment()
+        abandoned = timezone.now() - timedelta(days=3)
+        Payment.objects.filter(pk=self.payment.pk).update(created_at=abandoned, next_check_at=abandoned)
+
+    def test_abandoned_payment_is_cancelled(self):
+        pending = {'verified': False, 'status': 'pending'}
+        with mock.patch.object(ChapaClient, 'verify_payment', return_value=pending):
+            self.assertEqual(payment_service.expire_stale_payments(), 1)
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'cancelled')
+
+    def test_failed_final_check_is_backed_off(self):
+        with mock.patch.object(ChapaClient, 'verify_payment', side_effect=ConnectionError('gateway down')):
+            self.assertEqual(payment_service.expire_stale_payments(), 0)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+        self.assertEqual(self.payment.verify_attempts, 1)
+        self.assertGreater(self.payment.next_check_at, timezone.now())
+
+        # Not checked again until its next check is due
+        with mock.patch.object(ChapaClient, 'verify_payment') as verify_payment:
+            self.assertEqual(payment_service.expire_stale_payments(), 0)
+        verify_payment.assert_not_called()
+
+
+class ReconciliationTests(TestCase):
+    def reconcile(self, *lines):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        report = io.StringIO()
+        counts = SettlementReconciler(report).reconcile(read_settlement_rows(path))
+        return counts, list(csv.DictReader(io.StringIO(report.getvalue())))
+
+    def test_bad_lines_are_reported_and_the_rest_reconciled(self):
+        Payment.objects.filter(pk=create_payment().pk).update(status='completed')
+
+        with self.assertLogs('payments.reconciliation', 'WARNING'):
+            counts, report = self.reconcile(
+                '{"tx_ref": "TX-TEST-1", "amount": "100.00", "currency": "ETB"',
+                '["not", "an", "object"]',
+                '{"tx_ref": "TX-TEST-1", "amount": "100.00", "currency": "ETB"}',
+            )
+
+        self.assertEqual((counts['unparseable'], counts['matched']), (2, 1))
+        self.assertEqual([(row['category'], row['line']) for row in report],
+                         [('unparseable', '1'), ('unparseable', '2'), ('matched', '3')])
+
+    def test_unknown_tx_ref_falls_back_to_the_chapa_reference(self):
+        Payment.objects.filter(pk=create_payment().pk).update(status='completed', chapa_transaction_id='CHAPA-1')
+
+        counts, report = self.reconcile('{"tx_ref": "CHAPA-SIDE-REF", "reference": "CHAPA-1", "amount": "100"}')
+
+        self.assertEqual((counts['matched'], counts['missing_locally'], counts['missing_at_gateway']), (1, 0, 0))
+
+
+class CircuitBreakerTests(TestCase):
+    def failing_breaker(self):
+        breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10, reset_timeout=30)
+        for _ in range(2):
+            breaker.record_success()
+            breaker.record_failure()
+        return breaker
+
+    def test_opens_at_the_failure_rate_once_enough_calls_are_seen(self):
+        breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10)
+        for _ in range(3):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        with self.assertLogs('payments.resilience', 'WARNING'):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.snapshot()['rejected_calls'], 1)
+
+    def test_half_open_lets_one_trial_through(self):
+        with self.assertLogs('payments.resilience', 'WARNING'):
+            breaker = self.failing_breaker()
+
+        with mock.patch('payments.resilience.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+
+            with self.assertLogs('payments.resilience', 'INFO'):
+                breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            self.assertEqual(breaker.snapshot()['window_calls'], 1)
+
+    def test_failed_trial_opens_again(self):
+        with self.assertLogs('payments.resilience', 'WARNING'):
+            breaker = self.failing_breaker()
+
+        later = time.monotonic() + 31
+        with mock.patch('payments.resilience.time.monotonic', return_value=later):
+            self.assertTrue(breaker.allow_request())
+            with self.assertLogs('payments.resilience', 'WARNING'):
+                breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertEqual(breaker.snapshot()['times_opened'], 2)
+
+
+# Threads need their own connections to the test database (not in-memory SQLite)
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ParallelCompletionTests(TransactionTestCase):
+    def test_parallel_completions_apply_once(self):
+        payment = create_payment()
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def complete(_):
+            barrier.wait()
+            try:
+                return len(complete_payments({payment.pk: COMPLETED}))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            applied = list(executor.map(complete, range(workers)))
+
+        self.assertEqual(sum(applied), 1)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
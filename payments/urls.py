@@ -1,4 +1,5 @@
 from django.urls import path
+from config.async_views import read_view
 from . import views
 
 app_name = 'payments'
@@ -7,8 +8,12 @@ urlpatterns = [
     # Payment endpoints
     path('initialize/', views.InitializePaymentView.as_view(), name='initialize-payment'),
     path('verify/<str:tx_ref>/', views.VerifyPaymentView.as_view(), name='verify-payment'),
-    path('<uuid:id>/', views.PaymentStatusView.as_view(), name='payment-status'),
+    path('wait/<str:tx_ref>/', read_view(views.PaymentWaitAPIView, views.PaymentWaitView), name='wait-payment'),
+    path('events/<str:tx_ref>/', read_view(views.PaymentEventsAPIView, views.PaymentEventsView), name='payment-events'),
+    path('<uuid:id>/', read_view(views.PaymentStatusView, views.AsyncPaymentStatusView), name='payment-status'),
     path('history/', views.PaymentHistoryView.as_view(), name='payment-history'),
+    path('gateway/health/', views.GatewayHealthView.as_view(), name='gateway-health'),
+    path('gateway/metrics/', views.GatewayMetricsView.as_view(), name='gateway-metrics'),
     
     # Webhook endpoint (CSRF exempt)
     path('webhook/', views.WebhookView.as_view(), name='webhook'),
@@ -0,0 +1,249 @@
+import time
+import random
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Iterable, Optional
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def next_check_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff between background checks of a pending payment
+
+    Doubles from PAYMENT_VERIFY_RETRY_BASE up to PAYMENT_VERIFY_RETRY_MAX,
+    with +/-10% jitter so payments created together drift apart.
+    """
+    base = getattr(settings, 'PAYMENT_VERIFY_RETRY_BASE', 300)
+    cap = getattr(settings, 'PAYMENT_VERIFY_RETRY_MAX', 6 * 3600)
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def complete_payments(results: Dict[Any, Dict[str, Any]]) -> Dict[Any, Any]:
+    """
+    Apply gateway results to payments and their orders in one transaction
+
+    `results` maps payment pk to a result with 'status' and optionally
+    'chapa_transaction_id'. Each payment is moved with a conditional
+    UPDATE ... WHERE status NOT IN FINAL_STATUSES, and only a caller whose
+    UPDATE matched the row goes on to mark the order paid: when a webhook
+    and a verify poll race, the payment is completed and its order marked
+    paid once, on every database backend. Rows are written in pk order, so
+    concurrent callers cannot deadlock. Only the payment result columns and
+    Order.payment_status are written. Returns the payments that changed,
+    keyed by pk.
+    """
+    from django.db import transaction
+    from orders.models import Order
+    from .models import Payment
+    from .notifications import payment_notifier
+
+    if not results:
+        return {}
+
+    # Read before the transaction, so on SQLite it starts with a write
+    payments = Payment.objects.filter(pk__in=list(results)).exclude(status__in=Payment.FINAL_STATUSES)
+    payments = {payment.pk: payment for payment in payments}
+
+    now = timezone.now()
+    changed = {}
+    with transaction.atomic():
+        for pk in sorted(payments):
+            payment = payments[pk]
+            result = results[pk]
+            payment.status = result['status']
+            values = {'status': payment.status, 'updated_at': now}
+            if result.get('chapa_transaction_id'):
+                values['chapa_transaction_id'] = payment.chapa_transaction_id = result['chapa_transaction_id']
+            if payment.is_paid:
+                values['paid_at'] = payment.paid_at = now
+            if payment.is_final:
+                values['next_check_at'] = payment.next_check_at = None
+
+            moved = (
+                Payment.objects.filter(pk=pk)
+                .exclude(status__in=Payment.FINAL_STATUSES)
+                .exclude(status=payment.status)
+                .update(**values)
+            )
+            if moved:
+                payment.updated_at = now
+                changed[pk] = payment
+
+        if changed:
+            paid_order_ids = [payment.order_id for payment in changed.values() if payment.is_paid]
+            if paid_order_ids:
+                Order.objects.filter(id__in=paid_order_ids, payment_status=False).update(payment_status=True)
+
+            # Queryset updates send no post_save; wake waiting checkout clients here
+            final = [(payment.tx_ref, payment.status) for payment in changed.values() if payment.is_final]
+            transaction.on_commit(lambda: [payment_notifier.publish(*item) for item in final])
+
+    return changed
+
+
+class VerificationRunner:
+    """
+    Verify many pending Chapa payments concurrently
+
+    Gateway calls run on a bounded thread pool so one slow call no longer
+    stalls the whole batch. Database writes stay on the calling thread, so
+    worker threads never open their own database connections.
+    """
+
+    def __init__(self, client, max_workers: Optional[int] = None,
+                 call_timeout: Optional[float] = None,
+                 sweep_timeout: Optional[float] = None):
+        self.client = client
+        self.max_workers = max_workers or getattr(settings, 'CHAPA_VERIFY_CONCURRENCY', 16)
+        self.call_timeout = call_timeout or getattr(settings, 'CHAPA_VERIFY_CALL_TIMEOUT', 10)
+        self.sweep_timeout = sweep_timeout or getattr(settings, 'CHAPA_VERIFY_SWEEP_TIMEOUT', 120)
+
+    def _verify_one(self, tx_ref: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = self.client.verify_payment(tx_ref, timeout=self.call_timeout)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        return {'result': result, 'error': error, 'elapsed': time.monotonic() - started}
+
+    def verify_many(self, tx_refs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Verify transaction references concurrently
+
+        Returns a mapping of tx_ref to an outcome dict with 'result'
+        (the verification result or None), 'error' and 'elapsed' keys.
+        References still outstanding at the sweep deadline are reported as
+        errors and left for the next sweep.
+        """
+        tx_refs = list(dict.fromkeys(tx_refs))
+        outcomes = {}
+        if not tx_refs:
+            return outcomes
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(tx_refs)),
+            thread_name_prefix='chapa-verify'
+        )
+        try:
+            futures = {executor.submit(self._verify_one, tx_ref): tx_ref for tx_ref in tx_refs}
+            done, not_done = wait(futures, timeout=self.sweep_timeout)
+
+            for future in done:
+                outcomes[futures[future]] = future.result()
+
+            for future in not_done:
+                outcomes[futures[future]] = {
+                    'result': None,
+                    'error': 'Sweep deadline exceeded',
+                    'elapsed': None
+                }
+        finally:
+            # Calls already in flight finish on their own per-call timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return outcomes
+
+    def run(self, payments: Iterable) -> Dict[str, int]:
+        """
+        Verify payments with Chapa and apply completed results
+
+        Payments that are still pending afterwards (or could not be checked)
+        are rescheduled with exponential backoff. Returns summary counts for
+        the sweep.
+        """
+        from .models import Payment
+
+        payments = list(payments)
+        outcomes = self.verify_many(payment.tx_ref for payment in payments)
+        summary = {'checked': len(payments), 'updated': 0, 'pending': 0, 'errors': 0}
+        rescheduled = []
+        verified = {}
+
+        for payment in payments:
+            outcome = outcomes[payment.tx_ref]
+            if outcome['error']:
+                summary['errors'] += 1
+                logger.error(f"Failed to verify payment {payment.tx_ref}: {outcome['error']}")
+                rescheduled.append(payment)
+                continue
+
+            result = outcome['result']
+            if not result['verified']:
+                summary['pending'] += 1
+                rescheduled.append(payment)
+                continue
+
+            verified[payment.pk] = result
+
+        # One transaction for the whole batch; payments finalized meanwhile are skipped
+        try:
+            changed = complete_payments(verified)
+            summary['updated'] = len(changed)
+            for payment in changed.values():
+                logger.info(f"Verified payment {payment.tx_ref}: {payment.status}")
+        except Exception as e:
+            summary['errors'] += len(verified)
+            logger.error(f"Failed to update verified payments: {str(e)}")
+            rescheduled.extend(payment for payment in payments if payment.pk in verified)
+
+        now = timezone.now()
+        for payment in rescheduled:
+            payment.verify_attempts += 1
+            payment.next_check_at = now + next_check_delay(payment.verify_attempts)
+        Payment.objects.bulk_update(rescheduled, ['verify_attempts', 'next_check_at'])
+
+        return summary
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+# Shared by every request thread in this process
+verification_flight = SingleFlight()
@@ -1,4 +1,6 @@
+import json
 import logging
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -8,6 +10,10 @@ from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from config.async_views import AsyncAPIView, AsyncReadView
+from config.metrics import scrape_allowed
 
 from .models import Payment
 from orders.models import Order
@@ -18,7 +24,12 @@ from .serializers import (
     WebhookSerializer
 )
 from .services import payment_service
-from .exceptions import PaymentError, ChapaAPIError, PaymentVerificationError
+from .notifications import payment_notifier
+from .metrics import gateway_metrics
+from .exceptions import (
+    PaymentError, ChapaAPIError, PaymentVerificationError,
+    CircuitOpenError, GatewayBusyError
+)
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +100,13 @@ class InitializePaymentView(generics.CreateAPIView):
                 'status': 'pending'
             })
             
+        except (CircuitOpenError, GatewayBusyError) as e:
+            logger.warning(f"Chapa unavailable: {str(e)}")
+            return Response({
+                'error': 'Payment gateway temporarily unavailable',
+                'message': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
         except ChapaAPIError as e:
             logger.error(f"Chapa API error: {str(e)}")
             return Response({
@@ -126,13 +144,16 @@ class VerifyPaymentView(APIView):
     def get(self, request, tx_ref):
         try:
             payment = get_object_or_404(
-                Payment,
+                Payment.objects.select_related('order', 'customer'),
                 tx_ref=tx_ref,
                 customer=request.user
             )
             
-            result = payment_service.verify_and_complete_payment(tx_ref)
-            payment.refresh_from_db()
+            # Final payments come from the database; polls for the same tx_ref
+            # share one gateway call and a short-lived cached result
+            result = payment_service.get_verification_status(payment)
+            if result['status'] != payment.status:
+                payment.refresh_from_db()
             
             serializer = PaymentSerializer(payment)
             
@@ -156,6 +177,13 @@ class VerifyPaymentView(APIView):
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        except (CircuitOpenError, GatewayBusyError) as e:
+            logger.warning(f"Chapa unavailable: {str(e)}")
+            return Response({
+                'error': 'Payment gateway temporarily unavailable',
+                'message': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
         except ChapaAPIError as e:
             logger.error(f"Chapa API error: {str(e)}")
             return Response({
@@ -183,24 +211,36 @@ class PaymentStatusView(generics.RetrieveAPIView):
         return Payment.objects.filter(customer=self.request.user)
 
 
+class AsyncPaymentStatusView(AsyncReadView):
+    """Async GET for PaymentStatusView under ASGI"""
+    api_view = PaymentStatusView
+    
+    async def get_data(self, api_view, *args, **kwargs):
+        payment = await api_view.get_queryset().select_related('order', 'customer').filter(
+            id=kwargs['id']
+        ).afirst()
+        if payment is None:
+            raise Http404(f"No {Payment._meta.object_name} matches the given query.")
+        return PaymentSerializer(payment, context=api_view.get_serializer_context()).data
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class WebhookView(APIView):
     """
-    Handle Chapa webhooks
+    Accept Chapa webhooks (processed asynchronously)
     POST /api/payments/webhook/
     """
     permission_classes = []  # No authentication for webhooks
     authentication_classes = []  # No authentication for webhooks
     
     def post(self, request):
-        logger.info(f"Received Chapa webhook: {request.data}")
-        
         try:
-            # Process webhook
+            # Persist the raw event and acknowledge; processing happens in the background
             result = payment_service.handle_webhook(
                 payload=request.data,
                 headers=dict(request.headers)
             )
+            logger.info(f"Queued Chapa webhook {request.data.get('event', '')}")
             
             return Response(result, status=status.HTTP_200_OK)
             
@@ -225,6 +265,250 @@ class WebhookView(APIView):
         pass
 
 
+class GatewayHealthView(APIView):
+    """
+    Chapa client resilience state (circuit breaker, in-flight requests)
+    GET /api/payments/gateway/health/
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response(payment_service.chapa_client.get_health())
+
+
+class GatewayMetricsView(APIView):
+    """
+    Chapa call metrics in Prometheus text format
+    GET /api/payments/gateway/metrics/
+    
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`;
+    without a configured token only local requests are served.
+    """
+    permission_classes = []
+    authentication_classes = []
+    throttle_classes = []
+    
+    def get(self, request):
+        if not scrape_allowed(request):
+            return Response({'detail': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return HttpResponse(
+            gateway_metrics.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+def verification_payload(payment):
+    """
+    (verify endpoint payload, HTTP status) for a payment
+
+    Final payments are answered from the database; otherwise this is a
+    single on-demand verification.
+    """
+    try:
+        result = payment_service.get_verification_status(payment)
+        if result['status'] != payment.status:
+            payment.refresh_from_db()
+    except PaymentVerificationError as e:
+        return {'error': 'Verification failed', 'message': str(e)}, 400
+    except (CircuitOpenError, GatewayBusyError) as e:
+        logger.warning(f"Chapa unavailable: {str(e)}")
+        return {'error': 'Payment gateway temporarily unavailable', 'message': str(e)}, 503
+    except ChapaAPIError as e:
+        logger.error(f"Chapa API error: {str(e)}")
+        return {'error': 'Payment gateway error', 'message': str(e)}, 400
+
+    response_data = {
+        'verified': result['verified'],
+        'status': result['status'],
+        'message': result.get('message'),
+        'payment': PaymentSerializer(payment).data
+    }
+    if not result['verified'] and result.get('checkout_url'):
+        response_data['checkout_url'] = result['checkout_url']
+    return response_data, 200
+
+
+def payment_event(data, status_code) -> str:
+    """The SSE `payment` event carrying a verify payload"""
+    data['http_status'] = status_code
+    return f"event: payment\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def poll_events(payment):
+    """SSE content answering at once: the `payment` event if final, else a retry delay to poll again"""
+    content = [f"retry: {getattr(settings, 'PAYMENT_POLL_RETRY', 5) * 1000}\n\n"]
+    data, status_code = verification_payload(payment)
+    if data.get('status') in Payment.FINAL_STATUSES:
+        content.append(payment_event(data, status_code))
+    return content
+
+
+def event_stream_response(content):
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
+
+class PaymentWaitAPIView(generics.GenericAPIView):
+    """
+    Payment status without waiting; the wait URL under WSGI
+    GET /api/payments/wait/{tx_ref}/
+
+    A long-poll would hold a sync worker for its whole wait, so under WSGI
+    this answers at once with the verify payload and clients poll again
+    (every PAYMENT_POLL_RETRY seconds) until the status is final. Under
+    ASGI the URL is served by PaymentWaitView, which does wait.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'payment_wait'
+    lookup_field = 'tx_ref'
+
+    def get_queryset(self):
+        return Payment.objects.select_related('order', 'customer').filter(customer=self.request.user)
+
+    def get(self, request, tx_ref):
+        data, status_code = verification_payload(self.get_object())
+        return Response(data, status=status_code)
+
+
+class PaymentEventsAPIView(PaymentWaitAPIView):
+    """
+    Payment events without a held stream; the events URL under WSGI
+    GET /api/payments/events/{tx_ref}/
+
+    Django buffers a streaming response under WSGI, so heartbeats could
+    never reach the client. This answers at once: the `payment` event if
+    the payment is final, otherwise only a `retry` delay, after which the
+    client's EventSource reconnects. The stream is a short poll.
+    """
+
+    def get(self, request, tx_ref):
+        return event_stream_response(poll_events(self.get_object()))
+
+
+class PaymentWaitMixin:
+    """
+    Shared plumbing for the async views that wait on a payment (ASGI)
+
+    The sync api_view's authentication, permissions and throttles (scope
+    'payment_wait') run first (see AsyncAPIView). A waiting request
+    holds no thread or database connection, but each one holds a wait
+    slot: past PAYMENT_WAIT_MAX_WAITERS in this process, long-polls get a
+    503 with Retry-After and event streams answer at once, as under WSGI.
+    """
+
+    async def get_payment(self, request, tx_ref):
+        """(payment, None), or (None, error response)"""
+        api_view = self.get_api_view(request, tx_ref=tx_ref)
+        try:
+            await self.check(api_view, tx_ref=tx_ref)
+            payment = await api_view.get_queryset().filter(tx_ref=tx_ref).afirst()
+            if payment is None:
+                raise Http404("No Payment matches the given query.")
+        except Exception as exc:
+            return None, self.error_response(api_view, exc, tx_ref=tx_ref)
+        return payment, None
+
+    def busy_response(self):
+        response = JsonResponse({'detail': 'Too many clients are waiting on payments; poll instead.'}, status=503)
+        response['Retry-After'] = str(getattr(settings, 'PAYMENT_POLL_RETRY', 5))
+        return response
+
+    def get_timeout(self, request, limit):
+        try:
+            timeout = float(request.GET.get('timeout', limit))
+        except ValueError:
+            timeout = limit
+        return max(0.0, min(timeout, limit))
+
+    def status_loader(self, payment):
+        async def load_status():
+            return await Payment.objects.filter(pk=payment.pk).values_list('status', flat=True).afirst()
+        return load_status
+
+    async def wait_for_result(self, payment, timeout):
+        """
+        Wait for the payment to become final, then fall back to one verify
+
+        Returns (response data, HTTP status).
+        """
+        final_status = await payment_notifier.wait(payment.tx_ref, timeout, self.status_loader(payment))
+        if final_status is not None:
+            await payment.arefresh_from_db()
+        return await sync_to_async(verification_payload)(payment)
+
+
+class PaymentWaitView(PaymentWaitMixin, AsyncAPIView):
+    """
+    Long-poll until a payment is completed or failed (ASGI)
+    GET /api/payments/wait/{tx_ref}/?timeout=25
+
+    Responds as soon as the webhook processor or background verifier
+    finalizes the payment, or after the timeout with one on-demand verify.
+    The response has the same shape as the verify endpoint.
+    """
+
+    async def get(self, request, tx_ref):
+        payment, error_response = await self.get_payment(request, tx_ref)
+        if error_response:
+            return error_response
+
+        if not payment_notifier.admit():
+            return self.busy_response()
+        try:
+            timeout = self.get_timeout(request, getattr(settings, 'PAYMENT_WAIT_TIMEOUT', 25))
+            data, status_code = await self.wait_for_result(payment, timeout)
+        finally:
+            payment_notifier.leave()
+        return JsonResponse(data, status=status_code)
+
+
+class PaymentEventsView(PaymentWaitMixin, AsyncAPIView):
+    """
+    Server-sent events stream for a payment (ASGI)
+    GET /api/payments/events/{tx_ref}/
+
+    Sends keep-alive comments while waiting and a single `payment` event
+    (verify endpoint payload) when the payment is final or the stream's
+    time limit is reached, then closes. Clients should close their
+    EventSource on that event instead of letting it reconnect.
+    """
+
+    async def get(self, request, tx_ref):
+        payment, error_response = await self.get_payment(request, tx_ref)
+        if error_response:
+            return error_response
+
+        timeout = self.get_timeout(request, getattr(settings, 'PAYMENT_EVENTS_TIMEOUT', 120))
+        heartbeat = getattr(settings, 'PAYMENT_EVENTS_HEARTBEAT', 15)
+
+        async def stream():
+            # The slot is taken here, not in get(), so a client gone before
+            # the stream starts can't leak it
+            if not payment_notifier.admit():
+                for chunk in await sync_to_async(poll_events)(payment):
+                    yield chunk
+                return
+            try:
+                yield 'retry: 5000\n\n'
+                remaining = timeout
+                while remaining > 0:
+                    wait = min(heartbeat, remaining)
+                    if await payment_notifier.wait(payment.tx_ref, wait, self.status_loader(payment)):
+                        break
+                    remaining -= wait
+                    if remaining > 0:
+                        yield ': keep-alive\n\n'
+
+                yield payment_event(*await self.wait_for_result(payment, 0))
+            finally:
+                payment_notifier.leave()
+
+        return event_stream_response(stream())
+
+
 class PaymentHistoryView(generics.ListAPIView):
     """
     Get user's payment history
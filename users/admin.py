@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import User
+from .authentication import forget_users
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -50,20 +51,28 @@ class CustomUserAdmin(UserAdmin):
     
     @admin.action(description='Activate selected users')
     def activate_users(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=True)
+        forget_users(user_ids)  # queryset.update() sends no post_save
         self.message_user(request, f'{updated} users activated successfully.')
     
     @admin.action(description='Deactivate selected users')
     def deactivate_users(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=False)
+        forget_users(user_ids)  # queryset.update() sends no post_save
         self.message_user(request, f'{updated} users deactivated successfully.')
     
     @admin.action(description='Make selected users cafe staff')
     def make_cafe_staff(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_cafe_staff=True)
+        forget_users(user_ids)  # queryset.update() sends no post_save
         self.message_user(request, f'{updated} users marked as cafe staff.')
     
     @admin.action(description='Remove cafe staff status')
     def remove_cafe_staff(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_cafe_staff=False)
+        forget_users(user_ids)  # queryset.update() sends no post_save
         self.message_user(request, f'{updated} users removed from cafe staff.')
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+
+class AdmissionController:
+    """
+    Cap on auth requests in flight (queued or hashing) per process
+
+    Requests over the cap get a 503 with Retry-After straight away instead
+    of queueing behind the password hasher, so a login storm cannot tie up
+    the workers that serve order traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.in_flight >= getattr(settings, 'AUTH_MAX_PENDING', 16):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """Bounded pool that runs auth views, and with them password hashing"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AUTH_HASH_THREADS', 4),
+                    thread_name_prefix='auth-hash'
+                )
+    return _executor
+
+
+def _run_in_pool_thread(view, request, *args, **kwargs):
+    # Pool threads sit outside Django's request cycle, so manage connections here
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def offload_auth_view(view):
+    """
+    Run a sync view (login, register) on the bounded hashing pool, behind admission control
+
+    The wrapper is async: under ASGI the event loop stays free while a
+    password hashes; under WSGI the worker thread just waits on the pool.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not auth_admission.try_enter():
+            response = JsonResponse(
+                {'detail': 'Too many sign-in requests in progress, please retry shortly.'}, status=503
+            )
+            response['Retry-After'] = str(getattr(settings, 'AUTH_RETRY_AFTER', 1))
+            return response
+        try:
+            loop = asyncio.get_running_loop()
+            # Carry the request's context (query counting, profiling) onto the pool thread
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                get_hash_executor(),
+                functools.partial(context.run, _run_in_pool_thread, view, request, *args, **kwargs)
+            )
+        finally:
+            auth_admission.leave()
+
+    return wrapper
+
+
+# Shared by every auth request in this process
+auth_admission = AdmissionController()
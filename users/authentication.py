@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# Token claims mirrored from the user (see CustomTokenObtainPairSerializer)
+CLAIM_FIELDS = ('username', 'email', 'is_staff', 'is_superuser', 'is_cafe_staff', 'is_customer')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _cache():
+    # Every worker must see an invalidation, so never a per-process backend
+    return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'shared')]
+
+
+def _user_key(user_id) -> str:
+    return f"users:auth:user:{user_id}"
+
+
+def _claims_key(user_id) -> str:
+    return f"users:auth:claims:{user_id}"
+
+
+def auth_fingerprint(user):
+    """The user's current values of everything a token vouches for"""
+    return (user.is_active,) + tuple(getattr(user, field) for field in CLAIM_FIELDS)
+
+
+def _without_password(user):
+    """
+    A copy of a loaded user with the password hash deferred
+
+    The shared cache may be files on disk, so the hash never goes there;
+    code that reads user.password on a cached user loads it on demand, and
+    saving the copy leaves the stored hash alone.
+    """
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+    return User.from_db(user._state.db, fields, [getattr(user, field) for field in fields])
+
+
+def remember_user(user) -> None:
+    """Cache a freshly loaded user (without its password hash) and its claims fingerprint"""
+    auth_cache = _cache()
+    auth_cache.set(_user_key(user.pk), _without_password(user), getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+    auth_cache.set(_claims_key(user.pk), auth_fingerprint(user), getattr(settings, 'AUTH_CLAIMS_CACHE_TTL', 30))
+
+
+def forget_users(user_ids) -> None:
+    """Drop cached users; their next request loads them from the database"""
+    keys = []
+    for user_id in user_ids:
+        keys += [_user_key(user_id), _claims_key(user_id)]
+    _cache().delete_many(keys)
+
+
+def get_cached_user(user_id):
+    """The full User, from the short-TTL cache or the database (None if missing)"""
+    user = _cache().get(_user_key(user_id))
+    if user is None:
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            remember_user(user)
+    return user
+
+
+def user_from_claims(validated_token):
+    """
+    Build an unsaved User from token claims, or None if they can't be trusted
+
+    Claims are trusted only while they match the fingerprint cached for
+    the user, so a deactivated, demoted or renamed user (or one not seen
+    since the cache was emptied) goes through the full check instead.
+    """
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None or any(field not in validated_token for field in CLAIM_FIELDS):
+        return None
+    user_id = User._meta.pk.to_python(user_id)  # The claim is a string; match a loaded user's pk
+
+    user = User(pk=user_id, is_active=True, **{field: validated_token[field] for field in CLAIM_FIELDS})
+    if _cache().get(_claims_key(user_id)) != auth_fingerprint(user):
+        return None
+
+    user._state.adding = False
+    user._state.db = 'default'
+    user._from_token_claims = True  # Saving it is refused (see users.signals)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a user query per request
+
+    Read requests (GET/HEAD/OPTIONS) get a lightweight, unsaved User built
+    from the token claims. Write requests, and views that set
+    `requires_full_user = True`, get the full User from a short-TTL cache
+    that is invalidated when users change.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        if self.claims_user_allowed(request):
+            user = user_from_claims(validated_token)
+            if user is not None:
+                return user, validated_token
+
+        return self.get_user(validated_token), validated_token
+
+    def claims_user_allowed(self, request) -> bool:
+        if request.method not in SAFE_METHODS:
+            return False
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        return not getattr(view, 'requires_full_user', False)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
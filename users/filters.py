@@ -0,0 +1,18 @@
+import django_filters
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class AdminUserFilter(django_filters.FilterSet):
+    """Filters for the admin user list; stats filters use the annotated CustomerStats values"""
+    min_orders = django_filters.NumberFilter(field_name='lifetime_orders', lookup_expr='gte')
+    max_orders = django_filters.NumberFilter(field_name='lifetime_orders', lookup_expr='lte')
+    min_spend = django_filters.NumberFilter(field_name='lifetime_spend', lookup_expr='gte')
+    max_spend = django_filters.NumberFilter(field_name='lifetime_spend', lookup_expr='lte')
+    last_order_after = django_filters.IsoDateTimeFilter(field_name='customer_stats__last_order_at', lookup_expr='gte')
+    last_order_before = django_filters.IsoDateTimeFilter(field_name='customer_stats__last_order_at', lookup_expr='lte')
+
+    class Meta:
+        model = User
+        fields = ['is_customer', 'is_cafe_staff', 'is_active']
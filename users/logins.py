@@ -0,0 +1,269 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Tuple
+from django.conf import settings
+from jobs.queue import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+def _owner_path(journal_dir: str, owner: str) -> str:
+    return os.path.join(journal_dir, f"logins-{owner}.owner")
+
+
+def _merge(entries: Dict[int, list], user_id: int, timestamp: float, count: int = 1) -> None:
+    entry = entries.get(user_id)
+    if entry is None:
+        entries[user_id] = [timestamp, count]
+    else:
+        entry[0] = max(entry[0], timestamp)
+        entry[1] += count
+
+
+def apply_logins(entries: Dict[int, Tuple[float, int]], chunk_size: int = 500) -> int:
+    """
+    Write buffered logins: one UPDATE per chunk of users
+
+    last_login only moves forward, so replaying an old journal can't
+    overwrite a newer login. Returns the number of users updated.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db.models import Case, F, IntegerField, DateTimeField, Value, When
+    from django.db.models.functions import Coalesce, Greatest
+
+    User = get_user_model()
+    items = list(entries.items())
+    updated = 0
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        last_login = Case(
+            *[When(pk=user_id, then=Value(datetime.fromtimestamp(ts, dt_timezone.utc)))
+              for user_id, (ts, _) in chunk],
+            output_field=DateTimeField(),
+        )
+        increment = Case(
+            *[When(pk=user_id, then=Value(count)) for user_id, (_, count) in chunk],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        updated += User.objects.filter(pk__in=[user_id for user_id, _ in chunk]).update(
+            last_login=Greatest(Coalesce('last_login', last_login), last_login),
+            login_count=F('login_count') + increment,
+        )
+    return updated
+
+
+class LoginTracker:
+    """
+    Buffer last_login and login_count updates and write them in bulk
+
+    Each login is appended to a per-process journal file and kept in
+    memory; every LOGIN_FLUSH_INTERVAL seconds (or once LOGIN_FLUSH_MAX_USERS
+    users are pending) the buffer is written in one UPDATE and the journal
+    is dropped. Pending logins are flushed on normal exit; journals left by
+    a process that died are replayed by `recover_journals`.
+
+    Journals are named after an owner id, the pid plus a random token, so
+    a later process that is given the same pid (every container restart)
+    never appends to a dead one's journal. The owner holds a lock on its
+    `.owner` file for as long as it lives; that lock, not the pid, is what
+    tells recovery a journal is still in use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, list] = {}
+        self._journal = None
+        self._journal_path = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._owner = None
+        self._owner_lock = None
+
+    def _journal_dir(self) -> str:
+        return getattr(settings, 'LOGIN_JOURNAL_DIR')
+
+    def _claim_owner(self) -> None:
+        # Called with self._lock held; a forked child gets an id of its own
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._owner = f"{self._pid}-{uuid.uuid4().hex}"
+        os.makedirs(self._journal_dir(), exist_ok=True)
+        self._owner_lock = FileLock(_owner_path(self._journal_dir(), self._owner))
+        self._owner_lock.acquire()
+        self._journal_path = os.path.join(self._journal_dir(), f"logins-{self._owner}.log")
+
+    def owner(self) -> str:
+        """This process's journal owner id"""
+        with self._lock:
+            self._claim_owner()
+            return self._owner
+
+    def _start(self) -> None:
+        # Called with self._lock held; restarts after a fork (new pid)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            self._pending = {}
+            self._journal = None
+        self._claim_owner()
+        self._thread = threading.Thread(target=self._run, name='login-tracker', daemon=True)
+        self._thread.start()
+
+    def record(self, user_id: int, timestamp: float) -> None:
+        """Note a login; cheap enough to call inside the request"""
+        with self._lock:
+            self._start()
+            if self._journal is None:
+                self._journal = open(self._journal_path, 'a', buffering=1)
+            self._journal.write(f"{user_id} {timestamp}\n")
+            _merge(self._pending, user_id, timestamp)
+            full = len(self._pending) >= getattr(settings, 'LOGIN_FLUSH_MAX_USERS', 1000)
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write pending logins now; returns the number of users updated"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                journal, self._journal = self._journal, None
+                flushing_path = f"{self._journal_path}.{int(datetime.now().timestamp() * 1000)}.flushing"
+                if journal is not None:
+                    journal.close()
+                    os.replace(self._journal_path, flushing_path)
+
+            try:
+                updated = apply_logins(pending)
+            except Exception as e:
+                # Journal stays on disk; the logins go back in the buffer for the next attempt
+                logger.error(f"Failed to flush {len(pending)} buffered logins: {str(e)}")
+                with self._lock:
+                    for user_id, (ts, count) in pending.items():
+                        _merge(self._pending, user_id, ts, count)
+                return 0
+
+            for path in glob.glob(f"{self._journal_path}.*.flushing"):
+                os.remove(path)
+            return updated
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(getattr(settings, 'LOGIN_FLUSH_INTERVAL', 10))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Login tracker flush failed: {str(e)}")
+
+
+def _unapplied(logins: Dict[int, list], chunk_size: int = 500) -> Dict[int, list]:
+    """
+    Replayed logins not yet written, merged per user
+
+    A process that died after its flush committed but before it removed
+    the journal leaves logins that were already counted; every one of
+    them is at or before the user's last_login by now, so only later
+    logins are kept. (A dead journal's login that another process has
+    since overtaken with a newer one is dropped too: a rare undercount
+    rather than a double count.)
+    """
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    user_ids = list(logins)
+    entries: Dict[int, list] = {}
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        for user_id, last_login in User.objects.filter(pk__in=chunk).values_list('pk', 'last_login'):
+            for timestamp in logins[user_id]:
+                if last_login is None or datetime.fromtimestamp(timestamp, dt_timezone.utc) > last_login:
+                    _merge(entries, user_id, timestamp)
+    return entries
+
+
+def _journal_owner(path: str) -> str:
+    """Owner id of a journal, or of the recovery that claimed it"""
+    original, _, recoverer = path.partition('.recovering-')
+    return recoverer or os.path.basename(original)[len('logins-'):].split('.', 1)[0]
+
+
+def recover_journals() -> int:
+    """
+    Replay journals of processes that exited without flushing
+
+    A journal is replayed when its owner's lock can be taken, which only
+    happens once the owner has exited; its owner file is removed after.
+    Each file is claimed by renaming it first, so two processes never
+    replay the same journal; claims left by a recovery that died are
+    taken over. Replaying is idempotent (see _unapplied), so a journal
+    whose batch was written just before its process died is not counted
+    twice. Returns the number of users updated.
+    """
+    journal_dir = getattr(settings, 'LOGIN_JOURNAL_DIR')
+    me = login_tracker.owner()
+    dead: Dict[str, FileLock] = {}  # Owner id -> its lock, held until the end
+    logins: Dict[int, list] = {}  # User id -> login timestamps
+    claimed = []
+    try:
+        for path in glob.glob(os.path.join(journal_dir, 'logins-*')):
+            owner = _journal_owner(path)
+            if owner == me:
+                continue
+            if owner not in dead:
+                lock = FileLock(_owner_path(journal_dir, owner))
+                if not lock.acquire(blocking=False):
+                    continue  # Still writing it, or still recovering it
+                dead[owner] = lock
+            if path.endswith('.owner'):
+                continue
+            original = path.partition('.recovering-')[0]
+            claim = f"{original}.recovering-{me}"
+            try:
+                os.rename(path, claim)
+            except FileNotFoundError:
+                continue  # Another process claimed it
+            claimed.append((claim, original))
+            with open(claim) as f:
+                for line in f:
+                    try:
+                        user_id, timestamp = line.split()
+                        logins.setdefault(int(user_id), []).append(float(timestamp))
+                    except ValueError:
+                        continue  # Torn final line from a crash
+
+        try:
+            updated = apply_logins(_unapplied(logins)) if logins else 0
+        except Exception:
+            # Hand the journals back for the next recovery
+            for claim, original in claimed:
+                os.rename(claim, original)
+            raise
+        for claim, _ in claimed:
+            os.remove(claim)
+    finally:
+        # A missing owner file reads as dead too, so it can go either way
+        for owner, lock in dead.items():
+            lock.release()
+            try:
+                os.remove(_owner_path(journal_dir, owner))
+            except FileNotFoundError:
+                pass
+    if claimed:
+        logger.info(f"Recovered logins for {updated} users from {len(claimed)} journals")
+    return updated
+
+
+# Shared by every login in this process
+login_tracker = LoginTracker()
+atexit.register(login_tracker.flush)
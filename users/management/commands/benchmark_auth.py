@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.utils.module_loading import import_string
+from payments.metrics import percentile
+from users.logins import login_tracker
+
+# Hasher aliases accepted by --hashers; 'pbkdf2:<iterations>' overrides the work factor
+HASHERS = {
+    'pbkdf2': 'users.hashers.PBKDF2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+
+PASSWORD = 'Bench!Passw0rd-2345'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the register and login endpoints per password hasher configuration '
+        'and report requests/sec and latency percentiles. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', default='pbkdf2,pbkdf2:260000,scrypt',
+                            help='Comma-separated hashers to compare, e.g. pbkdf2:600000,scrypt,argon2')
+        parser.add_argument('--requests', type=int, default=50, help='Registrations (and logins) per hasher')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+
+    def handle(self, *args, **options):
+        profiles = [self._profile(name.strip()) for name in options['hashers'].split(',') if name.strip()]
+
+        for connection in connections.all():
+            if connection.vendor == 'sqlite':
+                # In-memory shared-cache SQLite fails concurrent writers with "table is locked"
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    tempfile.gettempdir(), f"benchmark_auth_{connection.alias}.sqlite3"
+                )
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write(
+                f"{options['requests']} requests per endpoint, {options['concurrency']} concurrent clients"
+            )
+            self.stdout.write(
+                f"{'hasher':<18} {'endpoint':<9} {'req/s':>8} {'p50 (ms)':>10} "
+                f"{'p99 (ms)':>10} {'errors':>7} {'503s':>6}"
+            )
+            for index, (label, overrides) in enumerate(profiles):
+                with override_settings(**overrides):
+                    usernames = [f"bench{index}_{i}" for i in range(options['requests'])]
+                    for endpoint, payload in (('register', self._register_payload), ('login', self._login_payload)):
+                        self._report(label, endpoint, self._run(
+                            f"/api/auth/{endpoint}/", [payload(name) for name in usernames],
+                            options['concurrency']
+                        ))
+        finally:
+            login_tracker.flush()
+            teardown_databases(old_config, verbosity=0)
+
+    def _profile(self, name):
+        alias, _, iterations = name.partition(':')
+        if alias not in HASHERS:
+            raise CommandError(f"Unknown hasher '{alias}' (choose from {', '.join(HASHERS)})")
+        overrides = {'PASSWORD_HASHERS': [HASHERS[alias]]}
+        if iterations:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = int(iterations)
+        hasher = import_string(HASHERS[alias])()
+        if getattr(hasher, 'library', None):
+            try:
+                hasher._load_library()
+            except ValueError as e:
+                raise CommandError(f"Hasher '{alias}' is not available here: {str(e)}")
+        return name, overrides
+
+    def _register_payload(self, username):
+        return {'username': username, 'email': f"{username}@bench.local",
+                'password': PASSWORD, 'password2': PASSWORD}
+
+    def _login_payload(self, username):
+        return {'username': username, 'password': PASSWORD}
+
+    def _run(self, path, payloads, concurrency):
+        def send(item):
+            index, payload = item
+            # A distinct client address per request keeps the throttles out of the measurement
+            client = Client(REMOTE_ADDR=f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}")
+            started = time.monotonic()
+            response = client.post(path, payload, content_type='application/json')
+            return response.status_code, time.monotonic() - started
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(send, enumerate(payloads)))
+        return results, time.monotonic() - started
+
+    def _report(self, label, endpoint, run):
+        results, total = run
+        latencies = [elapsed * 1000 for status, elapsed in results if status < 400]
+        rejected = sum(1 for status, _ in results if status == 503)
+        errors = sum(1 for status, _ in results if status >= 400) - rejected
+        self.stdout.write(
+            f"{label:<18} {endpoint:<9} {len(results) / total:>8.1f} {percentile(latencies, 50):>10.1f} "
+            f"{percentile(latencies, 99):>10.1f} {errors:>7} {rejected:>6}"
+        )
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-19 05:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """One-off aggregation of delivered orders; later deliveries update the rows incrementally"""
+    from django.db.models import Count, Max, Sum
+    from django.db.models.functions import Coalesce
+
+    Order = apps.get_model('orders', 'Order')
+    CustomerStats = apps.get_model('users', 'CustomerStats')
+    totals = (
+        Order.objects.filter(status='delivered')
+        .order_by()
+        .values('customer_id')
+        .annotate(orders=Count('id'), spend=Sum('total_amount'), last=Max(Coalesce('delivered_at', 'created_at')))
+    )
+    CustomerStats.objects.bulk_create(
+        [
+            CustomerStats(
+                user_id=row['customer_id'],
+                lifetime_orders=row['orders'],
+                lifetime_spend=row['spend'] or 0,
+                last_order_at=row['last'],
+            )
+            for row in totals.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('orders', '0005_alter_order_delivery_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='customer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('lifetime_orders', models.PositiveIntegerField(default=0, verbose_name='lifetime orders')),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='lifetime spend')),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='last order at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'customer stats',
+                'verbose_name_plural': 'customer stats',
+                'indexes': [models.Index(fields=['lifetime_orders'], name='users_custo_lifetim_052c8f_idx'), models.Index(fields=['lifetime_spend'], name='users_custo_lifetim_1e6392_idx'), models.Index(fields=['last_order_at'], name='users_custo_last_or_3c24ae_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_customerstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='login_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='login count'),
+        ),
+    ]
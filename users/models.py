@@ -1,6 +1,11 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+
+# Stand-in last order date for users without orders, so they sort and page like everyone else
+NO_ORDERS = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
 class User(AbstractUser):
     """Custom User model with additional fields"""
@@ -8,6 +13,7 @@ class User(AbstractUser):
     phone_number = models.CharField(_('phone number'), max_length=15, blank=True)
     is_customer = models.BooleanField(_('customer status'), default=True)
     is_cafe_staff = models.BooleanField(_('cafe staff status'), default=False)
+    login_count = models.PositiveIntegerField(_('login count'), default=0)
     
     # Address fields
     address = models.TextField(_('address'), blank=True)
@@ -19,4 +25,74 @@ class User(AbstractUser):
         verbose_name_plural = _('users')
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+class CustomerStats(models.Model):
+    """Lifetime order totals per user, kept up to date as orders are delivered"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='customer_stats')
+    lifetime_orders = models.PositiveIntegerField(_('lifetime orders'), default=0)
+    lifetime_spend = models.DecimalField(_('lifetime spend'), max_digits=12, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(_('last order at'), null=True, blank=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('customer stats')
+        verbose_name_plural = _('customer stats')
+        indexes = [
+            models.Index(fields=['lifetime_orders']),
+            models.Index(fields=['lifetime_spend']),
+            models.Index(fields=['last_order_at']),
+        ]
+    
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+    
+    @staticmethod
+    def annotate_users(queryset):
+        """Attach lifetime_orders, lifetime_spend and last_order_at to a User queryset (a join, no aggregation)"""
+        from decimal import Decimal
+        from django.db.models import Value
+        from django.db.models.functions import Coalesce
+        
+        return queryset.annotate(
+            lifetime_orders=Coalesce('customer_stats__lifetime_orders', Value(0)),
+            lifetime_spend=Coalesce(
+                'customer_stats__lifetime_spend',
+                Value(Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            ),
+            last_order_at=Coalesce(
+                'customer_stats__last_order_at',
+                Value(NO_ORDERS, output_field=models.DateTimeField()),
+            ),
+        )
+    
+    @classmethod
+    def refresh_for(cls, user_id, create=True):
+        """Recompute the user's totals from their delivered orders
+
+        The stats row is locked first, so concurrent refreshes run one after the
+        other and the last one counts every order committed before it. With
+        create=False a user without a stats row (e.g. one being deleted) is left alone.
+        """
+        from django.db import transaction
+        from django.db.models import Count, Max, Sum
+        from django.db.models.functions import Coalesce
+        from orders.models import Order
+        
+        with transaction.atomic():
+            if create:
+                cls.objects.get_or_create(user_id=user_id)
+            if not cls.objects.select_for_update().filter(user_id=user_id).values_list('pk'):
+                return
+            totals = Order.objects.filter(customer_id=user_id, status='delivered').aggregate(
+                orders=Count('id'),
+                spend=Sum('total_amount'),
+                last=Max(Coalesce('delivered_at', 'created_at')),
+            )
+            cls.objects.filter(user_id=user_id).update(
+                lifetime_orders=totals['orders'],
+                lifetime_spend=totals['spend'] or 0,
+                last_order_at=totals['last'],
+                updated_at=timezone.now(),
+            )
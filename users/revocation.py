@@ -0,0 +1,226 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    # Markers must reach every worker before its next sync, so never a per-process backend
+    return caches[getattr(settings, 'CACHE_SHARED_ALIAS', 'shared')]
+
+
+def _revoked_key(jti: str) -> str:
+    return f"users:revoked:{jti}"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings
+
+    Answers "definitely absent" or "possibly present". Sized for `capacity`
+    items at the given false positive rate; past that the rate climbs.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationIndex:
+    """
+    In-process view of the refresh token blacklist
+
+    A Bloom filter holds the jti of every unexpired blacklisted token, so a
+    token that was never revoked (the common case) is accepted without a
+    blacklist query. Bloom hits are settled by a small LRU of exact answers
+    and only then by the database. The filter is caught up incrementally
+    from new BlacklistedToken rows every TOKEN_REVOCATION_SYNC_INTERVAL
+    seconds and rebuilt from scratch every TOKEN_REVOCATION_REBUILD_INTERVAL
+    seconds, which also drops expired entries.
+
+    Tokens revoked in another process show up here at the next sync; until
+    then a short-lived marker in the shared cache (CACHE_SHARED_ALIAS)
+    covers them. Syncs query the blacklist outside the lock and swap the
+    result in, so checks keep using the current filter meanwhile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # Held by the one thread syncing
+        self._bloom = None
+        self._added = None  # Revoked here while a rebuild was querying
+        self._exact = OrderedDict()
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._stats = {'checks': 0, 'bloom_negative': 0, 'exact_hits': 0, 'db_lookups': 0}
+
+    def _count(self, stat: str) -> None:
+        self._stats[stat] += 1
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        self._exact[jti] = revoked
+        self._exact.move_to_end(jti)
+        while len(self._exact) > getattr(settings, 'TOKEN_REVOCATION_CACHE_SIZE', 10000):
+            self._exact.popitem(last=False)
+
+    def _rebuild(self) -> None:
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        from rest_framework_simplejwt.utils import aware_utcnow
+
+        with self._lock:
+            self._added = []
+        rows = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+            .values_list('id', 'token__jti')
+        )
+        capacity = max(len(rows) * 2, getattr(settings, 'TOKEN_REVOCATION_CAPACITY', 100000))
+        bloom = BloomFilter(capacity, getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', 0.001))
+        for _, jti in rows:
+            bloom.add(jti)
+
+        with self._lock:
+            for jti in self._added:
+                bloom.add(jti)
+            self._added = None
+            self._bloom = bloom
+            self._exact.clear()
+            self._last_id = max((row_id for row_id, _ in rows), default=self._last_id)
+            self._built_at = self._synced_at = time.monotonic()
+
+    def _catch_up(self) -> None:
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        rows = list(
+            BlacklistedToken.objects.filter(id__gt=self._last_id)
+            .order_by('id').values_list('id', 'token__jti')
+        )
+        with self._lock:
+            for row_id, jti in rows:
+                self._bloom.add(jti)
+                self._remember(jti, True)
+                self._last_id = row_id
+            self._synced_at = time.monotonic()
+
+    def _due(self):
+        now = time.monotonic()
+        with self._lock:
+            if (self._bloom is None
+                    or self._bloom.count >= self._bloom.capacity
+                    or now - self._built_at >= getattr(settings, 'TOKEN_REVOCATION_REBUILD_INTERVAL', 3600)):
+                return self._rebuild
+            if now - self._synced_at >= getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 5):
+                return self._catch_up
+        return None
+
+    def _sync(self) -> None:
+        if self._due() is None:
+            return
+        # Only the first build is waited for; later syncs run in one thread while the rest use the current filter
+        if not self._sync_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            sync = self._due()
+            if sync is not None:
+                sync()
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, jti: str) -> bool:
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        self._sync()
+        with self._lock:
+            self._count('checks')
+            negative = jti not in self._bloom
+            if negative:
+                self._count('bloom_negative')
+            elif jti in self._exact:
+                self._count('exact_hits')
+                self._exact.move_to_end(jti)
+                return self._exact[jti]
+            else:
+                self._count('db_lookups')
+        if negative:
+            return _cache().get(_revoked_key(jti)) is not None
+
+        revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        with self._lock:
+            self._remember(jti, revoked)
+        return revoked
+
+    def add(self, jti: str, expires_in: float) -> None:
+        """Record a token revoked by this process"""
+        ttl = int(min(max(expires_in, 1), getattr(settings, 'TOKEN_REVOCATION_REBUILD_INTERVAL', 3600)))
+        _cache().set(_revoked_key(jti), True, ttl)
+        with self._lock:
+            if self._added is not None:
+                self._added.append(jti)
+            if self._bloom is not None:
+                self._bloom.add(jti)
+                self._remember(jti, True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(
+                self._stats,
+                bloom_items=self._bloom.count if self._bloom is not None else 0,
+                exact_items=len(self._exact),
+            )
+
+
+def prune_expired_tokens(batch_size: int = 1000, max_batches: int = None) -> int:
+    """
+    Delete expired outstanding tokens (and their blacklist rows) in batches
+
+    Tokens expire in creation order, so each batch is found at the low end
+    of the primary key index without scanning the live tokens. Returns the
+    number of outstanding tokens deleted.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+    from rest_framework_simplejwt.utils import aware_utcnow
+
+    now = aware_utcnow()
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        batches += 1
+        if len(ids) < batch_size:
+            break
+    return deleted
+
+
+# Shared by every refresh in this process
+revocation_index = RevocationIndex()
@@ -1,11 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .tokens import RefreshToken
+from .models import NO_ORDERS
+from .logins import login_tracker
+import time
 
 User = get_user_model()
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+    
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -15,8 +21,21 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['email'] = user.email
         token['is_cafe_staff'] = user.is_cafe_staff
         token['is_customer'] = user.is_customer
+        # Lets read endpoints authenticate from claims (users.authentication)
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
         
         return token
+    
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Buffered and written in bulk instead of an UPDATE per login (UPDATE_LAST_LOGIN is off)
+        login_tracker.record(self.user.pk, time.time())
+        return data
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    # Blacklist checks are answered by the in-process revocation index
+    token_class = RefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,6 +45,22 @@ class UserSerializer(serializers.ModelSerializer):
                  'address', 'latitude', 'longitude')
         read_only_fields = ('is_customer', 'is_cafe_staff')
 
+class AdminUserSerializer(UserSerializer):
+    # Annotated from CustomerStats by the admin user list
+    lifetime_orders = serializers.IntegerField(read_only=True)
+    lifetime_spend = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    last_order_at = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('is_active', 'date_joined', 'lifetime_orders',
+                                               'lifetime_spend', 'last_order_at')
+
+    def get_last_order_at(self, obj):
+        last_order_at = getattr(obj, 'last_order_at', None)
+        if last_order_at is None or last_order_at == NO_ORDERS:
+            return None
+        return serializers.DateTimeField().to_representation(last_order_at)
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
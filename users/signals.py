@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .authentication import forget_users
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=User)
+def refuse_claims_user_save(sender, instance, **kwargs):
+    """A user built from token claims is partial; saving it would wipe fields"""
+    if getattr(instance, '_from_token_claims', False):
+        raise RuntimeError("Cannot save a user built from token claims; set requires_full_user on the view")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached user (and its trusted claims) once the change is committed"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_users([user_id]))
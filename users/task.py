@@ -0,0 +1,28 @@
+from django.conf import settings
+from .revocation import prune_expired_tokens as prune_tokens
+from .logins import recover_journals
+from jobs.registry import task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=1, concurrency=1)
+def prune_expired_tokens():
+    """
+    Background task to delete expired refresh tokens and their blacklist rows
+    Runs every hour
+    """
+    deleted = prune_tokens(getattr(settings, 'TOKEN_RETENTION_BATCH_SIZE', 1000))
+    if deleted:
+        logger.info(f"Pruned {deleted} expired refresh tokens")
+    return deleted
+
+
+@task(max_attempts=1, concurrency=1)
+def recover_login_journals():
+    """
+    Background task to write logins buffered by processes that died before flushing
+    Runs every 5 minutes
+    """
+    return recover_journals()
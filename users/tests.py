@@ -1,3 +1,207 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.exceptions import TokenError
+from jobs.queue import FileLock
+from .authentication import get_cached_user
+from .logins import login_tracker, recover_journals
+from .models import CustomerStats
+from .revocation import BloomFilter, RevocationIndex
+from .tokens import RefreshToken
+from .views import UserListAPIView
 
-# Create your tests here.
+User = get_user_model()
+
+# Separate per-process caches, so 'default' can stand in for another worker's memory
+SPLIT_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+
+class BloomFilterTests(TestCase):
+    def test_added_items_are_always_found(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        self.assertTrue(all(f"jti-{i}" in bloom for i in range(1000)))
+        self.assertEqual(bloom.count, 1000)
+
+    def test_false_positives_stay_near_the_error_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(CACHES=SPLIT_CACHES, CACHE_SHARED_ALIAS='shared')
+class RevocationIndexTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='revoked', email='revoked@example.com', password='pass')
+
+    def test_revoked_in_one_checker_is_rejected_by_a_fresh_one(self):
+        revoking = RevocationIndex()
+        revoking.is_revoked('warm-up')  # Build its filter before the revocation
+        revoking.add('jti-revoked-elsewhere', 3600)
+        caches['default'].clear()
+
+        # No blacklist row yet: only the shared marker can tell the other worker
+        self.assertTrue(RevocationIndex().is_revoked('jti-revoked-elsewhere'))
+        self.assertFalse(RevocationIndex().is_revoked('jti-never-revoked'))
+
+    def test_catch_up_finds_tokens_blacklisted_after_build(self):
+        index = RevocationIndex()
+        token = RefreshToken.for_user(self.user)
+        jti = token['jti']
+        self.assertFalse(index.is_revoked(jti))
+
+        token.blacklist()
+        caches['shared'].clear()  # Leave only the blacklist row
+        with override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=0):
+            self.assertTrue(index.is_revoked(jti))
+
+    def test_rotated_refresh_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+
+@override_settings(CACHES=SPLIT_CACHES, CACHE_SHARED_ALIAS='shared')
+class CachedUserTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com', password='secret-pass')
+
+    def test_password_hash_is_not_cached(self):
+        get_cached_user(self.user.pk)
+
+        cached = caches['shared'].get(f"users:auth:user:{self.user.pk}")
+        self.assertEqual(cached.pk, self.user.pk)
+        self.assertIn('password', cached.get_deferred_fields())
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+
+    def test_saving_cached_user_keeps_the_password(self):
+        get_cached_user(self.user.pk)
+        cached = get_cached_user(self.user.pk)
+
+        cached.first_name = 'Abebe'
+        cached.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Abebe')
+        self.assertTrue(self.user.check_password('secret-pass'))
+
+
+class RecoverJournalsTests(TestCase):
+    def setUp(self):
+        login_tracker.owner()  # Keep this process's own journal out of the temporary directory
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir)
+        settings_override = override_settings(LOGIN_JOURNAL_DIR=self.journal_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='journaled', email='journaled@example.com', password='pass')
+
+    def write_journal(self, owner, *timestamps):
+        path = os.path.join(self.journal_dir, f"logins-{owner}.log")
+        with open(path, 'w') as f:
+            f.writelines(f"{self.user.pk} {timestamp}\n" for timestamp in timestamps)
+        return path
+
+    def test_journal_of_dead_process_with_reused_pid_is_replayed(self):
+        # Same pid as this process, but another boot's token and no live owner
+        path = self.write_journal(f"{os.getpid()}-0123456789abcdef", time.time())
+
+        self.assertEqual(recover_journals(), 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.login_count, 1)
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+        self.assertFalse(os.path.exists(path))
+
+    def test_journal_of_live_owner_is_left_alone(self):
+        owner = '4242-fedcba9876543210'
+        path = self.write_journal(owner, time.time())
+        lock = FileLock(os.path.join(self.journal_dir, f"logins-{owner}.owner"))
+        lock.acquire()
+        self.addCleanup(lock.release)
+
+        self.assertEqual(recover_journals(), 0)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.login_count, 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_replaying_applied_logins_counts_them_once(self):
+        now = time.time()
+        self.write_journal('4243-0000000000000001', now - 60, now)
+        recover_journals()
+        # The same logins again, as if the process died after flushing but before removing its journal
+        self.write_journal('4243-0000000000000002', now - 60, now)
+        recover_journals()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.login_count, 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass')
+        # Most users share a value, as most have no orders
+        for i in range(7):
+            user = User.objects.create_user(username=f'paged-{i}', email=f'paged-{i}@example.com', password='pass')
+            CustomerStats.objects.create(user=user, lifetime_orders=2 if i == 3 else 1)
+        self.view = UserListAPIView.as_view(throttle_classes=[])
+
+    def get(self, url):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.admin)
+        return self.view(request).data
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            page = self.get(url)
+            pages.append([row['username'] for row in page['results']])
+            url = page[link]
+        return pages
+
+    def test_pages_through_ties_without_skipping_or_repeating(self):
+        pages = self.walk('/api/auth/users/?search=paged-&ordering=-lifetime_orders&page_size=3', 'next')
+
+        expected = User.objects.filter(username__startswith='paged-')
+        expected = CustomerStats.annotate_users(expected).order_by('-lifetime_orders', '-pk')
+        self.assertEqual([name for page in pages for name in page],
+                         list(expected.values_list('username', flat=True)))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_previous_links_return_the_same_pages(self):
+        forward = self.walk('/api/auth/users/?search=paged-&ordering=lifetime_orders&page_size=3', 'next')
+        last = self.get('/api/auth/users/?search=paged-&ordering=lifetime_orders&page_size=3')
+        while last['next']:
+            last = self.get(last['next'])
+
+        backward = self.walk(last['previous'], 'previous')
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_tampered_cursor_is_rejected(self):
+        request = APIRequestFactory().get('/api/auth/users/?cursor=bm90LWEtY3Vyc29y')
+        force_authenticate(request, user=self.admin)
+
+        self.assertEqual(self.view(request).status_code, 404)
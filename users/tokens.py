@@ -0,0 +1,20 @@
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+from django.utils.translation import gettext_lazy as _
+from .revocation import revocation_index
+
+
+class RefreshToken(BaseRefreshToken):
+    """Refresh token whose blacklist checks go through the revocation index"""
+
+    def check_blacklist(self) -> None:
+        if revocation_index.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        expires_in = (datetime_from_epoch(self.payload['exp']) - aware_utcnow()).total_seconds()
+        revocation_index.add(self.payload[api_settings.JTI_CLAIM], expires_in)
+        return result
@@ -4,18 +4,31 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from .serializers import (CustomTokenObtainPairSerializer, 
                          UserSerializer, RegisterSerializer, 
-                         UpdateUserSerializer)
-from rest_framework import permissions, generics
+                         UpdateUserSerializer, AdminUserSerializer)
+from .filters import AdminUserFilter
+from .models import CustomerStats
+from .pagination import UserCursorPagination
+from rest_framework import permissions, generics, filters
 from django_filters.rest_framework import DjangoFilterBackend
 
 class UserListAPIView(generics.ListAPIView):
-    serializer_class = UserSerializer
+    """
+    Admin user list with lifetime order stats
+
+    Stats come from CustomerStats, kept current as orders are delivered,
+    so listing, filtering and ordering never aggregate orders.
+    """
+    serializer_class = AdminUserSerializer
     permission_classes = [permissions.IsAdminUser]
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['is_customer', 'is_cafe_staff', 'is_active']
+    pagination_class = UserCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = AdminUserFilter
+    search_fields = ['username', 'email', 'phone_number']
+    ordering_fields = ['date_joined', 'username', 'lifetime_orders', 'lifetime_spend', 'last_order_at']
+    ordering = ['-date_joined']
     
     def get_queryset(self):
-        return User.objects.all().order_by('-date_joined')
+        return CustomerStats.annotate_users(User.objects.all())
 
 class UserDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
@@ -29,15 +42,18 @@ User = get_user_model()
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
     serializer_class = RegisterSerializer
+    throttle_scope = 'register'
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    requires_full_user = True  # Returns profile fields the token doesn't carry
 
     def get_object(self):
         return self.request.user
@@ -49,7 +65,5 @@ class UpdateUserView(generics.UpdateAPIView):
     def get_object(self):
         return self.request.user
 
-class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
-    serializer_class = UserSerializer
-    permission_classes = (permissions.IsAdminUser,)
\ No newline at end of file
+class UserListView(UserListAPIView):
+    """The admin user list as routed at users/"""
\ No newline at end of file